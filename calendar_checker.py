@@ -1,5 +1,4 @@
 import win32gui
-from pywinauto.application import Application
 from datetime import datetime
 import pyautogui
 import time
@@ -7,6 +6,7 @@ from utils import (debug_print, find_window_handle, ensure_foreground_window,
                   calculate_center_position, program_moving_context, check_mouse_before_move, click_at)
 from config import Config, COLORS
 from control_info import get_calendar_info
+from uia_session import get_uia_session
 
 class CalendarChecker:
     """日曆檢查器類"""
@@ -37,8 +37,7 @@ class CalendarChecker:
     def find_calendar(self):
         """找到日曆元素"""
         try:
-            app = Application(backend="uia").connect(handle=self.hwnd)
-            main_window = app.window(handle=self.hwnd)
+            main_window = get_uia_session(self.hwnd).main_wrapper
             
             # 使用 control_info.py 中定義的日曆控件資訊
             calendar_info = get_calendar_info()
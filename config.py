@@ -1,17 +1,87 @@
+import os
 from colorama import init, Fore, Back, Style
 
 class Config:
     """配置類，集中管理所有配置參數"""
     RETRY_LIMIT = 10  # 向上翻頁次數
-    CLICK_BATCH_SIZE = 20  # 批次下載檔案數量
+    CLICK_BATCH_SIZE = 20  # 同時開啟的分頁上限
     SLEEP_INTERVAL = 0.05  # 基本等待時間
     DOUBLE_CLICK_INTERVAL = 0.05  # 雙擊間隔
     DOWNLOAD_INTERVAL = 0.01  # 下載間隔
     CLOSE_WINDOW_INTERVAL = 0.1  # 關閉視窗的連擊間隔
     CLICK_INTERVAL = 0.6  # 連續點擊間隔
     MOUSE_MAX_OFFSET = 100  # 滑鼠最大偏移量
+    LIST_SNAPSHOT_MAX_AGE = 5  # 列表快照最長有效秒數
+    REFRESH_DEBOUNCE = 0.3  # 列表刷新事件合併等待時間
+    REFRESH_DEBOUNCE_MAX_WAIT = 1.5  # 事件持續不斷時，最多合併多久就強制檢查一次
+    REFRESH_POLL_INTERVAL = 1.0  # 無法訂閱事件時的指紋輪詢間隔
+    REFRESH_HEARTBEAT_INTERVAL = 30  # 事件模式下的指紋補檢間隔
     TARGET_WINDOW = "DostocksBiz"
     PROCESS_NAME = "DostocksBiz.exe"
+    DOWNLOAD_FOLDER = "C:\\temp"  # 報告下載資料夾
+    WATCH_DEBOUNCE = 1.0  # 檔案停止寫入多久後視為下載完成
+    WATCH_POLL_INTERVAL = 1.0  # 無法使用系統變更通知時的輪詢間隔
+    EXCLUDE_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exclude_rules.txt')  # 排除規則檔
+    EXCLUDE_RULES_CHECK_INTERVAL = 1.0  # 檢查排除規則檔是否修改的間隔
+    EXCLUDE_BEFORE_DOWNLOAD = True  # 下載前就以排除規則略過報告（複製時也會排除的報告不點擊、不開分頁）
+    # 各時間點仍要下載的報告：值為排除規則文字（例如 'ETF'）或報告類型（'晨會' | '定期' | '產業' | '策略' | '個股' | '其他'）
+    # 例如 {'今日': ['晨會'], '*': ['ETF']}：今日仍下載晨會報告（符合晨報、晨訊等規則），所有時間點仍下載符合 ETF 規則的報告
+    DOWNLOAD_POLICY_OVERRIDES = {}
+    DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')  # 本機資料存放位置
+    LEDGER_DB = os.path.join(DATA_DIR, 'download_ledger.db')  # 下載紀錄資料庫
+    FOLDER_INDEX_DB = os.path.join(DATA_DIR, 'folder_index.db')  # 下載資料夾檔案索引（含報告中繼資料快取）
+    LIST_ARCHIVE_DB = os.path.join(DATA_DIR, 'list_archive.db')  # 各日期列表封存
+    LIST_ARCHIVE_MAX_AGE_DAYS = 14  # 封存超過幾天未重新收集時，改回從畫面收集
+    CATALOG_DB = os.path.join(DATA_DIR, 'report_catalog.db')  # 報告目錄（全文搜尋）
+    MATCH_HISTORY_DB = os.path.join(DATA_DIR, 'match_history.db')  # 列表匹配歷史（命中率統計）
+    ARCHIVE_AFTER_DAYS = 30  # 下載資料夾保留天數，更早的檔案移入封存（0 = 不封存）
+    ARCHIVE_COMPRESS = False  # True: 壓縮到每月 zip 檔；False: 移入每月子資料夾
+    ARCHIVE_SUBFOLDER = 'archive'  # 封存位置（下載資料夾底下）
+    ARCHIVE_KEEP_PATTERNS = ['sync.ffs_db', '*.ffs_lock', '*.ffs_tmp', 'desktop.ini']  # 不封存的同步中繼資料
+    DEDUPE_SAMPLE_SIZE = 64 * 1024  # 重複檔案快速指紋讀取的開頭、結尾位元組數
+    STAGING_DIR = os.path.join(DATA_DIR, 'staging')  # 發佈前的本機暫存區
+    PUBLISH_BATCH_SIZE = 20  # 每批最多發佈的檔案數
+    PUBLISH_BATCH_WINDOW = 0.5  # 合併為同一批的提交間隔（秒）
+    PUBLISH_RETRY_DELAYS = [5, 30, 120, 300]  # 發佈失敗後每次重試前等待的秒數
+    PDF_METADATA_WORKERS = 2  # 解析 PDF 中繼資料的行程數（解析在背景行程中執行，不佔用介面執行緒）
+    PDF_METADATA_WAIT = 5  # 未監控時背景等待 PDF 解析完成（之後結束工作行程）的秒數上限
+    PDF_TEXT_LIMIT = 2000  # 保存的第一頁文字字數上限
+    PDF_BROKER_ALIASES = {  # 在 PDF 標題、作者與第一頁文字中辨識券商（英文名稱: 券商簡稱）
+        'Yuanta': '元大', 'KGI': '凱基', 'Fubon': '富邦', 'Capital Securities': '群益', 'SinoPac': '永豐',
+        'MasterLink': '元富', 'Cathay': '國泰', 'Mega': '兆豐', 'President Securities': '統一',
+        'Daiwa': '大和', 'Nomura': '野村', 'Morgan Stanley': '大摩', 'Goldman Sachs': '高盛',
+        'J.P. Morgan': '小摩', 'Citi': '花旗', 'HSBC': '滙豐', 'UBS': '瑞銀', 'Macquarie': '麥格理',
+        'CLSA': '里昂', 'Jefferies': '富瑞',
+    }
+    METADATA_SAVE_BATCH = 200  # 報告中繼資料累積多少筆新紀錄時寫入資料庫
+    COPY_PROGRESS_DB = os.path.join(DATA_DIR, 'copy_progress.db')  # 複製進度紀錄（續傳用）
+    LEDGER_SKIP_STATUS = 'landed'  # 達到此狀態的報告不再點擊（檔案已落地）
+    LEDGER_HOT_DAYS = 70  # 載入記憶體的下載紀錄天數
+    PLAN_MAX_ATTEMPTS = 3  # 單一檔案最多點擊嘗試次數
+    PLAN_RETRY_BACKOFF = 0.2  # 重試的基本退避時間（每次加倍）
+    DOWNLOAD_LAND_TIMEOUT = 30  # 點擊後等待檔案落地的秒數，逾時重新排入計畫
+    TAB_CLOSE_BATCH = 5  # 已落地的分頁累積到此數量時關閉
+    COPY_MAX_WORKERS = 8  # 複製檔案的工作執行緒上限
+    COPY_PER_TARGET_LIMIT = 4  # 每個目標資料夾的同時複製上限
+    COPY_EXTRA_TARGETS = []  # 額外的複製目標資料夾（例如封存 NAS），來源不會因此多讀一次
+    DOWNLOAD_MODE = 'mouse'  # 下載模式：'mouse'=滑鼠雙擊, 'keyboard'=鍵盤逐項開啟
+    KEYBOARD_OPEN_KEY = 'enter'  # 鍵盤模式下開啟項目的按鍵
+    WAIT_STATS_FILE = os.path.join(DATA_DIR, 'wait_stats.json')  # 各步驟等待延遲紀錄
+    WAIT_DEFAULT_TIMEOUT = 5  # 樣本不足時的等待逾時
+    WAIT_MIN_TIMEOUT = 0.5  # 自動調整逾時的下限
+    WAIT_MAX_TIMEOUT = 15  # 自動調整逾時的上限
+    WAIT_SAFETY_FACTOR = 1.5  # 逾時 = P95 延遲 × 安全係數
+    WAIT_SAMPLE_SIZE = 50  # 每個步驟保留的延遲樣本數
+    WAIT_MIN_SAMPLES = 5  # 開始自動調整逾時所需的樣本數
+    # 各時間點距今天數
+    HORIZON_DAYS = {
+        '今日': 0, '昨日': 1, '1週前': 7, '2週前': 14, '3週前': 21,
+        '4週前': 28, '5週前': 35, '6週前': 42, '7週前': 49, '8週前': 56
+    }
+    # 列表近似比對
+    FUZZY_NGRAM_SIZE = 2  # 字元 n-gram 長度
+    FUZZY_MATCH_THRESHOLD = 0.6  # 相似度下限（Dice 係數）
+    FUZZY_MATCH_LIMIT = 3  # 每個檔案列出的近似項目數
 
     @staticmethod
     def get_schedule_times():
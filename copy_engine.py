@@ -0,0 +1,321 @@
+"""
+檔案複製引擎
+功能: 以有限數量的工作執行緒平行複製檔案到一個或多個目標資料夾，並可在中斷後續傳
+職責:
+- 全域工作執行緒上限，以及每個目標資料夾各自的同時複製上限
+- 多個目標時來源只讀取一次，以可重用的緩衝區同時寫入所有目標
+- 目標已存在且大小、修改時間相同的檔案直接略過
+- 邊複製邊計算 SHA-256，先寫入暫存檔再改名，避免留下不完整的檔案
+- 將完成的複製記錄在本機 SQLite，中斷後重新執行時從未完成處繼續
+- 提供本機資料夾之間的效能測試 (python copy_engine.py 來源 目標)
+依賴: config.py, utils.py
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from utils import debug_print
+
+# 複製工作：來源檔案完整路徑、目標資料夾列表
+CopyJob = namedtuple('CopyJob', ['source', 'target_dirs'])
+
+# 單一目標的複製結果
+# status: 'copied' | 'skipped' | 'failed'
+CopyResult = namedtuple('CopyResult', ['job', 'target_dir', 'status', 'size', 'seconds', 'sha256', 'error'])
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _same_file(source_stat, target_path):
+    """目標是否已存在且大小、修改時間與來源相同（網路磁碟的時間精度只到 2 秒）"""
+    try:
+        target_stat = os.stat(target_path)
+    except OSError:
+        return False
+    return (target_stat.st_size == source_stat.st_size and
+            abs(target_stat.st_mtime - source_stat.st_mtime) < 2)
+
+
+class CopyProgress:
+    """已完成複製的紀錄（跨執行保存，供續傳使用）"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.COPY_PROGRESS_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS copies (
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT,
+                copied_at REAL NOT NULL,
+                PRIMARY KEY (source, target)
+            )
+        """)
+        self._conn.commit()
+
+    def is_done(self, source, target, source_stat):
+        """來源未變更且先前已複製完成"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime FROM copies WHERE source = ? AND target = ?", (source, target)
+            ).fetchone()
+        return row is not None and row[0] == source_stat.st_size and row[1] == source_stat.st_mtime
+
+    def record(self, source, target, source_stat, sha256):
+        """記錄複製完成"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO copies (source, target, size, mtime, sha256, copied_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (source, target, source_stat.st_size, source_stat.st_mtime, sha256, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CopyEngine:
+    """平行、可續傳的檔案複製引擎"""
+
+    def __init__(self, max_workers=None, per_target_limit=None, progress=None, verify_existing=True):
+        """
+        Args:
+            max_workers: 工作執行緒上限
+            per_target_limit: 每個目標資料夾的同時複製上限
+            progress: CopyProgress，None 時使用預設資料庫；False 時不記錄
+            verify_existing: 是否以大小、修改時間比對略過已存在的目標檔案
+        """
+        self.max_workers = max_workers or Config.COPY_MAX_WORKERS
+        self.per_target_limit = per_target_limit or Config.COPY_PER_TARGET_LIMIT
+        self.progress = CopyProgress() if progress is None else (progress or None)
+        self.verify_existing = verify_existing
+        self._target_slots = {}  # {目標資料夾: BoundedSemaphore}
+        self._created_dirs = set()  # 本次已確認存在的目標資料夾
+        self._lock = threading.Lock()
+
+    def _slot(self, target_dir):
+        """取得目標資料夾的同時複製上限"""
+        with self._lock:
+            slot = self._target_slots.get(target_dir)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_target_limit)
+                self._target_slots[target_dir] = slot
+            return slot
+
+    def _ensure_dir(self, target_dir):
+        """確認目標資料夾存在（每次執行只檢查一次）"""
+        with self._lock:
+            if target_dir in self._created_dirs:
+                return
+        if not os.path.isdir(target_dir):
+            os.makedirs(target_dir, exist_ok=True)
+            debug_print(f"已建立目標資料夾: {target_dir}", color='light_green')
+        with self._lock:
+            self._created_dirs.add(target_dir)
+
+    def copy_one(self, job):
+        """
+        複製單一來源到所有目標（在工作執行緒中執行）
+        返回: [CopyResult, ...]，每個目標一筆
+        """
+        start = time.monotonic()
+        name = os.path.basename(job.source)
+        results = []
+
+        def result(target_dir, status, size=0, sha256=None, error=None):
+            results.append(CopyResult(job, target_dir, status, size, time.monotonic() - start, sha256, error))
+
+        try:
+            source_stat = os.stat(job.source)
+        except OSError as e:
+            for target_dir in job.target_dirs:
+                result(target_dir, 'failed', error=str(e))
+            return results
+
+        # 先排除已完成的目標，剩下的才需要寫入
+        pending = []
+        for target_dir in job.target_dirs:
+            target = os.path.join(target_dir, name)
+            if self.progress and self.progress.is_done(job.source, target, source_stat) and os.path.exists(target):
+                result(target_dir, 'skipped', source_stat.st_size)
+            else:
+                pending.append(target_dir)
+        if not pending:
+            return results
+
+        # 依固定順序取得各目標的名額，避免多個工作互相等待
+        slots = [self._slot(target_dir) for target_dir in sorted(set(pending))]
+        for slot in slots:
+            slot.acquire()
+        try:
+            writes = []
+            for target_dir in pending:
+                target = os.path.join(target_dir, name)
+                try:
+                    self._ensure_dir(target_dir)
+                    if self.verify_existing and _same_file(source_stat, target):
+                        if self.progress:
+                            self.progress.record(job.source, target, source_stat, None)
+                        result(target_dir, 'skipped', source_stat.st_size)
+                    else:
+                        writes.append(target_dir)
+                except Exception as e:
+                    result(target_dir, 'failed', error=str(e))
+
+            if writes:
+                sha256, errors = self._fan_out_copy(job.source, [os.path.join(d, name) for d in writes])
+                for target_dir in writes:
+                    target = os.path.join(target_dir, name)
+                    if target in errors:
+                        result(target_dir, 'failed', error=errors[target])
+                        continue
+                    if self.progress:
+                        self.progress.record(job.source, target, source_stat, sha256)
+                    result(target_dir, 'copied', source_stat.st_size, sha256)
+        finally:
+            for slot in reversed(slots):
+                slot.release()
+        return results
+
+    def _fan_out_copy(self, source, targets):
+        """
+        讀取來源一次，將每個區塊同時寫入所有目標的暫存檔，完成後改名並保留時間戳記
+        單一目標寫入失敗時只放棄該目標，其餘目標繼續
+        返回: (SHA-256, {失敗的目標路徑: 錯誤訊息})
+        """
+        digest = hashlib.sha256()
+        errors = {}
+        outputs = {}  # {目標路徑: 暫存檔}
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+
+        def abandon(target, error):
+            errors[target] = str(error)
+            handle = outputs.pop(target, None)
+            try:
+                if handle:
+                    handle.close()
+                os.remove(target + '.part')
+            except OSError:
+                pass
+
+        try:
+            for target in targets:
+                try:
+                    outputs[target] = open(target + '.part', 'wb')
+                except OSError as e:
+                    errors[target] = str(e)
+
+            with open(source, 'rb') as src:
+                while outputs:
+                    size = src.readinto(buffer)
+                    if not size:
+                        break
+                    chunk = view[:size]
+                    digest.update(chunk)
+                    for target, handle in list(outputs.items()):
+                        try:
+                            handle.write(chunk)
+                        except OSError as e:
+                            abandon(target, e)
+
+            for target, handle in list(outputs.items()):
+                try:
+                    handle.close()
+                    shutil.copystat(source, target + '.part')
+                    os.replace(target + '.part', target)
+                except OSError as e:
+                    abandon(target, e)
+        except Exception as e:
+            # 來源讀取失敗：所有尚未完成的目標都放棄
+            for target in list(outputs):
+                abandon(target, e)
+            for target in targets:
+                errors.setdefault(target, str(e))
+        return digest.hexdigest(), errors
+
+    def run(self, jobs, on_done=None):
+        """
+        平行執行所有複製工作
+        on_done: callable(CopyResult)，每個工作完成時呼叫（在工作執行緒中）
+        返回: [CopyResult, ...]，依 jobs 順序，每個工作的每個目標一筆
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+
+        def run_job(job):
+            job_results = self.copy_one(job)
+            if on_done:
+                for result in job_results:
+                    try:
+                        on_done(result)
+                    except Exception as e:
+                        debug_print(f"複製完成通知處理時發生錯誤: {str(e)}", color='light_red')
+            return job_results
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = [result for job_results in executor.map(run_job, jobs) for result in job_results]
+        elapsed = time.monotonic() - start
+
+        copied = [r for r in results if r.status == 'copied']
+        copied_bytes = sum(r.size for r in copied)
+        debug_print(f"複製完成: {len(copied)} 個複製、"
+                    f"{sum(1 for r in results if r.status == 'skipped')} 個略過、"
+                    f"{sum(1 for r in results if r.status == 'failed')} 個失敗，"
+                    f"耗時 {elapsed:.2f} 秒（{copied_bytes / 1024 / 1024 / max(elapsed, 1e-6):.1f} MB/s）",
+                    color='light_blue')
+        return results
+
+
+def benchmark(source_dir, target_dir, worker_counts=(1, 4, 8)):
+    """
+    本機資料夾之間的複製效能測試：
+    以不同工作執行緒數量複製 source_dir 的所有檔案到 target_dir 底下的暫存資料夾
+    """
+    sources = [os.path.join(source_dir, name) for name in sorted(os.listdir(source_dir))
+               if os.path.isfile(os.path.join(source_dir, name))]
+    total_size = sum(os.path.getsize(path) for path in sources)
+    debug_print(f"測試檔案: {len(sources)} 個，共 {total_size / 1024 / 1024:.1f} MB", color='light_cyan')
+
+    timings = {}
+    for workers in worker_counts:
+        run_dir = tempfile.mkdtemp(prefix=f'copy_bench_{workers}_', dir=target_dir)
+        try:
+            engine = CopyEngine(max_workers=workers, per_target_limit=workers, progress=False)
+            start = time.monotonic()
+            engine.run(CopyJob(path, (run_dir,)) for path in sources)
+            timings[workers] = time.monotonic() - start
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    baseline = timings.get(worker_counts[0])
+    for workers, seconds in timings.items():
+        speedup = baseline / seconds if baseline and seconds else 0
+        debug_print(f"{workers} 個工作執行緒: {seconds:.2f} 秒（{speedup:.1f} 倍）", color='light_green')
+    return timings
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("用法: python copy_engine.py <來源資料夾> <目標資料夾> [工作執行緒數量...]")
+        sys.exit(1)
+    counts = tuple(int(n) for n in sys.argv[3:]) or (1, 4, 8)
+    benchmark(sys.argv[1], sys.argv[2], counts)
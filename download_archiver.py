@@ -0,0 +1,275 @@
+"""
+下載資料夾封存模組
+功能: 將下載資料夾中超過 N 天的檔案移入封存，讓日常掃描只需處理近期檔案
+職責:
+- 依建立日期移入 archive/{YYYY-MM} 子資料夾，或壓縮到 archive/{YYYY-MM}.zip
+- 同步軟體的中繼資料 (sync.ffs_db 等) 與下載中的暫存檔不封存
+- 以 SQLite 記錄每個封存檔案的位置，依檔名即可找到封存後的檔案
+- 封存後同步更新資料夾索引與報告目錄
+- 每日封存：每個資料夾每天最多執行一次，在背景執行緒進行，不阻塞監控與下載
+- 命令列執行 (python download_archiver.py [--days N] [--zip]，或 --find 檔名)
+依賴: config.py, utils.py, folder_index.py, report_catalog.py, filename_utils.py
+"""
+
+import argparse
+import fnmatch
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from config import Config
+from utils import debug_print
+from folder_index import get_folder_index
+from report_catalog import get_report_catalog
+from filename_utils import is_temp_file
+
+# 封存紀錄：原檔名、封存位置（資料夾或 zip 檔）、在封存中的名稱、大小、建立時間、修改時間、封存時間
+ArchivedFile = namedtuple('ArchivedFile', ['name', 'archive_path', 'member', 'size', 'ctime', 'mtime', 'archived_at'])
+
+def should_keep(name):
+    """是否應留在下載資料夾（同步中繼資料與下載中的暫存檔）"""
+    if is_temp_file(name):
+        return True
+    lowered = name.lower()
+    return any(fnmatch.fnmatch(lowered, pattern.lower()) for pattern in Config.ARCHIVE_KEEP_PATTERNS)
+
+
+def _unique_name(name, is_taken):
+    """不重複的封存名稱（同名時加上 (n)）"""
+    stem, extension = os.path.splitext(name)
+    candidate = name
+    counter = 1
+    while is_taken(candidate):
+        candidate = f"{stem} ({counter}){extension}"
+        counter += 1
+    return candidate
+
+
+class DownloadArchiver:
+    """下載資料夾封存"""
+
+    def __init__(self, folder_path=None, db_path=None):
+        self.folder_path = folder_path or Config.DOWNLOAD_FOLDER
+        self.archive_root = os.path.join(self.folder_path, Config.ARCHIVE_SUBFOLDER)
+        self.db_path = db_path or Config.FOLDER_INDEX_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS archived (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                archive_path TEXT NOT NULL,
+                member TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                ctime REAL NOT NULL,
+                mtime REAL NOT NULL,
+                archived_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_name ON archived(folder, name)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive_runs (
+                folder TEXT PRIMARY KEY,
+                run_date TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def candidates(self, days):
+        """建立日期早於 days 天前、可封存的檔案（取自資料夾索引，不需走訪資料夾）"""
+        cutoff = datetime.now().date() - timedelta(days=days)
+        index = get_folder_index(self.folder_path)
+        return index.select(lambda entry: datetime.fromtimestamp(entry.ctime).date() < cutoff
+                            and not should_keep(entry.name))
+
+    def archive(self, days=None, compress=None):
+        """
+        封存舊檔案
+        Args:
+            days: 保留最近幾天的檔案（預設 Config.ARCHIVE_AFTER_DAYS）
+            compress: True 時壓縮到每月 zip 檔，False 時移入每月子資料夾（預設 Config.ARCHIVE_COMPRESS）
+        返回: 封存的檔案數
+        """
+        days = Config.ARCHIVE_AFTER_DAYS if days is None else days
+        compress = Config.ARCHIVE_COMPRESS if compress is None else compress
+        entries = self.candidates(days)
+        if not entries:
+            return 0
+
+        start = time.monotonic()
+        by_month = {}
+        for entry in entries:
+            by_month.setdefault(datetime.fromtimestamp(entry.ctime).strftime('%Y-%m'), []).append(entry)
+
+        archived = []
+        for month, month_entries in sorted(by_month.items()):
+            try:
+                if compress:
+                    archived.extend(self._archive_to_zip(month, month_entries))
+                else:
+                    archived.extend(self._archive_to_folder(month, month_entries))
+            except Exception as e:
+                debug_print(f"封存 {month} 的檔案時發生錯誤: {str(e)}", color='light_red')
+
+        self._record(archived)
+        debug_print(f"已封存 {len(archived)} 個 {days} 天前的檔案，耗時 {time.monotonic() - start:.2f} 秒",
+                    color='light_green')
+        return len(archived)
+
+    def last_run(self):
+        """最近一次每日封存的日期（未執行過時返回 None）"""
+        with self._lock:
+            row = self._conn.execute("SELECT run_date FROM archive_runs WHERE folder = ?",
+                                     (self.folder_path,)).fetchone()
+        return date.fromisoformat(row[0]) if row else None
+
+    def archive_if_due(self):
+        """
+        每日封存：今天尚未執行過時封存舊檔案並記錄日期
+        返回: 封存的檔案數；今天已執行過或未啟用封存時返回 None
+        """
+        today = datetime.now().date()
+        if not Config.ARCHIVE_AFTER_DAYS or self.last_run() == today:
+            return None
+        count = self.archive()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO archive_runs (folder, run_date) VALUES (?, ?)",
+                               (self.folder_path, today.isoformat()))
+            self._conn.commit()
+        return count
+
+    def _archive_to_folder(self, month, entries):
+        """移入 archive/{YYYY-MM} 子資料夾（同一磁碟內只是改名）"""
+        target_dir = os.path.join(self.archive_root, month)
+        os.makedirs(target_dir, exist_ok=True)
+        archived = []
+        for entry in entries:
+            member = _unique_name(entry.name, lambda name: os.path.exists(os.path.join(target_dir, name)))
+            try:
+                shutil.move(os.path.join(self.folder_path, entry.name), os.path.join(target_dir, member))
+            except OSError as e:
+                debug_print(f"封存檔案失敗: {entry.name}, 錯誤: {str(e)}", color='light_red')
+                continue
+            archived.append((entry, target_dir, member))
+        return archived
+
+    def _archive_to_zip(self, month, entries):
+        """壓縮到 archive/{YYYY-MM}.zip，寫入完成後才刪除原檔"""
+        os.makedirs(self.archive_root, exist_ok=True)
+        zip_path = os.path.join(self.archive_root, f"{month}.zip")
+        written = []
+        with zipfile.ZipFile(zip_path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            taken = set(archive.namelist())
+            for entry in entries:
+                member = _unique_name(entry.name, taken.__contains__)
+                try:
+                    archive.write(os.path.join(self.folder_path, entry.name), member)
+                except OSError as e:
+                    debug_print(f"壓縮檔案失敗: {entry.name}, 錯誤: {str(e)}", color='light_red')
+                    continue
+                taken.add(member)
+                written.append((entry, zip_path, member))
+
+        archived = []
+        for entry, archive_path, member in written:
+            try:
+                os.remove(os.path.join(self.folder_path, entry.name))
+            except OSError as e:
+                debug_print(f"刪除已壓縮的檔案失敗: {entry.name}, 錯誤: {str(e)}", color='light_red')
+                continue
+            archived.append((entry, archive_path, member))
+        return archived
+
+    def _record(self, archived):
+        """記錄封存位置，並更新資料夾索引與報告目錄"""
+        if not archived:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO archived (folder, name, archive_path, member, size, ctime, mtime, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(self.folder_path, entry.name, archive_path, member, entry.size, entry.ctime, entry.mtime, now)
+                 for entry, archive_path, member in archived]
+            )
+            self._conn.commit()
+
+        index = get_folder_index(self.folder_path)
+        catalog = get_report_catalog()
+        for entry, archive_path, member in archived:
+            index.remove_file(entry.name)
+            catalog.remove(self.folder_path, entry.name)
+        catalog.add_many((archive_path, member, 'archive', entry.size, entry.mtime)
+                         for entry, archive_path, member in archived)
+
+    def find(self, name):
+        """依原檔名查詢封存位置（最新的在前）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, archive_path, member, size, ctime, mtime, archived_at FROM archived "
+                "WHERE folder = ? AND name = ? ORDER BY archived_at DESC",
+                (self.folder_path, name)
+            ).fetchall()
+        return [ArchivedFile(*row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 背景每日封存的執行緒
+_archive_thread = None
+_archive_thread_lock = threading.Lock()
+
+
+def _run_daily_archive(folder_path):
+    archiver = DownloadArchiver(folder_path)
+    try:
+        archiver.archive_if_due()
+    except Exception as e:
+        debug_print(f"封存舊檔案時發生錯誤: {str(e)}", color='light_red')
+    finally:
+        archiver.close()
+
+
+def start_daily_archive(folder_path=None):
+    """
+    在背景執行每日封存（今天已封存過時只檢查日期，不走訪檔案）
+    返回: 背景執行緒；上一次的封存仍在進行時返回該執行緒
+    """
+    global _archive_thread
+    with _archive_thread_lock:
+        if _archive_thread is not None and _archive_thread.is_alive():
+            return _archive_thread
+        _archive_thread = threading.Thread(target=_run_daily_archive, args=(folder_path,),
+                                           name='daily-archive', daemon=True)
+        _archive_thread.start()
+        return _archive_thread
+
+
+def main(argv=None):
+    """命令列介面"""
+    parser = argparse.ArgumentParser(prog='download_archiver.py', description='下載資料夾封存')
+    parser.add_argument('--days', type=int, default=None, help='保留最近 N 天的檔案')
+    parser.add_argument('--zip', action='store_true', help='壓縮到每月 zip 檔')
+    parser.add_argument('--find', metavar='檔名', help='查詢檔案的封存位置')
+    args = parser.parse_args(argv)
+
+    archiver = DownloadArchiver()
+    if args.find:
+        for archived in archiver.find(args.find):
+            debug_print(f"{archived.archive_path} -> {archived.member}", color='light_green')
+        return 0
+    archiver.archive(args.days, compress=args.zip or None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
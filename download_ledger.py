@@ -0,0 +1,187 @@
+"""
+下載紀錄模組
+功能: 將已下載的報告保存在本機 SQLite 資料庫，跨執行保留
+職責:
+- 以 (列表類型, 報告名稱, 日曆日期) 為鍵記錄 clicked / landed / copied 狀態
+- 啟動時將近期紀錄載入記憶體，建立點擊佇列前可 O(1) 查詢
+- 使用 WAL 模式，讓下載與複製流程可同時寫入
+依賴: config.py, utils.py
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from config import Config
+from utils import debug_print
+
+# 狀態順序：數字越大代表流程越後段
+STATUS_ORDER = {'clicked': 1, 'landed': 2, 'copied': 3}
+
+
+def horizon_to_date(horizon):
+    """將時間點名稱（今日、昨日、1週前...）轉換為日曆日期，未知時返回 None"""
+    if horizon not in Config.HORIZON_DAYS:
+        return None
+    return datetime.now().date() - timedelta(days=Config.HORIZON_DAYS[horizon])
+
+
+def date_to_horizon(calendar_date, today=None):
+    """將日曆日期轉換為時間點名稱，不對應任何時間點時返回 None"""
+    if not calendar_date:
+        return None
+    days = ((today or datetime.now().date()) - calendar_date).days
+    for horizon, horizon_days in Config.HORIZON_DAYS.items():
+        if horizon_days == days:
+            return horizon
+    return None
+
+
+def _date_key(calendar_date):
+    """日曆日期轉為資料庫鍵值，未知日期以空字串表示"""
+    return calendar_date.strftime('%Y-%m-%d') if calendar_date else ''
+
+
+class DownloadLedger:
+    """跨執行保存的下載紀錄"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.LEDGER_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                list_type TEXT NOT NULL,
+                report_name TEXT NOT NULL,
+                calendar_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                clicked_at REAL,
+                landed_at REAL,
+                copied_at REAL,
+                file_name TEXT,
+                PRIMARY KEY (list_type, report_name, calendar_date)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_downloads_file ON downloads(file_name)")
+        self._conn.commit()
+
+        # 記憶體熱集合：{(list_type, report_name, calendar_date): status}
+        self._hot = {}
+        # 不分日期的索引：{(list_type, report_name): 最高狀態}
+        self._hot_any_date = {}
+        self._load_hot_set()
+
+    def _load_hot_set(self):
+        """載入近期紀錄到記憶體"""
+        since = _date_key(datetime.now().date() - timedelta(days=Config.LEDGER_HOT_DAYS))
+        rows = self._conn.execute(
+            "SELECT list_type, report_name, calendar_date, status FROM downloads "
+            "WHERE calendar_date >= ? OR calendar_date = ''", (since,)
+        ).fetchall()
+        for list_type, report_name, calendar_date, status in rows:
+            self._remember(list_type, report_name, calendar_date, status)
+        debug_print(f"已載入 {len(rows)} 筆下載紀錄", color='light_blue')
+
+    def _remember(self, list_type, report_name, date_key, status):
+        """更新記憶體熱集合"""
+        key = (list_type, report_name, date_key)
+        if STATUS_ORDER[status] >= STATUS_ORDER.get(self._hot.get(key), 0):
+            self._hot[key] = status
+        any_key = (list_type, report_name)
+        if STATUS_ORDER[status] >= STATUS_ORDER.get(self._hot_any_date.get(any_key), 0):
+            self._hot_any_date[any_key] = status
+
+    def get_status(self, list_type, report_name, calendar_date=None):
+        """查詢報告狀態；calendar_date 為 None 時不分日期取最高狀態"""
+        with self._lock:
+            if calendar_date is None:
+                return self._hot_any_date.get((list_type, report_name))
+            return self._hot.get((list_type, report_name, _date_key(calendar_date)))
+
+    def is_done(self, list_type, report_name, calendar_date=None, min_status=None):
+        """報告是否已達到指定狀態（預設為 Config.LEDGER_SKIP_STATUS）"""
+        status = self.get_status(list_type, report_name, calendar_date)
+        if status is None:
+            return False
+        return STATUS_ORDER[status] >= STATUS_ORDER[min_status or Config.LEDGER_SKIP_STATUS]
+
+    def mark(self, status, list_type, report_name, calendar_date=None, file_name=None):
+        """記錄報告狀態，狀態只會往後推進"""
+        date_key = _date_key(calendar_date)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(f"""
+                INSERT INTO downloads (list_type, report_name, calendar_date, status, {status}_at, file_name)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(list_type, report_name, calendar_date) DO UPDATE SET
+                    status = CASE WHEN ? > (CASE downloads.status
+                                             WHEN 'clicked' THEN 1 WHEN 'landed' THEN 2 WHEN 'copied' THEN 3
+                                             ELSE 0 END)
+                                  THEN excluded.status ELSE downloads.status END,
+                    {status}_at = excluded.{status}_at,
+                    file_name = COALESCE(excluded.file_name, downloads.file_name)
+            """, (list_type, report_name, date_key, status, now, file_name, STATUS_ORDER[status]))
+            self._conn.commit()
+            self._remember(list_type, report_name, date_key, status)
+
+    def mark_clicked(self, list_type, report_name, calendar_date=None):
+        """記錄報告已點擊"""
+        self.mark('clicked', list_type, report_name, calendar_date)
+
+    def mark_landed(self, list_type, report_name, calendar_date=None, file_name=None):
+        """記錄報告檔案已落地到下載資料夾"""
+        self.mark('landed', list_type, report_name, calendar_date, file_name)
+
+    def mark_copied(self, file_name):
+        """依檔名記錄報告已複製到目標位置"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT list_type, report_name, calendar_date FROM downloads WHERE file_name = ?",
+                (file_name,)
+            ).fetchall()
+            if not rows:
+                return 0
+            self._conn.execute(
+                "UPDATE downloads SET status = 'copied', copied_at = ? WHERE file_name = ?",
+                (now, file_name)
+            )
+            self._conn.commit()
+            for list_type, report_name, date_key in rows:
+                self._remember(list_type, report_name, date_key, 'copied')
+            return len(rows)
+
+    def find_by_file(self, file_name):
+        """
+        依檔名取得下載紀錄
+        返回: [(列表類型, 報告名稱, 日曆日期, 點擊時間, 落地時間, 複製時間), ...]，日期未知時為空字串
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT list_type, report_name, calendar_date, clicked_at, landed_at, copied_at "
+                "FROM downloads WHERE file_name = ?",
+                (file_name,)
+            ).fetchall()
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全域下載紀錄
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_download_ledger():
+    """取得全域下載紀錄（第一次使用時開啟資料庫）"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = DownloadLedger()
+        return _ledger
@@ -0,0 +1,130 @@
+"""
+下載清單模組
+功能: 每日在每日研究報告任務資料夾旁寫入 JSON Lines 清單，列出當日發佈的報告
+職責:
+- 每個發佈完成的檔案寫入一行：檔名、大小、SHA-256、來源列表與時間點、點擊／落地／複製時間
+- 每行以單次附加寫入並立即 flush，讀取端只需處理以換行結尾的完整行
+- 同一檔案只寫入一次（開啟時讀取既有清單，重新執行也不會重複）
+- 下游只需追蹤這個小檔案，不必反覆列出共用雲端硬碟上的資料夾
+依賴: utils.py, download_ledger.py
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from utils import debug_print
+from download_ledger import get_download_ledger, date_to_horizon
+
+
+def _iso(timestamp):
+    """時間戳記轉為 ISO 8601 字串，沒有時返回 None"""
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def _file_sha256(path):
+    """計算本機檔案的 SHA-256（複製時略過、沒有計算雜湊的檔案使用）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path(daily_dir):
+    """每日資料夾對應的清單路徑，例如 每日研究報告任務/20241015.manifest.jsonl"""
+    daily_dir = daily_dir.rstrip('\\/')
+    return os.path.join(os.path.dirname(daily_dir), os.path.basename(daily_dir) + '.manifest.jsonl')
+
+
+class DownloadManifest:
+    """單日的發佈清單"""
+
+    def __init__(self, daily_dir):
+        self.path = manifest_path(daily_dir)
+        self._lock = threading.Lock()
+        self._written = set()  # 已寫入清單的檔名
+        self._load()
+
+    def _load(self):
+        """讀取既有清單中的檔名（最後一行不完整時忽略）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break
+                    try:
+                        self._written.add(json.loads(line)['file'])
+                    except (ValueError, KeyError):
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            debug_print(f"讀取下載清單時發生錯誤: {str(e)}", color='light_red')
+
+    def __contains__(self, file):
+        with self._lock:
+            return file in self._written
+
+    def build_entry(self, file, source, results):
+        """
+        建立單一檔案的清單內容
+        Args:
+            file: 檔名
+            source: 下載資料夾中的來源路徑
+            results: 此檔案各目標的 CopyResult
+        """
+        stat = os.stat(source)
+        sha256 = next((result.sha256 for result in results if result.sha256), None) or _file_sha256(source)
+        records = get_download_ledger().find_by_file(file)
+        sources = []
+        clicked_at = landed_at = copied_at = None
+        for list_type, report_name, date_key, clicked, landed, copied in records:
+            calendar_date = datetime.strptime(date_key, '%Y-%m-%d').date() if date_key else None
+            click_day = datetime.fromtimestamp(clicked).date() if clicked else None
+            sources.append({
+                'list_type': list_type,
+                'report_name': report_name,
+                'calendar_date': date_key or None,
+                'horizon': date_to_horizon(calendar_date, click_day),
+            })
+            clicked_at = min(filter(None, (clicked_at, clicked)), default=None)
+            landed_at = min(filter(None, (landed_at, landed)), default=None)
+            copied_at = max(filter(None, (copied_at, copied)), default=None)
+        return {
+            'file': file,
+            'size': stat.st_size,
+            'sha256': sha256,
+            'sources': sources,
+            'clicked_at': _iso(clicked_at),
+            'landed_at': _iso(landed_at or stat.st_mtime),
+            'copied_at': _iso(copied_at) or datetime.now().isoformat(timespec='seconds'),
+            'targets': [result.target_dir for result in results if result.status != 'failed'],
+        }
+
+    def append(self, file, source, results):
+        """將已發佈的檔案附加到清單（已寫入時略過），返回是否寫入"""
+        if file in self:
+            return False
+        try:
+            line = json.dumps(self.build_entry(file, source, results), ensure_ascii=False) + '\n'
+        except Exception as e:
+            debug_print(f"建立下載清單內容時發生錯誤: {file}, 錯誤: {str(e)}", color='light_red')
+            return False
+
+        with self._lock:
+            if file in self._written:
+                return False
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                # 整行一次寫入，讀取端不會看到半行加上下一行的內容
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                debug_print(f"寫入下載清單時發生錯誤: {str(e)}", color='light_red')
+                return False
+            self._written.add(file)
+        return True
@@ -0,0 +1,210 @@
+"""
+下載計畫模組
+功能: 在下載前一次計算好點擊順序、列表邊界與切換點，並管理失敗重試
+職責:
+- 依列表順序排列待下載項目，預先記錄每個列表的起訖位置
+- 點擊失敗的項目進入重試佇列，記錄嘗試次數並以指數退避重試
+- 重試就地進行，不需要重新走訪全部列表
+- 下載政策：點擊前以複製時相同的排除規則篩選報告名稱，各時間點可設定仍要下載的類別
+依賴: config.py, control_info.py, exclusion_rules.py, report_metadata.py, utils.py
+"""
+
+import heapq
+import time
+from config import Config
+from control_info import LIST_CONTROLS
+from exclusion_rules import get_exclusion_rules
+from report_metadata import REPORT_TYPE_KEYWORDS, get_report_metadata
+from utils import debug_print
+
+# 例外設定可使用的報告類型（report_metadata 的 report_type）
+REPORT_TYPES = {type_name for type_name, _ in REPORT_TYPE_KEYWORDS} | {'個股', '其他'}
+
+
+class DownloadPolicy:
+    """
+    下載前的篩選：空白名稱與公司資料一律略過；符合排除規則的報告（複製時也會被排除）不點擊，
+    除非規則或報告類型列在該時間點的例外中（Config.DOWNLOAD_POLICY_OVERRIDES）
+
+    例外的值可以是排除規則的文字（例如 'ETF'），或報告類型（例如 '晨會'：名稱含晨訊、晨報、晨會的報告，
+    不論符合的是哪一條規則）
+    """
+
+    def __init__(self, horizon=None, rules=None, overrides=None):
+        self.horizon = horizon
+        self.rules = rules or get_exclusion_rules()
+        overrides = Config.DOWNLOAD_POLICY_OVERRIDES if overrides is None else overrides
+        # '*' 的例外適用於所有時間點
+        self.allowed = set(overrides.get('*', ())) | set(overrides.get(horizon, ()))
+        rule_texts = {rule.text for rule in self.rules.rules}
+        for value in sorted(self.allowed - rule_texts - REPORT_TYPES):
+            debug_print(f"下載例外「{value}」不是排除規則，也不是報告類型，不會生效", color='light_red')
+        self.overridden = {}  # {(列表, 報告名稱): 符合的規則}，符合排除規則但依例外下載
+        self.excluded = {}  # {(列表, 報告名稱): 符合的規則}，依排除規則不下載
+
+    def skip_reason(self, record):
+        """返回略過原因（'空白名稱' | '公司' | '排除'），應下載時返回 None"""
+        if not record.name:
+            return '空白名稱'
+        metadata = get_report_metadata(record.name)
+        if metadata.report_type == '公司':
+            return '公司'
+        if not Config.EXCLUDE_BEFORE_DOWNLOAD:
+            return None
+        # 不計入命中次數：規則命中統計只反映複製時的排除
+        rule = self.rules.match(record.name, count=False)
+        if rule is None:
+            return None
+        if rule.text in self.allowed or metadata.report_type in self.allowed:
+            self.overridden[(record.list_type, record.name)] = rule.text
+            return None
+        self.excluded[(record.list_type, record.name)] = rule.text
+        return '排除'
+
+    def is_overridden(self, record):
+        """項目是否符合排除規則但依例外下載"""
+        return (record.list_type, record.name) in self.overridden
+
+    def log_excluded(self):
+        """依規則輸出下載前略過的報告（方便發現 KS 這類範圍過大的規則誤判）"""
+        by_rule = {}
+        for (_, name), rule in self.excluded.items():
+            by_rule.setdefault(rule, []).append(name)
+        if not by_rule:
+            return
+        debug_print("====== 下載前排除的報告 ======", color='light_cyan')
+        for rule, names in sorted(by_rule.items(), key=lambda entry: (-len(entry[1]), entry[0])):
+            debug_print(f"   規則「{rule}」: {len(names)} 個", color='light_yellow')
+            for name in names:
+                debug_print(f"      {name}", color='light_magenta')
+        debug_print("==============================", color='light_cyan')
+
+
+class PlanItem:
+    """計畫中的單一下載項目"""
+
+    def __init__(self, record, position):
+        self.record = record  # ListItemRecord
+        self.position = position  # 在計畫中的順序
+        self.attempts = 0
+        self.next_try_at = 0.0
+
+    @property
+    def name(self):
+        return self.record.name
+
+    @property
+    def list_type(self):
+        return self.record.list_type
+
+
+class DownloadPlan:
+    """一次下載的完整計畫"""
+
+    def __init__(self, items, skipped=None, max_attempts=None, backoff=None):
+        self.items = items
+        self.skipped = skipped or []
+        self.max_attempts = max_attempts or Config.PLAN_MAX_ATTEMPTS
+        self.backoff = Config.PLAN_RETRY_BACKOFF if backoff is None else backoff
+        self.completed = []
+        self.failed = []
+        self._cursor = 0
+        self._retry_queue = []  # heap: (next_try_at, position, PlanItem)
+        self._completed_positions = set()
+
+        # 每個列表的起訖位置 {list_type: (start, end)}
+        self.list_bounds = {}
+        for item in items:
+            start, _ = self.list_bounds.get(item.list_type, (item.position, item.position))
+            self.list_bounds[item.list_type] = (start, item.position)
+
+    @classmethod
+    def build(cls, snapshot, should_skip=None, **kwargs):
+        """
+        從列表快照建立計畫
+        should_skip: callable(record) -> 略過原因字串或 None
+        """
+        items = []
+        skipped = []
+        for list_type in LIST_CONTROLS:
+            for record in snapshot.items(list_type):
+                reason = should_skip(record) if should_skip else None
+                if reason:
+                    skipped.append((record, reason))
+                else:
+                    items.append(PlanItem(record, len(items)))
+        return cls(items, skipped, **kwargs)
+
+    def __len__(self):
+        return len(self.items)
+
+    def count(self, list_type):
+        """取得指定列表的待下載項目數"""
+        if list_type not in self.list_bounds:
+            return 0
+        start, end = self.list_bounds[list_type]
+        return end - start + 1
+
+    def pending_count(self):
+        """尚未完成也尚未放棄的項目數"""
+        return len(self.items) - self._cursor + len(self._retry_queue)
+
+    def next_item(self):
+        """
+        取得下一個要處理的項目：
+        已到期的重試項目優先，其次為計畫順序中的下一項；
+        計畫順序已處理完但仍有重試項目時，等待最早到期者。
+        全部完成時返回 None。
+        """
+        now = time.monotonic()
+        if self._retry_queue and self._retry_queue[0][0] <= now:
+            return heapq.heappop(self._retry_queue)[2]
+
+        if self._cursor < len(self.items):
+            item = self.items[self._cursor]
+            self._cursor += 1
+            return item
+
+        if self._retry_queue:
+            next_try_at, _, item = heapq.heappop(self._retry_queue)
+            delay = next_try_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            return item
+
+        return None
+
+    def complete(self, item):
+        """標記項目完成；逾時重排後才落地的項目同時移出重試佇列與失敗列表"""
+        if item.position in self._completed_positions:
+            return
+        self._completed_positions.add(item.position)
+        item.attempts += 1
+        self.completed.append(item)
+
+        queued = [entry for entry in self._retry_queue if entry[2] is not item]
+        if len(queued) != len(self._retry_queue):
+            self._retry_queue = queued
+            heapq.heapify(self._retry_queue)
+        if item in self.failed:
+            self.failed.remove(item)
+
+    def is_completed(self, item):
+        """項目是否已完成"""
+        return item.position in self._completed_positions
+
+    def fail(self, item):
+        """
+        標記項目失敗；未達最大嘗試次數時放入重試佇列
+        返回: True=稍後重試, False=已放棄, None=項目已完成（忽略較晚到達的失敗）
+        """
+        if self.is_completed(item):
+            return None
+        item.attempts += 1
+        if item.attempts >= self.max_attempts:
+            self.failed.append(item)
+            return False
+
+        item.next_try_at = time.monotonic() + self.backoff * (2 ** (item.attempts - 1))
+        heapq.heappush(self._retry_queue, (item.next_try_at, item.position, item))
+        return True
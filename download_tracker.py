@@ -0,0 +1,245 @@
+"""
+下載追蹤模組
+功能: 將每個點擊的報告對應到下載資料夾中實際出現的檔案
+職責:
+- 為每個項目維護狀態：clicked → opened → landed（逾時未落地為 lost）
+- 以瀏覽器前景標題判斷分頁已開啟，以資料夾變更通知的新檔案判斷已落地（不再重複走訪資料夾）
+- 處理 .crdownload 暫存檔改名與重複下載的 " (1)" 後綴
+- 記錄分頁順序，只關閉已落地（或已放棄）的分頁
+- 統計點擊到開啟、點擊到落地的延遲
+依賴: config.py, utils.py, filename_utils.py, folder_index.py, folder_watcher.py
+"""
+
+import time
+from collections import deque
+import win32gui
+from config import Config
+from utils import debug_print
+from filename_utils import is_temp_file, normalize_filename, strip_duplicate_suffix, strip_temp_suffix
+from folder_index import get_folder_index
+from folder_watcher import FolderWatcher
+
+CHROME_WINDOW_CLASS = 'Chrome_WidgetWin_1'
+
+def report_key(name, has_extension=False):
+    """計算報告名稱或檔名的比對鍵：移除暫存副檔名與重複後綴後標準化"""
+    name = strip_duplicate_suffix(strip_temp_suffix(name), has_extension)
+    return normalize_filename(name, has_extension).lower()
+
+
+class TrackedDownload:
+    """單一點擊項目的下載狀態"""
+
+    def __init__(self, item, has_tab=True):
+        self.item = item  # PlanItem
+        self.key = report_key(item.name)
+        self.state = 'clicked'
+        self.has_tab = has_tab  # 是否計入可關閉的分頁（第一個分頁保留不關）
+        self.clicked_at = time.monotonic()
+        self.opened_at = None
+        self.landed_at = None
+        self.file_name = None
+
+    @property
+    def name(self):
+        return self.item.name
+
+    @property
+    def is_settled(self):
+        """已落地或已放棄"""
+        return self.state in ('landed', 'lost')
+
+
+class DownloadTracker:
+    """追蹤一輪下載中每個點擊項目的檔案落地情況"""
+
+    def __init__(self, folder_path=None, land_timeout=None):
+        self.folder_path = folder_path or Config.DOWNLOAD_FOLDER
+        self.land_timeout = Config.DOWNLOAD_LAND_TIMEOUT if land_timeout is None else land_timeout
+        self.tracked = []  # 所有追蹤過的項目
+        self._pending = {}  # {key: TrackedDownload}，尚未落地的項目
+        self._tabs = []  # 依開啟順序排列的分頁（TrackedDownload）
+        self._in_progress = set()  # 正在下載（有暫存檔）的比對鍵
+        self._events = deque()  # 監看執行緒送來的 (事件, 檔名)，由 poll() 在呼叫端執行緒處理
+        self._known_files = set()  # 開始追蹤前已存在的檔案不列入比對
+        self._resync()
+        self._last_title = None
+        self.watcher = FolderWatcher(
+            self.folder_path,
+            on_new_file=lambda name: self._events.append(('added', name)),
+            on_removed=lambda name: self._events.append(('removed', name)),
+            on_overflow=lambda: self._events.append(('overflow', None)),
+            on_temp_file=lambda name: self._events.append(('temp', name)),
+        )
+
+    def start(self):
+        """開始監看下載資料夾"""
+        self.watcher.start()
+
+    def stop(self):
+        """停止監看下載資料夾"""
+        self.watcher.stop()
+
+    def _resync(self):
+        """
+        以資料夾索引同步已知檔案與下載中暫存檔（建立時與事件遺失時使用）
+        返回: 上次同步後新出現的檔名
+        """
+        index = get_folder_index(self.folder_path)
+        index.refresh()
+        current = {entry.name for entry in index.select(lambda entry: True)}
+        new_files = current - self._known_files
+        self._known_files = current
+        self._in_progress = {report_key(name, has_extension=True) for name in current if is_temp_file(name)}
+        return new_files
+
+    def track(self, item, has_tab=True):
+        """開始追蹤已點擊的項目"""
+        download = TrackedDownload(item, has_tab)
+        self.tracked.append(download)
+        self._pending[download.key] = download
+        if has_tab:
+            self._tabs.append(download)
+        return download
+
+    def poll(self):
+        """
+        檢查瀏覽器標題與下載資料夾，更新項目狀態
+        返回: 本次新落地的項目列表
+        """
+        self._check_opened()
+        return self._check_landed()
+
+    def _check_opened(self):
+        """前景瀏覽器標題對應到追蹤中的項目時，標記為已開啟"""
+        try:
+            hwnd = win32gui.GetForegroundWindow()
+            if win32gui.GetClassName(hwnd) != CHROME_WINDOW_CLASS:
+                return
+            title = win32gui.GetWindowText(hwnd)
+        except Exception:
+            return
+        if not title or title == self._last_title:
+            return
+        self._last_title = title
+
+        # 瀏覽器標題格式為 "檔名.pdf - Google Chrome"
+        title_key = report_key(title.rsplit(' - ', 1)[0], has_extension=True)
+        download = self._find_pending(title_key)
+        if download is not None and download.state == 'clicked':
+            download.state = 'opened'
+            download.opened_at = time.monotonic()
+
+    def _check_landed(self):
+        """處理監看執行緒送來的資料夾變更，返回新落地的項目"""
+        new_files = []
+        while self._events:
+            event, file_name = self._events.popleft()
+            if event == 'overflow':
+                new_files.extend(self._resync())
+            elif event == 'temp':
+                self._in_progress.add(report_key(file_name, has_extension=True))
+            elif event == 'removed':
+                # 暫存檔消失代表下載已結束（改名或取消）
+                self._known_files.discard(file_name)
+                if is_temp_file(file_name):
+                    self._in_progress.discard(report_key(file_name, has_extension=True))
+            elif file_name not in self._known_files:
+                self._known_files.add(file_name)
+                new_files.append(file_name)
+
+        landed = []
+        for file_name in new_files:
+            if is_temp_file(file_name):
+                continue
+            download = self._find_pending(report_key(file_name, has_extension=True))
+            if download is None:
+                continue
+            download.state = 'landed'
+            download.landed_at = time.monotonic()
+            download.file_name = file_name
+            del self._pending[download.key]
+            landed.append(download)
+        return landed
+
+    def _find_pending(self, key):
+        """依比對鍵尋找尚未落地的項目；完全相同優先，其次為唯一的包含關係"""
+        if not key:
+            return None
+        download = self._pending.get(key)
+        if download is not None:
+            return download
+        candidates = [d for d in self._pending.values() if d.key and (d.key in key or key in d.key)]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def take_overdue(self):
+        """取出點擊後超過逾時仍未落地（且沒有下載中暫存檔）的項目，標記為 lost"""
+        now = time.monotonic()
+        overdue = []
+        for key, download in list(self._pending.items()):
+            if key in self._in_progress:
+                continue
+            if now - download.clicked_at >= self.land_timeout:
+                download.state = 'lost'
+                del self._pending[key]
+                overdue.append(download)
+        return overdue
+
+    def all_settled(self):
+        """所有追蹤中的項目都已落地或已放棄"""
+        return not self._pending
+
+    def closable_tab_count(self):
+        """
+        可安全關閉的分頁數：關閉分頁總是關掉最後開啟的分頁，
+        因此從最後一個分頁往前數，遇到尚未落地的分頁即停止
+        """
+        count = 0
+        for download in reversed(self._tabs):
+            if not download.is_settled:
+                break
+            count += 1
+        return count
+
+    def open_tab_count(self):
+        """尚未關閉的分頁數"""
+        return len(self._tabs)
+
+    def tabs_closed(self, count):
+        """記錄已關閉最後 count 個分頁"""
+        if count > 0:
+            del self._tabs[-count:]
+
+    def summary(self):
+        """統計各狀態數量與延遲（中位數、P95）"""
+        states = {'clicked': 0, 'opened': 0, 'landed': 0, 'lost': 0}
+        for download in self.tracked:
+            states[download.state] += 1
+
+        def percentiles(values):
+            values = sorted(values)
+            if not values:
+                return None, None
+            return values[len(values) // 2], values[min(len(values) - 1, int(len(values) * 0.95))]
+
+        opened = [d.opened_at - d.clicked_at for d in self.tracked if d.opened_at is not None]
+        landed = [d.landed_at - d.clicked_at for d in self.tracked if d.landed_at is not None]
+        return {
+            'states': states,
+            'opened_latency': percentiles(opened),
+            'landed_latency': percentiles(landed),
+        }
+
+    def log_summary(self):
+        """輸出下載追蹤統計"""
+        stats = self.summary()
+        states = stats['states']
+        debug_print("======= 下載追蹤統計 =======", color='light_cyan')
+        debug_print(f"   已落地: {states['landed']} 個", color='light_yellow')
+        debug_print(f"   未落地: {states['clicked'] + states['opened']} 個", color='light_yellow')
+        debug_print(f"   逾時重排: {states['lost']} 個", color='light_yellow')
+        for label, key in (('點擊到開啟', 'opened_latency'), ('點擊到落地', 'landed_latency')):
+            median, p95 = stats[key]
+            if median is not None:
+                debug_print(f"   {label}: 中位數 {median:.2f} 秒, P95 {p95:.2f} 秒", color='light_yellow')
+        debug_print("===========================", color='light_cyan')
@@ -0,0 +1,186 @@
+"""
+排除規則模組
+功能: 從規則檔載入排除規則並編譯，一次比對即可得知檔名是否排除以及符合的規則
+職責:
+- 一般關鍵字以 Aho-Corasick 自動機一次掃描全部比對
+- 需要前後文判斷的規則（例如 JP(?!M)）才使用正則表達式
+- 規則檔修改後自動重新載入
+- 記錄每條規則的命中次數（只計入複製時的排除，下載前的篩選不計入）
+- 下載前（報告名稱）與複製前（檔名）共用同一組規則
+依賴: config.py, utils.py
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from config import Config
+from utils import debug_print
+
+# 排除規則
+# kind: 'keyword' | 'regex'
+Rule = namedtuple('Rule', ['text', 'kind'])
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 自動機：一次掃描找出任一關鍵字"""
+
+    def __init__(self, keywords):
+        """keywords: [(關鍵字, 值), ...]，關鍵字需已轉為小寫"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]  # 每個節點結束的（最長）關鍵字值
+
+        for keyword, value in keywords:
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                node = next_node
+            if self._output[node] is None:
+                self._output[node] = value
+
+        # 以廣度優先建立失敗連結，並繼承失敗節點的輸出
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(char, 0)
+                if self._output[next_node] is None:
+                    self._output[next_node] = self._output[self._fail[next_node]]
+
+    def search(self, text):
+        """返回 (結束位置, 值)，最先完整出現的關鍵字；沒有時返回 None"""
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            if self._output[node] is not None:
+                return position + 1, self._output[node]
+        return None
+
+
+class ExclusionRules:
+    """可熱重載的排除規則"""
+
+    def __init__(self, rules_path=None):
+        self.rules_path = rules_path or Config.EXCLUDE_RULES_FILE
+        self.rules = []
+        self.hits = {}  # {規則文字: 命中次數}
+        self._automaton = None
+        self._regex_rules = []  # [(compiled, Rule)]
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @staticmethod
+    def parse(lines):
+        """解析規則檔內容"""
+        rules = []
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                continue
+            if stripped.startswith('re:'):
+                rules.append(Rule(stripped[3:], 'regex'))
+            elif len(stripped) >= 2 and stripped.startswith('"') and stripped.endswith('"'):
+                rules.append(Rule(stripped[1:-1], 'keyword'))
+            else:
+                rules.append(Rule(stripped, 'keyword'))
+        return rules
+
+    def reload(self):
+        """從規則檔重新載入並編譯規則，失敗時保留原有規則"""
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+            with open(self.rules_path, 'r', encoding='utf-8') as f:
+                rules = self.parse(f)
+            regex_rules = [(re.compile(rule.text, re.IGNORECASE), rule) for rule in rules if rule.kind == 'regex']
+            automaton = KeywordAutomaton([(rule.text.lower(), rule) for rule in rules if rule.kind == 'keyword'])
+        except Exception as e:
+            debug_print(f"載入排除規則時發生錯誤: {str(e)}", color='light_red')
+            return False
+
+        with self._lock:
+            self.rules = rules
+            self._regex_rules = regex_rules
+            self._automaton = automaton
+            self._mtime = mtime
+            for rule in rules:
+                self.hits.setdefault(rule.text, 0)
+        debug_print(f"已載入排除規則 {len(rules)} 條（關鍵字 {len(rules) - len(regex_rules)} 條，正則 {len(regex_rules)} 條）",
+                    color='light_magenta')
+        return True
+
+    def _reload_if_changed(self):
+        """規則檔修改時重新載入（最多每 EXCLUDE_RULES_CHECK_INTERVAL 秒檢查一次）"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + Config.EXCLUDE_RULES_CHECK_INTERVAL
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            debug_print("排除規則檔已修改，重新載入", color='light_magenta')
+            self.reload()
+
+    def match(self, name, count=True):
+        """
+        比對名稱，返回最先完整出現的規則（Rule），不符合任何規則時返回 None
+        count: 是否計入規則的命中次數（下載前的篩選不計入，避免與複製時的統計重複）
+        """
+        self._reload_if_changed()
+        with self._lock:
+            automaton = self._automaton
+            regex_rules = self._regex_rules
+
+        best = automaton.search(name.lower()) if automaton else None
+        for pattern, rule in regex_rules:
+            found = pattern.search(name)
+            if found and (best is None or found.end() < best[0]):
+                best = (found.end(), rule)
+
+        if best is None:
+            return None
+        rule = best[1]
+        if count:
+            with self._lock:
+                self.hits[rule.text] = self.hits.get(rule.text, 0) + 1
+        return rule
+
+    def log_stats(self):
+        """輸出每條規則的命中次數（由多到少）"""
+        with self._lock:
+            hits = sorted(((count, text) for text, count in self.hits.items() if count), reverse=True)
+        debug_print("====== 排除規則命中 ======", color='light_cyan')
+        for count, text in hits:
+            debug_print(f"   {text}: {count} 次", color='light_yellow')
+        debug_print("==========================", color='light_cyan')
+
+
+# 全域排除規則
+_rules = None
+_rules_lock = threading.Lock()
+
+
+def get_exclusion_rules():
+    """取得全域排除規則（第一次使用時載入）"""
+    global _rules
+    with _rules_lock:
+        if _rules is None:
+            _rules = ExclusionRules()
+        return _rules
@@ -0,0 +1,106 @@
+"""
+重複檔案偵測模組
+功能: 發佈到共用位置前找出內容相同的檔案（例如 name.pdf 與 name (1).pdf，或同一報告出現在兩個時間點）
+職責:
+- 先以檔案大小分組（取自資料夾索引，不需讀檔）
+- 大小相同時以記憶體映射讀取開頭與結尾計算快速指紋
+- 快速指紋也相同時才計算完整 SHA-256
+- 指紋快取在資料夾索引中，檔案未變更時不重新讀取
+- 同內容的檔案保留一個（優先保留沒有 (n) 後綴、較早建立的檔案）
+依賴: config.py, utils.py, folder_index.py, filename_utils.py
+"""
+
+import hashlib
+import mmap
+import os
+from config import Config
+from utils import debug_print
+from folder_index import get_folder_index
+from filename_utils import has_duplicate_suffix
+
+
+def _preference(entry):
+    """保留順序：沒有 (n) 後綴者優先，其次是較早建立、檔名較短者"""
+    return (has_duplicate_suffix(entry.name), entry.ctime, len(entry.name), entry.name)
+
+
+class Deduplicator:
+    """以內容指紋找出下載資料夾中的重複檔案"""
+
+    def __init__(self, folder_path=None):
+        self.folder_path = folder_path or Config.DOWNLOAD_FOLDER
+        self.sample_size = Config.DEDUPE_SAMPLE_SIZE
+
+    def _quick_digest(self, entry):
+        """大小 + 開頭與結尾各 sample_size 位元組的雜湊（記憶體映射讀取）"""
+        digest = hashlib.sha256(str(entry.size).encode())
+        with open(os.path.join(self.folder_path, entry.name), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped[:self.sample_size])
+                if entry.size > self.sample_size:
+                    digest.update(mapped[max(self.sample_size, entry.size - self.sample_size):])
+        return digest.hexdigest()
+
+    def _full_digest(self, entry):
+        """完整內容的 SHA-256（記憶體映射讀取）"""
+        with open(os.path.join(self.folder_path, entry.name), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.sha256(mapped).hexdigest()
+
+    def _fingerprint(self, index, entry, kind):
+        """取得指紋（優先使用資料夾索引中的快取）"""
+        digest = index.get_fingerprint(entry, kind)
+        if digest is None:
+            digest = self._quick_digest(entry) if kind == 'quick' else self._full_digest(entry)
+            index.set_fingerprint(entry, kind, digest)
+        return digest
+
+    def _group(self, index, entries, kind):
+        """依指紋分組，只返回有兩個以上檔案的組"""
+        groups = {}
+        for entry in entries:
+            try:
+                groups.setdefault(self._fingerprint(index, entry, kind), []).append(entry)
+            except (OSError, ValueError) as e:
+                debug_print(f"計算檔案指紋時發生錯誤: {entry.name}, 錯誤: {str(e)}", color='light_red')
+        return [group for group in groups.values() if len(group) > 1]
+
+    def _same_content(self, names):
+        """依內容分組：大小 → 快速指紋 → 完整指紋，只返回有兩個以上檔案的組"""
+        index = get_folder_index(self.folder_path)
+        by_size = {}
+        for name in names:
+            entry = index.get(name)
+            if entry is not None and entry.size > 0:
+                by_size.setdefault(entry.size, []).append(entry)
+
+        groups = []
+        for same_size in by_size.values():
+            if len(same_size) < 2:
+                continue
+            for same_quick in self._group(index, same_size, 'quick'):
+                groups.extend(self._group(index, same_quick, 'full'))
+        return groups
+
+    def find_duplicates(self, names):
+        """
+        找出內容重複的檔案
+        返回: {重複的檔名: 保留的檔名}
+        """
+        duplicates = {}
+        for group in self._same_content(names):
+            keep, *others = sorted(group, key=_preference)
+            for entry in others:
+                duplicates[entry.name] = keep.name
+        return duplicates
+
+    def duplicate_of(self, name, published):
+        """
+        新檔案是否與已發佈的檔案內容相同（串流發佈使用）
+        返回: 內容相同的已發佈檔名；沒有時返回 None
+        """
+        for group in self._same_content([name] + [other for other in published if other != name]):
+            others = sorted((entry for entry in group if entry.name != name), key=_preference)
+            if others and len(others) < len(group):
+                return others[0].name
+        return None
@@ -0,0 +1,67 @@
+"""
+檔名處理模組
+功能: 下載檔名的共用規則，供監控、追蹤、封存、去重與報告中繼資料解析共用
+職責:
+- 判斷與移除下載中的暫存檔副檔名（.crdownload / .tmp / .part）
+- 判斷與移除瀏覽器重複下載時加上的 " (n)" 後綴
+- 比對用的檔名標準化（只保留中文、英文、數字）
+依賴: utils.py
+"""
+
+import os
+import re
+from utils import debug_print
+
+# 下載中的暫存檔副檔名（尚未完成，改名為正式檔名前不處理）
+TEMP_SUFFIXES = ('.crdownload', '.tmp', '.part')
+
+# 重複下載時瀏覽器加上的後綴，例如 "報告 (1).pdf"（比對不含副檔名的部分）
+DUPLICATE_SUFFIX = re.compile(r'\s*\(\d+\)$')
+
+
+def is_temp_file(name):
+    """是否為下載中的暫存檔"""
+    return name.lower().endswith(TEMP_SUFFIXES)
+
+
+def strip_temp_suffix(name):
+    """移除暫存檔副檔名（例如 報告.pdf.crdownload → 報告.pdf）"""
+    lowered = name.lower()
+    for suffix in TEMP_SUFFIXES:
+        if lowered.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def strip_duplicate_suffix(name, has_extension=False):
+    """
+    移除重複下載的 " (n)" 後綴
+    has_extension: 是否包含副檔名（檔名為 True，後綴位於副檔名之前）
+    """
+    if has_extension:
+        stem, extension = os.path.splitext(name)
+        return DUPLICATE_SUFFIX.sub('', stem) + extension
+    return DUPLICATE_SUFFIX.sub('', name)
+
+
+def has_duplicate_suffix(name, has_extension=True):
+    """是否帶有重複下載的 " (n)" 後綴"""
+    return strip_duplicate_suffix(name, has_extension) != name
+
+
+def normalize_filename(filename, has_extension=False):
+    """
+    標準化檔名以便比對，只保留中文、英文、數字
+    Args:
+        filename: 要處理的檔名
+        has_extension: 是否包含副檔名，True=需要移除副檔名，False=不需要移除副檔名
+    """
+    try:
+        # 1. 如果有副檔名且需要移除，則移除最後一個點及其後的所有字元
+        name = re.split(r'\.[^.]*$', filename)[0] if has_extension else filename
+        
+        # 2. 移除所有非中英數字元
+        return re.sub(r'[^a-zA-Z0-9\u4e00-\u9fff]+', '', name)
+    except Exception as e:
+        debug_print(f"標準化檔名時發生錯誤: {str(e)}", color='light_red')
+        return filename
@@ -0,0 +1,273 @@
+"""
+資料夾索引模組
+功能: 以 SQLite 保存下載資料夾的檔案索引 (檔名、大小、建立時間、修改時間)，跨執行保留
+職責:
+- 以 os.scandir 走訪資料夾，屬性直接取自目錄讀取結果，不需逐檔呼叫 stat
+- 啟動時比對資料夾修改時間，未變更時不走訪；有變更時只寫入差異
+- 依建立日期建立記憶體索引，查詢「某日建立的檔案」只需 O(結果數)
+- 提供單檔更新介面，讓資料夾變更通知直接維護索引（取得索引時不再重新走訪資料夾）
+- 快取檔案內容指紋（供重複檔案偵測），檔案變更後自動失效
+依賴: config.py, utils.py
+"""
+
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+from config import Config
+from utils import debug_print
+
+# 索引中的單一檔案
+FileEntry = namedtuple('FileEntry', ['name', 'size', 'ctime', 'mtime'])
+
+
+def _entry_from_stat(name, stat):
+    """由 stat 結果建立索引項目（Windows 的建立時間優先使用 st_birthtime）"""
+    ctime = getattr(stat, 'st_birthtime', None) or stat.st_ctime
+    return FileEntry(name, stat.st_size, ctime, stat.st_mtime)
+
+
+def _created_date(entry):
+    """檔案建立日期"""
+    return datetime.fromtimestamp(entry.ctime).date()
+
+
+class FolderIndex:
+    """單一資料夾的檔案索引"""
+
+    def __init__(self, folder_path, db_path=None):
+        self.folder_path = folder_path
+        self.db_path = db_path or Config.FOLDER_INDEX_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                ctime REAL NOT NULL,
+                mtime REAL NOT NULL,
+                PRIMARY KEY (folder, name)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (folder, name, kind)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS folders (
+                folder TEXT PRIMARY KEY,
+                dir_mtime INTEGER
+            )
+        """)
+        self._conn.commit()
+
+        self._entries = {}  # {檔名: FileEntry}
+        self._by_date = {}  # {建立日期: set(檔名)}
+        self._dir_mtime = None
+        self._load()
+
+    def _load(self):
+        """從資料庫載入索引"""
+        rows = self._conn.execute(
+            "SELECT name, size, ctime, mtime FROM files WHERE folder = ?", (self.folder_path,)
+        ).fetchall()
+        for row in rows:
+            self._remember(FileEntry(*row))
+        row = self._conn.execute(
+            "SELECT dir_mtime FROM folders WHERE folder = ?", (self.folder_path,)
+        ).fetchone()
+        self._dir_mtime = row[0] if row else None
+
+    def _remember(self, entry):
+        """更新記憶體索引"""
+        previous = self._entries.get(entry.name)
+        if previous is not None:
+            self._forget(previous.name)
+        self._entries[entry.name] = entry
+        self._by_date.setdefault(_created_date(entry), set()).add(entry.name)
+
+    def _forget(self, name):
+        """從記憶體索引移除"""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        names = self._by_date.get(_created_date(entry))
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._by_date[_created_date(entry)]
+
+    def _folder_mtime(self):
+        try:
+            return os.stat(self.folder_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force=False):
+        """
+        同步索引與資料夾：資料夾修改時間未變更時直接返回
+        （新增、刪除、改名都會改變資料夾修改時間；已存在檔案的內容變更則由 update_file 處理）
+        返回: (新增或變更數, 移除數)
+        """
+        with self._lock:
+            dir_mtime = self._folder_mtime()
+            if not force and dir_mtime is not None and dir_mtime == self._dir_mtime:
+                return 0, 0
+
+            changed = []
+            seen = set()
+            try:
+                with os.scandir(self.folder_path) as entries:
+                    for dir_entry in entries:
+                        if not dir_entry.is_file():
+                            continue
+                        entry = _entry_from_stat(dir_entry.name, dir_entry.stat())
+                        seen.add(entry.name)
+                        if self._entries.get(entry.name) != entry:
+                            changed.append(entry)
+            except OSError as e:
+                debug_print(f"建立資料夾索引時發生錯誤: {str(e)}", color='light_red')
+                return 0, 0
+
+            removed = [name for name in self._entries if name not in seen]
+            for entry in changed:
+                self._remember(entry)
+            for name in removed:
+                self._forget(name)
+            self._dir_mtime = dir_mtime
+            self._persist(changed, removed)
+
+        if changed or removed:
+            debug_print(f"資料夾索引已更新: 新增/變更 {len(changed)} 個，移除 {len(removed)} 個，共 {len(self._entries)} 個檔案",
+                        color='light_blue')
+        return len(changed), len(removed)
+
+    def _persist(self, changed, removed):
+        """將差異寫入資料庫"""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (folder, name, size, ctime, mtime) VALUES (?, ?, ?, ?, ?)",
+            [(self.folder_path, *entry) for entry in changed]
+        )
+        self._conn.executemany(
+            "DELETE FROM files WHERE folder = ? AND name = ?",
+            [(self.folder_path, name) for name in removed]
+        )
+        self._conn.executemany(
+            "DELETE FROM fingerprints WHERE folder = ? AND name = ?",
+            [(self.folder_path, name) for name in removed]
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO folders (folder, dir_mtime) VALUES (?, ?)",
+            (self.folder_path, self._dir_mtime)
+        )
+        self._conn.commit()
+
+    def update_file(self, name):
+        """單檔更新（供資料夾變更通知使用），檔案不存在時從索引移除"""
+        try:
+            entry = _entry_from_stat(name, os.stat(os.path.join(self.folder_path, name)))
+        except OSError:
+            self.remove_file(name)
+            return None
+        with self._lock:
+            if self._entries.get(entry.name) != entry:
+                self._remember(entry)
+                self._persist([entry], [])
+        return entry
+
+    def remove_file(self, name):
+        """單檔移除（供資料夾變更通知使用）"""
+        with self._lock:
+            if name in self._entries:
+                self._forget(name)
+                self._persist([], [name])
+
+    def get(self, name):
+        """取得單一檔案的索引項目，不存在時返回 None"""
+        with self._lock:
+            return self._entries.get(name)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def files_created_on(self, target_date):
+        """指定日期建立的檔名（已排序）"""
+        with self._lock:
+            return sorted(self._by_date.get(target_date, ()))
+
+    def files_created_between(self, start_date, end_date):
+        """建立日期在 start_date ~ end_date（含）之間的檔名（已排序）"""
+        with self._lock:
+            names = []
+            for created, day_names in self._by_date.items():
+                if start_date <= created <= end_date:
+                    names.extend(day_names)
+            return sorted(names)
+
+    def select(self, predicate, created_on=None):
+        """
+        取得符合條件的索引項目
+        created_on: 指定時只檢查該日建立的檔案（先以日期索引縮小範圍）
+        """
+        with self._lock:
+            if created_on is not None:
+                candidates = [self._entries[name] for name in self._by_date.get(created_on, ())]
+            else:
+                candidates = list(self._entries.values())
+        return sorted((entry for entry in candidates if predicate(entry)), key=lambda entry: entry.name)
+
+    def get_fingerprint(self, entry, kind):
+        """取得快取的內容指紋（kind: 'quick' | 'full'），檔案大小或修改時間變更後視為失效"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM fingerprints WHERE folder = ? AND name = ? AND kind = ? AND size = ? AND mtime = ?",
+                (self.folder_path, entry.name, kind, entry.size, entry.mtime)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_fingerprint(self, entry, kind, digest):
+        """快取內容指紋"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (folder, name, kind, size, mtime, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.folder_path, entry.name, kind, entry.size, entry.mtime, digest)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            self._conn.close()
+
+
+# 以資料夾路徑為鍵的索引
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_folder_index(folder_path=None):
+    """
+    取得資料夾索引（第一次使用時載入並同步一次）
+    之後不再自動同步：監控期間由變更通知 (update_file / remove_file) 維護，
+    開始監控或手動複製等操作開始時才呼叫 refresh()
+    """
+    folder_path = folder_path or Config.DOWNLOAD_FOLDER
+    with _indexes_lock:
+        index = _indexes.get(folder_path)
+        if index is None:
+            index = FolderIndex(folder_path)
+            index.refresh()
+            _indexes[folder_path] = index
+    return index
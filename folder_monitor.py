@@ -3,12 +3,26 @@
 功能: 監控指定資料夾的新檔案，並自動複製到目標位置
 職責: 
 - 掃描新檔案並提供即時通知
-- 根據排除規則過濾不需要的檔案
+- 根據排除規則（exclude_rules.txt）過濾不需要的檔案
 - 複製檔案到兩個目標位置：
   1. 固定位置：test不用填
   2. 動態位置：每日研究報告任務/{YYYYMMDD}
 - 提供詳細的複製統計和日誌
-依賴: config.py, utils.py
+- 監控期間以檔案變更通知維護今日檔案集合，不再重複掃描整個資料夾
+- 檔案清單與建立時間取自資料夾索引，不再逐檔呼叫 isfile / getctime
+- 以平行複製引擎複製檔案，每個檔案只讀取一次，略過已複製的檔案並可中斷續傳
+- 串流發佈：下載進行中即將落地的新檔案複製到目標位置
+- 日期統計與列表比對使用報告中繼資料快取，不再每次重新切割檔名
+- 以列表比對器同時比對所有時間點，未匹配的檔案列出近似的列表項目
+- 落地與複製完成的檔案逐筆加入報告目錄，查詢時不需瀏覽網路磁碟
+- 匹配結果保存至匹配歷史，供各時間點命中率統計
+- 發佈完成的檔案逐筆寫入每日資料夾旁的下載清單 (JSON Lines)，供下游讀取
+- 內容相同的檔案只發佈一份，重複的檔案列出但不複製
+- 發佈先放入本機暫存，再由背景分批寫入目標位置，雲端硬碟暫時性錯誤在背景重試
+- 落地的 PDF 在背景行程池解析中繼資料，補充報告目錄，檔名無法比對時改以 PDF 標題比對列表
+依賴: config.py, utils.py, download_ledger.py, folder_watcher.py, folder_index.py,
+      exclusion_rules.py, report_metadata.py, list_matcher.py, report_catalog.py, match_history.py,
+      download_manifest.py, file_dedupe.py, staged_publisher.py, pdf_metadata.py, filename_utils.py
 """
 
 import os
@@ -16,16 +30,35 @@ from datetime import datetime, timedelta
 import time
 from config import Config, COLORS
 from utils import debug_print
-import shutil
-import re
+from download_ledger import get_download_ledger, horizon_to_date
+from folder_watcher import FolderWatcher
+from folder_index import get_folder_index
+from exclusion_rules import get_exclusion_rules
+from report_metadata import get_report_metadata, save_report_metadata
+from list_matcher import ListMatcher
+from report_catalog import get_report_catalog
+from match_history import get_match_history
+from download_manifest import DownloadManifest, manifest_path
+from file_dedupe import Deduplicator
+from staged_publisher import get_staged_publisher
+from pdf_metadata import get_pdf_metadata_extractor
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 
 class FolderMonitor:
-    def __init__(self, folder_path="C:\\temp"):
-        self.folder_path = folder_path
+    def __init__(self, folder_path=None):
+        self.folder_path = folder_path or Config.DOWNLOAD_FOLDER
         self.target_path = "I:\\共用雲端硬碟\\商拓管理\\券商研究報告分享\\填報告\\test不用填"
         self.daily_report_base_path = "I:\\共用雲端硬碟\\商拓管理\\券商研究報告分享\\每日研究報告任務"
         self.is_monitoring = False
-        self.today_files = []
+        self.watcher = None
+        self.publish_executor = None  # 串流發佈的背景複製
+        self.published_files = set()
+        self.today_files = set()  # 今日檔案集合（監控期間由變更通知維護）
+        self.today_date = None  # today_files 對應的日期
+        self._today_lock = threading.Lock()
+        self._dedupe_lock = threading.Lock()  # 重複檢查與加入已發佈集合需一起完成
         self.last_file_count = 0
         self.weekdays = {
             'Monday': '一', 'Tuesday': '二', 'Wednesday': '三',
@@ -33,17 +66,15 @@ class FolderMonitor:
         }
         # 排除掃描的檔案
         self.exclude_files = ['sync.ffs_db']
-        # 使用正則表達式來匹配要排除的檔案
-        self.exclude_pattern = re.compile(
-            r'sync\.ffs_db|_公司|晨訊|晨報|日報|週報|月報|週刊|月刊|'
-            r'策略|產業|專題|焦點|重要財報|營收檢討|ESG報告|'
-            r',jp(?!M)|\.JP(?!M)|-JP(?!M)|_JP(?!M)|'
-            r'KS|\.KS|-KS|_KS|'
-            r'Weekly|Monthly|I／O|ETF|TPCA|CTBC|Asia |APAC |Global|Greater|SEMICON|'
-            r'Telecoms|Financials|Alert|tracker|supply\s*chain',
-            re.IGNORECASE)
-        # 日誌輸出被排除的檔名
-        debug_print(f"排除條件: {self.exclude_pattern.pattern}", color='light_magenta')
+        # 排除規則（從 exclude_rules.txt 載入，修改後自動重新載入）
+        self.exclusion_rules = get_exclusion_rules()
+        # 最近一次分析的近似匹配 {檔名: [NearMatch, ...]}
+        self.near_matches = {}
+        # 今日的下載清單（每日資料夾旁的 JSON Lines）
+        self.manifest = None
+        self.deduplicator = None
+        self.publisher = None
+        self.pdf_extractor = None
 
     def log_total_files(self, total_count):
         """輸出今日檔案總數"""
@@ -52,68 +83,49 @@ class FolderMonitor:
         debug_print(f"     今日檔案總數: {total_count}", color='light_green')
     
     def log_date_statistics(self, date_counts):
-        """輸出日期數量統計"""
-        sorted_dates = sorted(date_counts.items(), 
-                            key=lambda x: (int(x[0].split('/')[0]), int(x[0].split('/')[1])))
-        for date, count in sorted_dates:
-            month, day = date.split('/')
-            weekday = self.weekdays[datetime.strptime(f"2024{month}{day}", "%Y%m%d").strftime('%A')] # 取得星期幾
-            debug_print(f"{month} / {day} （{weekday}）：{count} 個檔案", color='light_cyan')
+        """輸出日期數量統計（date_counts: {報告日期: 檔案數}）"""
+        for date, count in sorted(date_counts.items()):
+            weekday = self.weekdays[date.strftime('%A')] # 取得星期幾
+            debug_print(f"{date.month:02d} / {date.day:02d} （{weekday}）：{count} 個檔案", color='light_cyan')
         debug_print("==========================", color='light_yellow')
     
     def log_new_file(self, filename):
         """輸出新發現的檔案"""
         debug_print(f"發現新檔案: {filename}", color='light_green')
 
-    def scan_new_files(self):
-        """掃描今日新檔案"""
-        today = datetime.now().date()
-        new_files, date_counts = self.scan_files_for_date(today)
-        return new_files, date_counts
-    
+    def count_report_dates(self, files):
+        """依檔名解析出的報告日期分組計數（民國年 7 碼，例如 1131015 -> 2024/10/15）"""
+        date_counts = {}
+        for file in files:
+            report_date = get_report_metadata(file, has_extension=True).report_date
+            if report_date:
+                date_counts[report_date] = date_counts.get(report_date, 0) + 1
+        return date_counts
+
     def scan_files_for_date(self, target_date):
-        """掃描指定日期的檔案"""
+        """掃描指定日期的檔案（監控中且為今日時，直接使用變更通知維護的集合）"""
         files = []
         date_counts = {}
         
+        if self.watcher and self.watcher.is_running and target_date == self.today_date:
+            with self._today_lock:
+                files = sorted(self.today_files)
+            return files, self.count_report_dates(files)
+        
         try:
-            # 掃描資料夾
-            for file in os.listdir(self.folder_path):
-                if file in self.exclude_files:
-                    continue
-                # 取得檔案路徑
-                file_path = os.path.join(self.folder_path, file)
-                if not os.path.isfile(file_path):
-                    continue
-                # 取得檔案建立時間
-                if datetime.fromtimestamp(os.path.getctime(file_path)).date() == target_date:
-                    files.append(file)
-                    
-                    # 分析日期
-                    for part in file.split('_'):
-                        if len(part) == 7 and part.startswith('11'):
-                            date = f"{part[-4:-2]}/{part[-2:]}"
-                            date_counts[date] = date_counts.get(date, 0) + 1
-                        
+            # 未監控時先同步一次資料夾索引（資料夾未變更時不需重新走訪），再取得該日建立的檔案
+            index = get_folder_index(self.folder_path)
+            index.refresh()
+            files = [file for file in index.files_created_on(target_date) if file not in self.exclude_files]
+            date_counts = self.count_report_dates(files)
         except Exception as e:
             debug_print(f"掃描檔案時發生錯誤: {str(e)}", color='light_red')
         
         return files, date_counts
 
-    def store_and_analyze_lists(self, today_list=None, yesterday_list=None, last_week_list=None, 
-                                last_2week_list=None, last_3week_list=None, last_4week_list=None):
-        """存儲並分析各時間點的檔案列表"""
+    def store_and_analyze_lists(self, lists_dict):
+        """存儲並分析各時間點的檔案列表（lists_dict: {時間點: [名稱, ...]}）"""
         try:
-            # 儲存各時間點的列表
-            lists_dict = {
-                '今日': today_list or [],
-                '昨日': yesterday_list or [],
-                '1週前': last_week_list or [],
-                '2週前': last_2week_list or [],
-                '4週前': last_3week_list or [],
-                '8週前': last_4week_list or []
-            }
-
             # 分析列表內容
             debug_print("=== 各時間點列表分析 ===", color='light_cyan')
             total_files = 0
@@ -141,46 +153,44 @@ class FolderMonitor:
 
 
     def analyze_new_files_with_lists(self, list_files_dict):
-        """分析今日新檔案與各時間點列表的匹配情況"""
+        """
+        分析今日新檔案與各時間點列表的匹配情況
+        完全比對以位元集合查詢；未匹配的檔案列出最接近的列表項目與相似度
+        返回: {檔名: [時間點, ...]}，近似匹配另存於 self.near_matches
+        """
         try:
             today = datetime.now().date()
             new_files, _ = self.scan_files_for_date(today)
+            self.near_matches = {}
             
             if not new_files:
                 debug_print("今日沒有新檔案", color='light_yellow')
                 return {}
             
-            # 定義各時間點的日期
-            date_mapping = {
-                '今日': today,
-                '昨日': today - timedelta(days=1),
-                '1週前': today - timedelta(days=7),
-                '2週前': today - timedelta(days=14),
-                '4週前': today - timedelta(days=28),
-                '8週前': today - timedelta(days=56)
-            }
+            # 各時間點的日期（未收集的時間點不列出）
+            date_mapping = {date_name: horizon_to_date(date_name) or today for date_name in list_files_dict}
             
             debug_print("=== 檔案數列表 ===", color='light_cyan')
-            
-            # 預先處理列表檔案名稱
-            normalized_lists = {}
-            # 遍歷所有時間點，包括沒有檔案的
             for date_name, date in date_mapping.items():
-                file_list = list_files_dict.get(date_name, [])
                 weekday = self.weekdays[date.strftime('%A')]
-                debug_print(f"{date_name} ({date.strftime('%m/%d')} {weekday}) 列表檔案數: {len(file_list)}", color='light_blue', bold=True)
-                
-                if file_list:
-                    # 格式化列表中的每個檔案名稱
-                    normalized_lists[date_name] = [] # 初始化列表
-                    for file_name in file_list:
-                        if file_name:
-                            normalized_name = self._normalize_filename(str(file_name), has_extension=False) # 格式化檔名
-                            normalized_lists[date_name].append(normalized_name) # 存入格式化後的檔名
-                            # 輸出格式化前後的檔名以便除錯
-                            debug_print(f"檔案: 原始={file_name} -> 格式化={normalized_name}", color='white')
-                else:
-                    normalized_lists[date_name] = []
+                debug_print(f"{date_name} ({date.strftime('%m/%d')} {weekday}) 列表檔案數: {len(list_files_dict[date_name] or [])}",
+                            color='light_blue', bold=True)
+            
+            # 建立比對索引（名稱標準化一次，每個名稱記錄出現的時間點）
+            matcher = ListMatcher.from_lists({date_name: file_list or [] for date_name, file_list in list_files_dict.items()})
+            debug_print(f"列表共 {len(matcher)} 個不重複名稱", color='light_blue')
+            
+            # 檔名無法比對時改用 PDF 標題（只使用已解析完成的結果，不在介面執行緒等待解析）
+            extractor = self.get_pdf_extractor()
+            extractor.submit_many(self.folder_path, new_files, on_extracted=self._on_pdf_metadata)
+            pdf_metadata = {}
+            for new_file in new_files:
+                metadata = extractor.get(self.folder_path, new_file)
+                if metadata is not None:
+                    pdf_metadata[new_file] = metadata
+            if not self.is_monitoring:
+                # 未監控時（例如只收集列表），在背景等待解析完成後結束工作行程
+                threading.Thread(target=self._finish_pdf_extraction, args=(new_files,), daemon=True).start()
             
             # 初始化匹配統計
             match_stats = {date_name: 0 for date_name in list_files_dict.keys()}
@@ -189,23 +199,30 @@ class FolderMonitor:
             # 分析每個新檔案
             debug_print("=== 檔案匹配詳情 ===", color='light_cyan')
             for new_file in new_files:
-                matches = []
-                normalized_new_file = self._normalize_filename(new_file, has_extension=True)
-                # 輸出格式化前後的檔名以便除錯
                 debug_print(f"檔案: {new_file}", color='white')
-                debug_print(f"格式化後: {normalized_new_file}", color='white')
-                
-                # 比對每個時間點的列表
-                for date_name, normalized_file_list in normalized_lists.items():
-                    if normalized_new_file in normalized_file_list:
-                        matches.append(date_name)
-                        match_stats[date_name] += 1
+                matches = matcher.match(new_file)
+                pdf_title = pdf_metadata[new_file].title if new_file in pdf_metadata else None
+                if not matches and pdf_title:
+                    matches = matcher.match(pdf_title, has_extension=False)
+                    if matches:
+                        debug_print(f"依 PDF 標題匹配: {pdf_title}", color='light_magenta')
+                for date_name in matches:
+                    match_stats[date_name] += 1
                 
                 if matches:
                     match_dates = [f"{name} ({date_mapping[name].strftime('%m/%d')})" for name in matches]
                     debug_print(f"匹配: {', '.join(match_dates)}", color='light_magenta')
                 else:
-                    debug_print("未匹配任何列表", color='light_red')
+                    near = matcher.nearest(new_file)
+                    if pdf_title:
+                        near = self._merge_near(near, matcher.nearest(pdf_title, has_extension=False))
+                    if near:
+                        self.near_matches[new_file] = near
+                        for candidate in near:
+                            debug_print(f"近似匹配 ({candidate.score:.0%}): {candidate.name} [{', '.join(candidate.horizons)}]",
+                                        color='light_yellow')
+                    else:
+                        debug_print("未匹配任何列表", color='light_red')
                 
                 matching_results[new_file] = matches
             
@@ -216,81 +233,225 @@ class FolderMonitor:
                 date = date_mapping[date_name]
                 weekday = self.weekdays[date.strftime('%A')]
                 debug_print(f"{date_name} ({date.strftime('%m/%d')} {weekday}) 新檔案數: {count}", color='light_yellow')
+            unmatched = sum(1 for matches in matching_results.values() if not matches)
+            debug_print(f"近似匹配: {len(self.near_matches)} 個，未匹配: {unmatched - len(self.near_matches)} 個", color='light_yellow')
+            
+            # 保存本次結果，供歷史命中率統計
+            get_match_history().record_run(today, matching_results, self.near_matches,
+                                           {date_name: len(file_list or []) for date_name, file_list in list_files_dict.items()
+                                            if file_list})
             
             debug_print("========== 分析完成 ==========", color='light_cyan')
+            save_report_metadata()
             return matching_results
 
         except Exception as e:
             debug_print(f"分析檔案匹配時發生錯誤: {str(e)}", color='light_red')
             return {}
 
-    def _normalize_filename(self, filename, has_extension=False):
-        """
-        標準化檔名以便比對，只保留中文、英文、數字
-        Args:
-            filename: 要處理的檔名
-            has_extension: 是否包含副檔名，True=需要移除副檔名，False=不需要移除副檔名
-        """
-        try:
-            # 1. 如果有副檔名且需要移除，則移除最後一個點及其後的所有字元
-            name = re.split(r'\.[^.]*$', filename)[0] if has_extension else filename
-            
-            # 2. 移除所有非中英數字元
-            return re.sub(r'[^a-zA-Z0-9\u4e00-\u9fff]+', '', name)
-        except Exception as e:
-            debug_print(f"標準化檔名時發生錯誤: {str(e)}", color='light_red')
-            return filename
-
+    @staticmethod
+    def _merge_near(*candidate_lists):
+        """合併多次近似比對的結果（同一項目取最高分），依相似度排序"""
+        best = {}
+        for candidates in candidate_lists:
+            for candidate in candidates:
+                if candidate.name not in best or candidate.score > best[candidate.name].score:
+                    best[candidate.name] = candidate
+        merged = sorted(best.values(), key=lambda near: (-near.score, near.name))
+        return merged[:Config.FUZZY_MATCH_LIMIT]
+    
     def scan_new_files_and_log(self):
         """掃描今日新檔案，並在啟動及檔案數量變化時輸出統計"""
         today = datetime.now().date()
         new_files = []
-        date_counts = {}
         
         try:
-            # 掃描檔案
-            for file in os.listdir(self.folder_path):
-                if file in ['sync.ffs_db']:
-                    continue
-                # 取得檔案路徑
-                file_path = os.path.join(self.folder_path, file)
-                if not os.path.isfile(file_path):
-                    continue
-                # 取得檔案建立時間
-                if datetime.fromtimestamp(os.path.getctime(file_path)).date() == today:
-                    new_files.append(file)
-                    if file not in self.today_files:
-                        self.today_files.append(file)
-                        self.log_new_file(file)
-                        
-                        # 分析日期
-                        for part in file.split('_'):
-                            if len(part) == 7 and part.startswith('11'):
-                                date = f"{part[-4:-2]}/{part[-2:]}"
-                                date_counts[date] = date_counts.get(date, 0) + 1
+            # 從資料夾索引取得今日建立的檔案
+            index = get_folder_index(self.folder_path)
+            new_files = [file for file in index.files_created_on(today) if file not in self.exclude_files]
+            
+            with self._today_lock:
+                if self.today_date != today:
+                    self.today_files = set()
+                    self.today_date = today
+                added = [file for file in new_files if file not in self.today_files]
+                self.today_files = set(new_files)
+            for file in added:
+                self.log_new_file(file)
+            self._catalog_downloads(added)
             
-            # 只在檔案數有變化時輸出統計
-            current_count = len(new_files)
-            if current_count != self.last_file_count:
-                self.last_file_count = current_count
-                if new_files:
-                    self.log_total_files(current_count)
-                    self.log_date_statistics(date_counts)
+            self._log_if_count_changed(new_files)
                     
         except Exception as e:
             debug_print(f"掃描資料夾時發生錯誤: {str(e)}", color='light_red')
             
         return new_files
     
+    def _catalog_downloads(self, files):
+        """將下載資料夾中的檔案加入報告目錄"""
+        index = get_folder_index(self.folder_path)
+        entries = [index.get(file) for file in files]
+        get_report_catalog().add_many((self.folder_path, entry.name, 'download', entry.size, entry.mtime)
+                                      for entry in entries if entry is not None)
+        self.get_pdf_extractor().submit_many(self.folder_path, files, on_extracted=self._on_pdf_metadata)
+    
+    def _catalog_copies(self, results):
+        """將複製成功的目標檔案加入報告目錄（大小、時間取自來源，不存取網路磁碟）"""
+        index = get_folder_index(self.folder_path)
+        files = []
+        for result in results:
+            if result.status == 'failed':
+                continue
+            name = os.path.basename(result.job.source)
+            entry = index.get(name)
+            files.append((result.target_dir, name, 'target', result.size, entry.mtime if entry else None))
+        get_report_catalog().add_many(files)
+    
+    def _log_if_count_changed(self, files):
+        """只在檔案數有變化時輸出統計"""
+        current_count = len(files)
+        if current_count != self.last_file_count:
+            self.last_file_count = current_count
+            if files:
+                self.log_total_files(current_count)
+                self.log_date_statistics(self.count_report_dates(files))
+    
+    def _on_new_file(self, file):
+        """變更通知：檔案寫入完成，更新資料夾索引，今日建立的檔案加入今日檔案集合"""
+        entry = get_folder_index(self.folder_path).update_file(file)
+        today = datetime.now().date()
+        if self.today_date != today:
+            # 跨日後重新建立今日檔案集合
+            self.scan_new_files_and_log()
+            return
+        if file in self.exclude_files:
+            return
+        
+        if entry is None or datetime.fromtimestamp(entry.ctime).date() != today:
+            return
+        
+        get_report_catalog().add(self.folder_path, file, 'download', entry.size, entry.mtime)
+        self.get_pdf_extractor().submit(self.folder_path, file, on_extracted=self._on_pdf_metadata)
+        with self._today_lock:
+            if file in self.today_files:
+                return
+            self.today_files.add(file)
+            files = sorted(self.today_files)
+        self.log_new_file(file)
+        self._log_if_count_changed(files)
+        self._publish(file)
+    
+    def _on_file_removed(self, file):
+        """變更通知：檔案被刪除或改名移走"""
+        get_folder_index(self.folder_path).remove_file(file)
+        get_report_catalog().remove(self.folder_path, file)
+        with self._today_lock:
+            self.today_files.discard(file)
+    
+    def _on_watch_overflow(self):
+        """變更通知遺失（緩衝區溢位）：重新同步資料夾索引後重建今日檔案集合"""
+        get_folder_index(self.folder_path).refresh()
+        self.scan_new_files_and_log()
+    
     def start_monitoring(self):
-        """開始監控"""
+        """開始監控：先完整掃描一次，之後以檔案變更通知更新"""
         self.is_monitoring = True
         debug_print(f"開始監控資料夾: {self.folder_path}")
-        self.scan_new_files()
+        get_folder_index(self.folder_path).refresh()
+        self.scan_new_files_and_log()
+        try:
+            self.watcher = FolderWatcher(
+                self.folder_path,
+                on_new_file=self._on_new_file,
+                on_removed=self._on_file_removed,
+                on_overflow=self._on_watch_overflow
+            )
+            self.watcher.start()
+        except Exception as e:
+            debug_print(f"無法啟動資料夾變更監看: {str(e)}", color='light_red')
+            self.watcher = None
         
+    def start_publishing(self):
+        """開始串流發佈：監控期間落地的今日新檔案，立即在背景複製到所有目標位置"""
+        with self._today_lock:
+            if self.publish_executor is None:
+                self.published_files = set()
+                self.publish_executor = ThreadPoolExecutor(max_workers=Config.COPY_MAX_WORKERS)
+        self.get_publisher().listing.invalidate()  # 每輪下載重新列出目標資料夾
+        if not self.is_monitoring:
+            self.start_monitoring()
+        debug_print("已啟動串流發佈，新檔案落地後立即複製", color='light_cyan')
+    
+    def _publish(self, file):
+        """將新檔案排入背景複製（未啟動串流發佈或被排除時略過）"""
+        executor = self.publish_executor
+        if executor is None:
+            return
+        rule = self.exclusion_rules.match(file)
+        if rule:
+            debug_print(f"排除檔案: {file} (匹配規則: {rule.text})", color='light_magenta')
+            return
+        try:
+            executor.submit(self._publish_file, file)
+        except RuntimeError:
+            pass  # 發佈已停止
+    
+    def _publish_file(self, file):
+        """將單一檔案放入本機暫存並排入背景發佈（與已發佈檔案內容相同時不發佈）"""
+        # 檢查與加入在同一個臨界區內完成，否則同時落地的 x.pdf 與 x (1).pdf 會都看到空集合而都被發佈
+        with self._dedupe_lock:
+            with self._today_lock:
+                published = list(self.published_files)
+            original = self.get_deduplicator().duplicate_of(file, published)
+            if original:
+                debug_print(f"重複檔案: {file} (與 {original} 內容相同，不發佈)", color='light_magenta')
+                return
+            with self._today_lock:
+                self.published_files.add(file)
+        self.get_publisher().submit(os.path.join(self.folder_path, file), self.get_copy_targets(),
+                                    on_published=self._on_published)
+    
+    def _on_published(self, item):
+        """發佈器通知：檔案已發佈到所有目標（或放棄重試），更新報告目錄、下載紀錄與下載清單"""
+        results = list(item.results.values())
+        self._catalog_copies(results)
+        metadata = self.get_pdf_extractor().get(self.folder_path, item.name)
+        if metadata is not None:
+            get_report_catalog().set_pdf_metadata(item.name, metadata)
+        if item.succeeded:
+            get_download_ledger().mark_copied(item.name)
+            self.get_manifest().append(item.name, item.source, results)
+            debug_print(f"已發佈: {item.name}", color='white')
+        else:
+            with self._today_lock:
+                self.published_files.discard(item.name)
+    
+    def stop_publishing(self):
+        """停止串流發佈：停止監控並等待排入的複製完成"""
+        with self._today_lock:
+            executor, self.publish_executor = self.publish_executor, None
+        if self.is_monitoring:
+            self.stop_monitoring()
+        if executor is not None:
+            executor.shutdown(wait=True)
+            if self.publisher is not None:
+                self.publisher.flush()
+            self.stop_pdf_extraction()
+            debug_print(f"串流發佈結束，共發佈 {len(self.published_files)} 個檔案", color='light_green')
+    
+    def finish_publishing(self):
+        """結束串流發佈，並補齊複製今日檔案（下載流程的最後一步）"""
+        self.stop_publishing()
+        self.copy_today_files()
+    
     def stop_monitoring(self):
         """停止監控"""
         self.is_monitoring = False
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        self.stop_pdf_extraction()
+        save_report_metadata()
         debug_print("資料夾監控已停止", color='light_yellow')
     
     def get_daily_target_path(self):
@@ -299,51 +460,60 @@ class FolderMonitor:
         date_folder = today.strftime("%Y%m%d")
         return os.path.join(self.daily_report_base_path, date_folder)
     
-    def copy_file_to_targets(self, filename):
-        """複製單個檔案到兩個目標資料夾，如果資料夾不存在則建立"""
-        source = os.path.join(self.folder_path, filename)
-        targets = [self.target_path, self.get_daily_target_path()]
-        copy_results = []
-        
-        for target_dir in targets:
-            try:
-                # 檢查目標資料夾是否存在，不存在則建立
-                if not os.path.exists(target_dir):
-                    os.makedirs(target_dir)
-                    debug_print(f"已建立目標資料夾: {target_dir}", color='light_green')
-                
-                # 取得目標檔案路徑
-                target_file = os.path.join(target_dir, filename)
-                # 複製檔案
-                shutil.copy2(source, target_file)
-                copy_results.append(True)
-            except Exception as e:
-                debug_print(f"複製檔案到 {target_dir} 失敗: {filename}, 錯誤: {str(e)}", color='light_red')
-                copy_results.append(False)
-        
-        return copy_results
+    def get_copy_targets(self):
+        """取得所有複製目標資料夾：固定位置、每日位置，以及設定中的額外目標（例如封存 NAS）"""
+        return [self.target_path, self.get_daily_target_path()] + list(Config.COPY_EXTRA_TARGETS)
     
-    def copy_file_to_target(self, filename):
-        """複製單個檔案到目標資料夾，如果資料夾不存在則建立（保留向後相容性）"""
-        try:
-            # 檢查目標資料夾是否存在，不存在則建立
-            if not os.path.exists(self.target_path):
-                os.makedirs(self.target_path)
-                debug_print(f"已建立目標資料夾: {self.target_path}", color='light_green')
-            
-            # 取得檔案路徑
-            source = os.path.join(self.folder_path, filename)
-            # 取得目標路徑
-            target = os.path.join(self.target_path, filename)
-            # 複製檔案
-            shutil.copy2(source, target)
-        except Exception as e:
-            debug_print(f"複製檔案失敗: {filename}, 錯誤: {str(e)}", color='light_red')
+    def get_publisher(self):
+        """取得全域暫存發佈器（所有監控器共用一個背景執行緒與暫存區）"""
+        with self._today_lock:
+            if self.publisher is None:
+                self.publisher = get_staged_publisher()
+            return self.publisher
+    
+    def get_pdf_extractor(self):
+        """取得全域 PDF 中繼資料解析管線（所有監控器共用，行程池在第一次排入解析時才啟動）"""
+        with self._today_lock:
+            if self.pdf_extractor is None:
+                self.pdf_extractor = get_pdf_metadata_extractor()
+            return self.pdf_extractor
+    
+    def stop_pdf_extraction(self):
+        """結束 PDF 解析的工作行程（尚未開始的解析取消，下次排入時重新啟動）"""
+        if self.pdf_extractor is not None:
+            self.pdf_extractor.shutdown()
+    
+    def _finish_pdf_extraction(self, files):
+        """等待排入的解析完成（最多 Config.PDF_METADATA_WAIT 秒），期間未開始監控時結束工作行程"""
+        self.get_pdf_extractor().wait(self.folder_path, files, timeout=Config.PDF_METADATA_WAIT)
+        if not self.is_monitoring:
+            self.stop_pdf_extraction()
+    
+    def _on_pdf_metadata(self, folder, name, metadata):
+        """PDF 解析完成：補充報告目錄（同名的下載與複製目標）"""
+        get_report_catalog().set_pdf_metadata(name, metadata)
+    
+    def get_deduplicator(self):
+        """取得重複檔案偵測器"""
+        if self.deduplicator is None:
+            self.deduplicator = Deduplicator(self.folder_path)
+        return self.deduplicator
+    
+    def get_manifest(self):
+        """取得今日每日資料夾的下載清單（跨日時改用新的清單）"""
+        daily_target = self.get_daily_target_path()
+        with self._today_lock:
+            if self.manifest is None or self.manifest.path != manifest_path(daily_target):
+                self.manifest = DownloadManifest(daily_target)
+            return self.manifest
     
     def copy_today_files(self):
         """複製今日所有新檔案，但排除特定檔案，複製到兩個目標位置"""
         today = datetime.now().date()
-        copied_files = []  # 成功複製的檔案
+        submitted_files = []  # 排入發佈的檔案
+        copied_files = []  # 所有目標都複製成功的檔案
+        failed_files = []  # 放棄重試、仍有目標失敗的檔案
+        retrying_files = []  # 發佈失敗、在背景重試中的檔案
         excluded_files = []  # 被排除的檔案
         copy_stats = {'test不用填': 0, '每日研究報告任務': 0}  # 複製統計
         
@@ -353,31 +523,50 @@ class FolderMonitor:
             debug_print(f"目標位置1: {self.target_path}", color='light_blue')
             debug_print(f"目標位置2: {daily_target}", color='light_blue')
             
-            # 掃描檔案
-            for file in os.listdir(self.folder_path):
-                # 取得檔案路徑
-                file_path = os.path.join(self.folder_path, file)
-                if not os.path.isfile(file_path):
+            # 取得今日檔案（監控中時直接使用今日檔案集合）
+            today_files, _ = self.scan_files_for_date(today)
+            targets = self.get_copy_targets()
+            for extra_target in targets[2:]:
+                debug_print(f"額外目標: {extra_target}", color='light_blue')
+            for file in today_files:
+                # 檢查是否為排除的檔案（一次比對即取得符合的規則）
+                rule = self.exclusion_rules.match(file)
+                if rule:
+                    excluded_files.append((file, rule.text))  # 儲存檔案名和匹配規則
                     continue
                 
-                # 檢查檔案日期
-                if datetime.fromtimestamp(os.path.getctime(file_path)).date() == today:
-                    # 使用正則表達式檢查是否為排除的檔案
-                    if self.exclude_pattern.search(file):
-                        # 找出匹配到的排除規則
-                        match = self.exclude_pattern.search(file)
-                        excluded_files.append((file, match.group()))  # 儲存檔案名和匹配規則
+                submitted_files.append(file)  # 儲存檔案名
+            
+            # 內容相同的檔案只發佈一份（例如 name.pdf 與 name (1).pdf）
+            duplicate_files = self.get_deduplicator().find_duplicates(submitted_files)
+            submitted_files = [file for file in submitted_files if file not in duplicate_files]
+            
+            # 放入本機暫存後分批發佈到所有目標位置（目標已有相同檔案時略過），等待每個檔案至少發佈一次
+            # 目標資料夾可能在上次複製後被修改（檔案被刪除或取代），重新列出
+            publisher = self.get_publisher()
+            publisher.listing.invalidate()
+            items = [publisher.submit(os.path.join(self.folder_path, file), targets, on_published=self._on_published)
+                     for file in submitted_files]
+            publisher.flush(items)
+            for item in items:
+                for result in item.results.values():
+                    if result.status == 'failed':
+                        debug_print(f"複製檔案到 {result.target_dir} 失敗: {item.name}, 錯誤: {result.error}", color='light_red')
                         continue
-                    
-                    # 複製檔案到兩個目標位置
-                    copy_results = self.copy_file_to_targets(file)
-                    copied_files.append(file)  # 儲存檔案名
-                    
                     # 統計成功複製到各目標的數量
-                    if copy_results[0]:  # test不用填
+                    if result.target_dir == self.target_path:  # test不用填
                         copy_stats['test不用填'] += 1
-                    if copy_results[1]:  # 每日研究報告任務
+                    elif result.target_dir == daily_target:  # 每日研究報告任務
                         copy_stats['每日研究報告任務'] += 1
+                    else:
+                        copy_stats[result.target_dir] = copy_stats.get(result.target_dir, 0) + 1
+                # 依發佈結果分類，只有所有目標都完成的檔案才算複製成功
+                if not item.done.is_set():
+                    retrying_files.append(item.name)
+                elif item.succeeded:
+                    copied_files.append(item.name)
+                else:
+                    failed_files.append(item.name)
             
             # 輸出複製結果
             debug_print(f"===== {today.strftime('%Y-%m-%d')} =====", color='light_cyan')
@@ -385,17 +574,37 @@ class FolderMonitor:
             for file in copied_files:
                 debug_print(f"已複製: {file}", color='white')
             
+            if failed_files or retrying_files:
+                debug_print("====== 複製失敗的檔案 ======", color='light_cyan')
+                for file in failed_files:
+                    debug_print(f"複製失敗: {file}", color='light_red')
+                for file in retrying_files:
+                    debug_print(f"背景重試中: {file}", color='light_yellow')
+            
             debug_print("====== 被排除的檔案 ======", color='light_cyan')
             for file, rule in excluded_files:
                 debug_print(f"排除檔案: {file} (匹配規則: {rule})", color='light_magenta')
             
+            debug_print("====== 重複的檔案 ======", color='light_cyan')
+            for file, original in sorted(duplicate_files.items()):
+                debug_print(f"重複檔案: {file} (與 {original} 內容相同，不複製)", color='light_magenta')
+            
             # 輸出複製統計
             debug_print("======= 複製統計 =======", color='light_cyan')
-            debug_print(f"   處理檔案: {len(copied_files)} 個", color='light_yellow')
+            debug_print(f"   處理檔案: {len(submitted_files)} 個", color='light_yellow')
+            debug_print(f"   複製成功: {len(copied_files)} 個", color='light_yellow')
+            if failed_files:
+                debug_print(f"   複製失敗: {len(failed_files)} 個", color='light_yellow')
             debug_print(f"   排除檔案: {len(excluded_files)} 個", color='light_yellow')
+            debug_print(f"   重複檔案: {len(duplicate_files)} 個", color='light_yellow')
+            if retrying_files:
+                debug_print(f"   背景重試中: {len(retrying_files)} 個", color='light_yellow')
             debug_print(f"   test不用填: {copy_stats['test不用填']} 個檔案", color='light_yellow')
             debug_print(f"   每日研究報告任務: {copy_stats['每日研究報告任務']} 個檔案", color='light_yellow')
+            for extra_target in targets[2:]:
+                debug_print(f"   {extra_target}: {copy_stats.get(extra_target, 0)} 個檔案", color='light_yellow')
             debug_print("========================", color='light_cyan')
+            self.exclusion_rules.log_stats()
 
         except Exception as e:
             debug_print(f"複製檔案過程發生錯誤: {str(e)}", color='light_red')
@@ -416,8 +625,8 @@ if __name__ == "__main__":
     monitor = FolderMonitor()
     monitor.start_monitoring()
     try:
+        # 新檔案由變更通知處理，主執行緒只需保持運作
         while True:
-            monitor.scan_new_files()
             time.sleep(1)
     except KeyboardInterrupt:
         monitor.stop_monitoring() 
\ No newline at end of file
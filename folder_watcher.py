@@ -0,0 +1,300 @@
+"""
+資料夾變更監看模組
+功能: 以作業系統的檔案變更通知監看資料夾，取代定時 listdir 輪詢
+職責:
+- Windows 使用 ReadDirectoryChangesW，Linux 使用 inotify，其他環境退回低頻率輪詢
+- 合併仍在寫入中的檔案事件 (debounce)，檔案靜止後才發出「新檔案」通知
+- 略過下載中的暫存檔（.crdownload / .tmp / .part）
+- 事件緩衝區溢位時通知呼叫端重新完整掃描
+依賴: config.py, utils.py, filename_utils.py
+"""
+
+import os
+import sys
+import threading
+import time
+from config import Config
+from utils import debug_print
+from filename_utils import is_temp_file
+
+# 事件類型
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+OVERFLOW = 'overflow'
+
+
+class _WindowsBackend:
+    """ReadDirectoryChangesW（重疊 I/O，可在逾時後檢查停止信號）"""
+
+    ACTIONS = {1: ADDED, 2: REMOVED, 3: MODIFIED, 4: REMOVED, 5: ADDED}  # 4/5 = 改名前/改名後
+
+    def __init__(self, folder_path):
+        import pywintypes
+        import win32con
+        import win32event
+        import win32file
+
+        self._win32event = win32event
+        self._win32file = win32file
+        self._handle = win32file.CreateFile(
+            folder_path,
+            0x0001,  # FILE_LIST_DIRECTORY
+            win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+            None,
+            win32con.OPEN_EXISTING,
+            win32con.FILE_FLAG_BACKUP_SEMANTICS | win32con.FILE_FLAG_OVERLAPPED,
+            None
+        )
+        self._overlapped = pywintypes.OVERLAPPED()
+        self._overlapped.hEvent = win32event.CreateEvent(None, True, False, None)
+        self._buffer = win32file.AllocateReadBuffer(64 * 1024)
+        self._filter = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME |
+                        win32con.FILE_NOTIFY_CHANGE_SIZE |
+                        win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        self._pending_read = False
+
+    def read(self, timeout):
+        """等待變更事件，返回 [(事件類型, 檔名), ...]"""
+        win32event = self._win32event
+        win32file = self._win32file
+
+        if not self._pending_read:
+            win32file.ReadDirectoryChangesW(self._handle, self._buffer, False, self._filter, self._overlapped)
+            self._pending_read = True
+
+        if win32event.WaitForSingleObject(self._overlapped.hEvent, int(timeout * 1000)) != win32event.WAIT_OBJECT_0:
+            return []
+
+        self._pending_read = False
+        win32event.ResetEvent(self._overlapped.hEvent)
+        size = win32file.GetOverlappedResult(self._handle, self._overlapped, True)
+        if size == 0:
+            # 緩衝區不足，事件已遺失
+            return [(OVERFLOW, None)]
+        return [(self.ACTIONS.get(action, MODIFIED), name)
+                for action, name in win32file.FILE_NOTIFY_INFORMATION(self._buffer, size)]
+
+    def close(self):
+        try:
+            if self._pending_read:
+                self._win32file.CancelIo(self._handle)
+            self._handle.Close()
+        except Exception:
+            pass
+
+
+class _InotifyBackend:
+    """Linux inotify（透過 ctypes 呼叫 libc，不需額外套件）"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, folder_path):
+        import ctypes
+        import ctypes.util
+        import struct
+
+        self._struct = struct
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM |
+                self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE)
+        if libc.inotify_add_watch(self._fd, os.fsencode(folder_path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch 失敗")
+
+    def read(self, timeout):
+        """等待變更事件，返回 [(事件類型, 檔名), ...]"""
+        import select
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        header_size = self._struct.calcsize('iIII')
+        while offset + header_size <= len(data):
+            _, mask, _, length = self._struct.unpack_from('iIII', data, offset)
+            raw_name = data[offset + header_size:offset + header_size + length]
+            offset += header_size + length
+
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((OVERFLOW, None))
+                continue
+            if mask & self.IN_ISDIR:
+                continue
+            name = os.fsdecode(raw_name.rstrip(b'\0'))
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                events.append((ADDED, name))
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                events.append((REMOVED, name))
+            else:
+                events.append((MODIFIED, name))
+        return events
+
+    def close(self):
+        try:
+            os.close(self._fd)
+        except Exception:
+            pass
+
+
+class _PollingBackend:
+    """無法使用系統通知時的退路：低頻率比對檔名、大小與修改時間"""
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self._state = self._scan()
+
+    def _scan(self):
+        state = {}
+        with os.scandir(self.folder_path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    state[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def read(self, timeout):
+        time.sleep(max(timeout, Config.WATCH_POLL_INTERVAL))
+        current = self._scan()
+        events = [(REMOVED, name) for name in self._state.keys() - current.keys()]
+        for name, signature in current.items():
+            previous = self._state.get(name)
+            if previous is None:
+                events.append((ADDED, name))
+            elif previous != signature:
+                events.append((MODIFIED, name))
+        self._state = current
+        return events
+
+    def close(self):
+        pass
+
+
+def _create_backend(folder_path):
+    """依平台建立監看後端，失敗時退回輪詢"""
+    candidates = []
+    if sys.platform == 'win32':
+        candidates.append(_WindowsBackend)
+    elif sys.platform.startswith('linux'):
+        candidates.append(_InotifyBackend)
+    candidates.append(_PollingBackend)
+
+    for backend_class in candidates:
+        try:
+            return backend_class(folder_path)
+        except Exception as e:
+            debug_print(f"無法使用 {backend_class.__name__} 監看資料夾: {str(e)}", color='light_magenta')
+    raise RuntimeError(f"無法監看資料夾: {folder_path}")
+
+
+class FolderWatcher:
+    """資料夾變更監看器"""
+
+    def __init__(self, folder_path, on_new_file=None, on_removed=None, on_overflow=None, debounce=None,
+                 on_temp_file=None):
+        """
+        Args:
+            folder_path: 要監看的資料夾
+            on_new_file: callable(檔名)，檔案新增、改名或寫入後靜止 debounce 秒時呼叫
+            on_removed: callable(檔名)，檔案刪除或改名移走時呼叫
+            on_overflow: callable()，事件遺失時呼叫，呼叫端應重新完整掃描
+            debounce: 檔案最後一次變更後需靜止的秒數
+            on_temp_file: callable(檔名)，下載中的暫存檔出現時立即呼叫（不等待靜止）
+        """
+        self.folder_path = folder_path
+        self.on_new_file = on_new_file
+        self.on_removed = on_removed
+        self.on_overflow = on_overflow
+        self.on_temp_file = on_temp_file
+        self.debounce = Config.WATCH_DEBOUNCE if debounce is None else debounce
+        self.is_running = False
+        self.backend_name = None
+        self._pending = {}  # {檔名: 最後變更時間}
+        self._thread = None
+
+    def start(self):
+        """開始監看"""
+        if self.is_running:
+            return
+        backend = _create_backend(self.folder_path)
+        self.backend_name = type(backend).__name__
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, args=(backend,), daemon=True)
+        self._thread.start()
+        debug_print(f"開始監看資料夾變更: {self.folder_path}（{self.backend_name}）", color='light_cyan')
+
+    def stop(self):
+        """停止監看"""
+        self.is_running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self, backend):
+        """監看執行緒主迴圈"""
+        try:
+            while self.is_running:
+                timeout = 0.5
+                if self._pending:
+                    oldest = min(self._pending.values())
+                    timeout = max(0.05, min(timeout, oldest + self.debounce - time.monotonic()))
+                for event, name in backend.read(timeout):
+                    self._handle(event, name)
+                self._flush_due()
+        except Exception as e:
+            debug_print(f"監看資料夾時發生錯誤: {str(e)}", color='light_red')
+        finally:
+            backend.close()
+            self.is_running = False
+
+    def _handle(self, event, name):
+        """處理單一事件：新增與修改先記錄，等待靜止後再通知"""
+        if event == OVERFLOW:
+            self._pending.clear()
+            self._call(self.on_overflow)
+        elif event == REMOVED:
+            self._pending.pop(name, None)
+            self._call(self.on_removed, name)
+        elif is_temp_file(name):  # 暫存檔改名為正式檔名前不發出新檔案通知
+            if event == ADDED:
+                self._call(self.on_temp_file, name)
+        else:
+            self._pending[name] = time.monotonic()
+
+    def _flush_due(self):
+        """發出已靜止超過 debounce 秒數的檔案通知"""
+        now = time.monotonic()
+        for name, last_change in list(self._pending.items()):
+            if now - last_change < self.debounce:
+                continue
+            del self._pending[name]
+            if os.path.isfile(os.path.join(self.folder_path, name)):
+                self._call(self.on_new_file, name)
+
+    def _call(self, callback, *args):
+        """呼叫通知函數，錯誤不影響監看"""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            debug_print(f"資料夾變更通知處理時發生錯誤: {str(e)}", color='light_red')
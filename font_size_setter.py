@@ -1,9 +1,9 @@
 import win32gui
 import win32con
-from pywinauto.application import Application
 import time
 from utils import (debug_print, ensure_foreground_window, calculate_center_position, 
                   program_moving_context, check_mouse_before_move)
+from uia_session import get_uia_session
 import pyautogui
 
 @check_mouse_before_move
@@ -29,9 +29,7 @@ def set_font_size():
             debug_print("警告: 無法確保視窗在前景，但將繼續執行")
         
         # 找到字型大小下拉選單
-        app = Application(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
-        combo = main_window.child_window(title="字型大小:", control_type="ComboBox")
+        combo = get_uia_session(hwnd).child(title="字型大小:", control_type="ComboBox")
         
         debug_print("開始設定字型大小...", color='light_cyan')
         
@@ -1,12 +1,12 @@
 import win32gui
 import win32api
 import win32con
-from pywinauto.application import Application as PywinautoApp
 from datetime import datetime
 import time
 from utils import (debug_print, find_window_handle, ensure_foreground_window, 
                   get_list_items_by_id, check_mouse_before_move, program_moving_context)
 from config import Config, COLORS  # 添加這行
+from uia_session import get_uia_session
 import pyautogui
 
 # 全域變數用於控制停止
@@ -57,9 +57,8 @@ def get_list_area():
             debug_print("檢測已停止")
             return None
 
-        # 連接到應用程式
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
+        # 借用已連線的應用程式
+        main_window = get_uia_session(hwnd).main_wrapper
 
         # 找到所有列表區域
         debug_print("\n開始尋找所有列表區域:")
@@ -123,8 +122,7 @@ def start_list_area_checker():
             return None
             
         hwnd = target_windows[0][0]
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
+        main_window = get_uia_session(hwnd).main_wrapper
         
         # 獲取所有列表控件
         all_lists = main_window.descendants(control_type="List")
@@ -173,8 +171,7 @@ def list_all_controls():
             return
             
         hwnd = target_windows[0][0]
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
+        main_window = get_uia_session(hwnd).main_wrapper
         
         # 獲取所有控件
         all_controls = main_window.descendants()
@@ -200,8 +197,7 @@ def list_all_controls():
 def get_control_at_position(x, y, hwnd):
     """獲取指定位置的控件資訊"""
     try:
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
+        main_window = get_uia_session(hwnd).main_wrapper
         
         # 獲取所有控件
         all_controls = main_window.descendants()
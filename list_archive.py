@@ -0,0 +1,122 @@
+"""
+列表封存模組
+功能: 保存每個日期的三個報告列表，分析過去日期時直接使用封存，不必在行事曆上來回切換
+職責:
+- 每個日期一筆紀錄：三個列表的名稱（JSON，zlib 壓縮）與內容指紋
+- 內容未變更時只更新收集時間
+- 判斷封存是否可直接使用：日期結束後才收集、且未超過保存期限
+依賴: config.py, utils.py, control_info.py
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from config import Config
+from utils import debug_print
+from control_info import LIST_CONTROLS
+
+# 封存的列表：日期、{list_type: [名稱, ...]}、內容指紋、收集時間（time.time）
+ArchivedLists = namedtuple('ArchivedLists', ['date', 'lists', 'fingerprint', 'collected_at'])
+
+
+def _fingerprint(payload):
+    """列表內容指紋"""
+    return hashlib.sha1(payload).hexdigest()
+
+
+class ListArchive:
+    """以日期為鍵的列表封存"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.LIST_ARCHIVE_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lists (
+                date TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                collected_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def save(self, calendar_date, lists):
+        """
+        保存某日期的列表（lists: {list_type: [名稱, ...]}）
+        返回: 內容是否與先前封存不同
+        """
+        lists = {list_type: list(lists.get(list_type, [])) for list_type in LIST_CONTROLS}
+        payload = json.dumps(lists, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        fingerprint = _fingerprint(payload)
+        key = calendar_date.strftime('%Y-%m-%d')
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint FROM lists WHERE date = ?", (key,)).fetchone()
+            changed = row is None or row[0] != fingerprint
+            if changed:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO lists (date, fingerprint, payload, collected_at) VALUES (?, ?, ?, ?)",
+                    (key, fingerprint, zlib.compress(payload), time.time())
+                )
+            else:
+                self._conn.execute("UPDATE lists SET collected_at = ? WHERE date = ?", (time.time(), key))
+            self._conn.commit()
+        return changed
+
+    def load(self, calendar_date):
+        """讀取某日期的封存，沒有時返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, payload, collected_at FROM lists WHERE date = ?",
+                (calendar_date.strftime('%Y-%m-%d'),)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            lists = json.loads(zlib.decompress(row[1]).decode('utf-8'))
+        except Exception as e:
+            debug_print(f"讀取 {calendar_date} 的列表封存時發生錯誤: {str(e)}", color='light_red')
+            return None
+        return ArchivedLists(calendar_date, lists, row[0], row[2])
+
+    def load_fresh(self, calendar_date, max_age_days=None):
+        """
+        讀取可直接使用的封存：
+        必須在該日期結束後才收集（當日收集的列表可能仍會增加），且收集時間未超過 max_age_days 天
+        """
+        max_age_days = Config.LIST_ARCHIVE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        archived = self.load(calendar_date)
+        if archived is None:
+            return None
+        collected = datetime.fromtimestamp(archived.collected_at)
+        if collected.date() <= calendar_date:
+            return None
+        if (datetime.now() - collected).days > max_age_days:
+            return None
+        return archived
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 全域封存
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_list_archive():
+    """取得全域列表封存（第一次使用時開啟資料庫）"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ListArchive()
+        return _archive
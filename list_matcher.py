@@ -0,0 +1,111 @@
+"""
+列表比對模組
+功能: 比對下載檔名與各時間點收集到的列表，找不到完全相同的項目時列出最接近的候選
+職責:
+- 將列表名稱標準化後駐留 (intern)，每個名稱以位元集合記錄出現在哪些時間點
+- 完全比對只需一次字典查詢，不論時間點與列表長度
+- 以字元 n-gram 倒排索引找出相似的列表項目，並計算相似度分數
+依賴: config.py, report_metadata.py
+"""
+
+import sys
+from collections import namedtuple
+from config import Config
+from report_metadata import get_report_metadata
+
+# 近似匹配：相似度 (0~1)、列表中的原始名稱、出現的時間點
+NearMatch = namedtuple('NearMatch', ['score', 'name', 'horizons'])
+
+
+def _ngrams(key, size):
+    """字串的字元 n-gram 集合（長度不足時以整個字串為一個 gram）"""
+    if len(key) <= size:
+        return {key} if key else set()
+    return {key[i:i + size] for i in range(len(key) - size + 1)}
+
+
+class ListMatcher:
+    """以時間點位元集合與 n-gram 索引比對檔名"""
+
+    def __init__(self, horizons=None, ngram_size=None):
+        """
+        Args:
+            horizons: 時間點名稱（依序對應位元），預設為 Config.HORIZON_DAYS 的所有時間點
+            ngram_size: 近似比對使用的 n-gram 長度
+        """
+        self.horizons = list(horizons or Config.HORIZON_DAYS)
+        self._bits = {horizon: 1 << index for index, horizon in enumerate(self.horizons)}
+        self.ngram_size = ngram_size or Config.FUZZY_NGRAM_SIZE
+        self._masks = {}  # {標準化名稱: 時間點位元集合}
+        self._names = {}  # {標準化名稱: 第一次出現的原始名稱}
+        self._grams = {}  # {標準化名稱: n-gram 集合}
+        self._postings = {}  # {n-gram: set(標準化名稱)}
+
+    @classmethod
+    def from_lists(cls, lists_dict, horizons=None):
+        """由 {時間點: [名稱, ...]} 建立比對器"""
+        matcher = cls(horizons or list(lists_dict))
+        for horizon, names in lists_dict.items():
+            matcher.add_list(horizon, names)
+        return matcher
+
+    def add_list(self, horizon, names):
+        """加入一個時間點的列表"""
+        if horizon not in self._bits:
+            self._bits[horizon] = 1 << len(self.horizons)
+            self.horizons.append(horizon)
+        bit = self._bits[horizon]
+        for name in names:
+            if not name:
+                continue
+            key = get_report_metadata(str(name)).key
+            if not key:
+                continue
+            mask = self._masks.get(key)
+            if mask is None:
+                key = sys.intern(key)
+                self._masks[key] = bit
+                self._names[key] = str(name)
+                grams = _ngrams(key, self.ngram_size)
+                self._grams[key] = grams
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(key)
+            else:
+                self._masks[key] = mask | bit
+
+    def __len__(self):
+        return len(self._masks)
+
+    def horizons_of(self, mask):
+        """位元集合轉為時間點名稱列表（依時間點順序）"""
+        return [horizon for horizon in self.horizons if mask & self._bits[horizon]]
+
+    def match(self, filename, has_extension=True):
+        """完全比對：返回檔名出現的時間點列表，沒有時返回空列表"""
+        key = get_report_metadata(filename, has_extension).key
+        return self.horizons_of(self._masks.get(key, 0))
+
+    def nearest(self, filename, has_extension=True, limit=None, threshold=None):
+        """
+        近似比對：以 n-gram 的 Dice 係數計算相似度
+        返回: [NearMatch, ...]，依相似度由高到低，最多 limit 筆且分數不低於 threshold
+        """
+        limit = limit or Config.FUZZY_MATCH_LIMIT
+        threshold = Config.FUZZY_MATCH_THRESHOLD if threshold is None else threshold
+        grams = _ngrams(get_report_metadata(filename, has_extension).key, self.ngram_size)
+        if not grams:
+            return []
+
+        # 只計算至少共用一個 n-gram 的項目
+        shared = {}
+        for gram in grams:
+            for key in self._postings.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        scored = []
+        for key, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._grams[key]))
+            if score >= threshold:
+                scored.append(NearMatch(score, self._names[key], self.horizons_of(self._masks[key])))
+        scored.sort(key=lambda near: (-near.score, near.name))
+        return scored[:limit]
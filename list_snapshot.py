@@ -0,0 +1,290 @@
+"""
+列表快照模組
+功能: 一次走訪取得三個報告列表所有項目的名稱、位置、選取狀態與序號
+職責:
+- 使用 UIA 快取請求 (CacheRequest) 批次抓取屬性，避免逐項跨行程呼叫
+- 將結果轉為純資料紀錄 (ListItemRecord)，供所有流程共用
+- 列表刷新、捲動或視窗移動時自動失效
+依賴: config.py, utils.py, control_info.py, uia_session.py
+"""
+
+import threading
+import time
+from collections import namedtuple
+import win32gui
+from config import Config
+from utils import debug_print
+from control_info import LIST_CONTROLS
+from uia_session import get_uia_session
+
+# 列表項目紀錄（純資料，不持有任何 UIA 物件）
+ListItemRecord = namedtuple('ListItemRecord', ['list_type', 'index', 'name', 'rect', 'is_selected'])
+
+# 矩形區域（與 pywinauto 的 RECT 具有相同的 left/top/right/bottom 屬性）
+ItemRect = namedtuple('ItemRect', ['left', 'top', 'right', 'bottom'])
+
+# 快照快取，以視窗句柄為鍵
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+class ListSnapshot:
+    """三個報告列表在某一時間點的快照"""
+
+    def __init__(self, hwnd, window_rect, lists, taken_at=None):
+        """
+        Args:
+            hwnd: 視窗句柄
+            window_rect: 擷取時的視窗位置 (left, top, right, bottom)
+            lists: {list_type: {'rect': ItemRect, 'items': [ListItemRecord, ...]}}
+            taken_at: 擷取時間（time.monotonic）
+        """
+        self.hwnd = hwnd
+        self.window_rect = window_rect
+        self.lists = lists
+        self.taken_at = taken_at if taken_at is not None else time.monotonic()
+        self.invalidated = False
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """建立名稱索引，同名項目以第一個出現者為準"""
+        self._by_name = {}
+        for list_type in LIST_CONTROLS:
+            for record in self.items(list_type):
+                self._by_name.setdefault((list_type, record.name), record)
+                self._by_name.setdefault((None, record.name), record)
+
+    def items(self, list_type=None):
+        """取得指定列表（或全部列表）的項目紀錄"""
+        if list_type:
+            return list(self.lists.get(list_type, {}).get('items', []))
+        all_items = []
+        for each_type in LIST_CONTROLS:
+            all_items.extend(self.lists.get(each_type, {}).get('items', []))
+        return all_items
+
+    def names(self, list_type=None):
+        """取得指定列表（或全部列表）的項目名稱，略過空白名稱"""
+        return [record.name for record in self.items(list_type) if record.name]
+
+    def list_rect(self, list_type):
+        """取得列表控件的矩形區域"""
+        return self.lists.get(list_type, {}).get('rect')
+
+    def find(self, name, list_type=None):
+        """依名稱尋找項目紀錄，找不到時返回 None"""
+        return self._by_name.get((list_type, name))
+
+    def selected(self):
+        """取得目前被選取的項目紀錄，沒有時返回 None"""
+        for record in self.items():
+            if record.is_selected:
+                return record
+        return None
+
+    def replace_list(self, list_type, list_data):
+        """以重新擷取的資料取代單一列表"""
+        self.lists[list_type] = list_data
+        self.taken_at = time.monotonic()
+        self._rebuild_index()
+
+    def invalidate(self):
+        """標記快照失效"""
+        self.invalidated = True
+
+    def is_valid(self, max_age=None):
+        """檢查快照是否仍可使用：未被標記失效、未過期、視窗未移動"""
+        if self.invalidated:
+            return False
+        max_age = Config.LIST_SNAPSHOT_MAX_AGE if max_age is None else max_age
+        if max_age is not None and time.monotonic() - self.taken_at > max_age:
+            return False
+        try:
+            return win32gui.GetWindowRect(self.hwnd) == self.window_rect
+        except Exception:
+            return False
+
+
+def get_iuia():
+    """取得 pywinauto 的 IUIAutomation 單例，無法使用時返回 None"""
+    try:
+        from pywinauto.uia_defines import IUIA
+        return IUIA()
+    except Exception:
+        return None
+
+
+def _capture_list_cached(list_element, list_type, iuia):
+    """使用 UIA 快取請求一次取得列表所有項目的屬性"""
+    uia_dll = iuia.UIA_dll
+    cache_request = iuia.iuia.CreateCacheRequest()
+    cache_request.AddProperty(uia_dll.UIA_NamePropertyId)
+    cache_request.AddProperty(uia_dll.UIA_BoundingRectanglePropertyId)
+    cache_request.AddProperty(uia_dll.UIA_SelectionItemIsSelectedPropertyId)
+
+    condition = iuia.iuia.CreatePropertyCondition(
+        uia_dll.UIA_ControlTypePropertyId,
+        iuia.known_control_types['ListItem']
+    )
+    elements = list_element.FindAllBuildCache(iuia.tree_scope['descendants'], condition, cache_request)
+
+    records = []
+    for index in range(elements.Length):
+        element = elements.GetElement(index)
+        bounds = element.CachedBoundingRectangle
+        try:
+            is_selected = bool(element.GetCachedPropertyValue(uia_dll.UIA_SelectionItemIsSelectedPropertyId))
+        except Exception:
+            is_selected = False
+        records.append(ListItemRecord(
+            list_type=list_type,
+            index=index,
+            name=element.CachedName or '',
+            rect=ItemRect(bounds.left, bounds.top, bounds.right, bounds.bottom),
+            is_selected=is_selected
+        ))
+    return records
+
+
+def _capture_list_fallback(list_control, list_type):
+    """無法使用快取請求時，逐項讀取（每個屬性只讀一次）"""
+    records = []
+    for index, item in enumerate(list_control.descendants(control_type="ListItem")):
+        rect = item.rectangle()
+        try:
+            is_selected = bool(item.is_selected())
+        except Exception:
+            is_selected = False
+        records.append(ListItemRecord(
+            list_type=list_type,
+            index=index,
+            name=item.window_text() or '',
+            rect=ItemRect(rect.left, rect.top, rect.right, rect.bottom),
+            is_selected=is_selected
+        ))
+    return records
+
+
+def _get_list_control(session, list_id):
+    """從連線借用已解析的列表控件，快取失效時重新解析一次"""
+    list_control = session.child(auto_id=list_id)
+    try:
+        list_control.element_info.element.CurrentProcessId
+        return list_control
+    except Exception:
+        session.forget_child(auto_id=list_id)
+        return session.child(auto_id=list_id)
+
+
+def capture_list(hwnd, list_type, iuia=None):
+    """擷取單一列表的矩形區域與所有項目紀錄"""
+    list_info = LIST_CONTROLS[list_type]
+    list_control = _get_list_control(get_uia_session(hwnd), list_info['id'])
+    rect = list_control.rectangle()
+    list_rect = ItemRect(rect.left, rect.top, rect.right, rect.bottom)
+
+    iuia = iuia or get_iuia()
+    if iuia is not None:
+        try:
+            items = _capture_list_cached(list_control.element_info.element, list_type, iuia)
+            return {'rect': list_rect, 'items': items}
+        except Exception as e:
+            debug_print(f"快取擷取 [{list_info['name']}] 失敗，改為逐項讀取: {str(e)}", color='light_magenta')
+
+    return {'rect': list_rect, 'items': _capture_list_fallback(list_control, list_type)}
+
+
+def capture_list_names(hwnd, list_type, iuia=None):
+    """只擷取單一列表的項目名稱（供刷新檢測計算指紋，成本低於完整擷取）"""
+    list_info = LIST_CONTROLS[list_type]
+    list_control = _get_list_control(get_uia_session(hwnd), list_info['id'])
+
+    iuia = iuia or get_iuia()
+    if iuia is not None:
+        try:
+            uia_dll = iuia.UIA_dll
+            cache_request = iuia.iuia.CreateCacheRequest()
+            cache_request.AddProperty(uia_dll.UIA_NamePropertyId)
+            condition = iuia.iuia.CreatePropertyCondition(
+                uia_dll.UIA_ControlTypePropertyId,
+                iuia.known_control_types['ListItem']
+            )
+            elements = list_control.element_info.element.FindAllBuildCache(
+                iuia.tree_scope['descendants'], condition, cache_request)
+            return [elements.GetElement(i).CachedName or '' for i in range(elements.Length)]
+        except Exception:
+            pass
+
+    return [item.window_text() or '' for item in list_control.descendants(control_type="ListItem")]
+
+
+def get_selected_name(hwnd, list_type):
+    """讀取列表目前選取項目的名稱（透過 SelectionPattern，一次跨行程呼叫），沒有選取時返回 None"""
+    list_control = _get_list_control(get_uia_session(hwnd), LIST_CONTROLS[list_type]['id'])
+    try:
+        selection = list_control.iface_selection.GetCurrentSelection()
+        if selection.Length:
+            return selection.GetElement(0).CurrentName or ''
+        return None
+    except Exception:
+        for item in list_control.descendants(control_type="ListItem"):
+            if item.is_selected():
+                return item.window_text() or ''
+        return None
+
+
+def capture_list_snapshot(hwnd, list_types=None):
+    """擷取三個列表的完整快照"""
+    iuia = get_iuia()
+    lists = {}
+    for list_type in (list_types or LIST_CONTROLS):
+        try:
+            lists[list_type] = capture_list(hwnd, list_type, iuia)
+        except Exception as e:
+            debug_print(f"擷取 {LIST_CONTROLS[list_type]['name']} 列表時發生錯誤: {str(e)}", color='light_red')
+            lists[list_type] = {'rect': None, 'items': []}
+
+    try:
+        window_rect = win32gui.GetWindowRect(hwnd)
+    except Exception:
+        window_rect = None
+    return ListSnapshot(hwnd, window_rect, lists)
+
+
+def get_list_snapshot(hwnd, refresh=False):
+    """取得列表快照，快取仍有效時直接返回，否則重新擷取"""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(hwnd)
+        if not refresh and snapshot is not None and snapshot.is_valid():
+            return snapshot
+
+    snapshot = capture_list_snapshot(hwnd)
+    with _snapshots_lock:
+        _snapshots[hwnd] = snapshot
+    for list_type in LIST_CONTROLS:
+        debug_print(f"快照 [{LIST_CONTROLS[list_type]['name']}] 共 {len(snapshot.items(list_type))} 個項目", color='light_blue')
+    return snapshot
+
+
+def refresh_list_in_snapshot(hwnd, list_type):
+    """只重新擷取單一列表（例如捲動後），並更新快取中的快照"""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(hwnd)
+    if snapshot is None or snapshot.invalidated:
+        return get_list_snapshot(hwnd, refresh=True)
+
+    try:
+        snapshot.replace_list(list_type, capture_list(hwnd, list_type))
+    except Exception as e:
+        debug_print(f"重新擷取 {LIST_CONTROLS[list_type]['name']} 列表時發生錯誤: {str(e)}", color='light_red')
+        snapshot.invalidate()
+    return snapshot
+
+
+def invalidate_list_snapshot(hwnd=None):
+    """使指定視窗（或全部視窗）的列表快照失效"""
+    with _snapshots_lock:
+        targets = [_snapshots.get(hwnd)] if hwnd is not None else list(_snapshots.values())
+    for snapshot in targets:
+        if snapshot is not None:
+            snapshot.invalidate()
@@ -2,7 +2,6 @@ import keyboard
 import pywinauto
 import pyautogui
 import time
-from pywinauto.application import Application as PywinautoApp
 import sys
 import psutil
 import win32gui
@@ -13,15 +12,26 @@ from datetime import datetime, timedelta
 from calendar_checker import start_calendar_checker, start_click_calendar_blank
 from get_list_area import start_list_area_checker, set_stop, list_all_controls, monitor_clicks
 from utils import (debug_print, find_window_handle, ensure_foreground_window, 
-                  get_list_items_by_id, calculate_center_position, refresh_checking, 
-                  start_refresh_check, stop_refresh_check, click_at, move_to_safe_position, 
+                  get_list_items_by_id, calculate_center_position, click_at, move_to_safe_position, 
                   check_mouse_movement, scroll_to_file, is_file_visible, switch_to_list, 
-                  reset_mouse_position, check_mouse_before_move)
+                  reset_mouse_position, check_mouse_before_move, check_error_dialog)
 from scheduler import Scheduler
 from font_size_setter import set_font_size
 from chrome_monitor import start_chrome_monitor
 from folder_monitor import start_folder_monitor, FolderMonitor
 from config import Config, COLORS  # 添加這行
+from control_info import LIST_CONTROLS
+from list_snapshot import get_list_snapshot, refresh_list_in_snapshot, get_selected_name
+from download_plan import DownloadPlan, DownloadPolicy
+from download_tracker import DownloadTracker
+from report_metadata import get_report_metadata
+from uia_session import get_app, get_uia_session
+from download_ledger import get_download_ledger, horizon_to_date
+from list_archive import get_list_archive
+from download_archiver import start_daily_archive
+from wait_conditions import (wait_until, save_wait_stats, new_chrome_tab, chrome_in_foreground,
+                             focus_returned, list_refreshed, hotkeys_released)
+from refresh_detector import start_refresh_check, stop_refresh_check, get_refresh_detector
 from test_terminal import test_terminal_support
 
 class FileProcessor:
@@ -38,7 +48,7 @@ class FileProcessor:
         if count <= 0:
             return
                 
-        time.sleep(Config.CLOSE_WINDOW_INTERVAL * 6)  # 等待時間確保視窗完全打開
+        wait_until(chrome_in_foreground(), '關閉分頁前')  # 等待瀏覽器分頁開啟
         
         try:
             # 按下 CTRL
@@ -61,8 +71,11 @@ class FileProcessor:
             # 確保 CTRL 鍵被釋放
             keyboard.release('ctrl')
 
-    def process_files(self, app, hwnd, window_title, should_stop_callback):
-        """處理檔案"""
+    def process_files(self, app, hwnd, window_title, should_stop_callback, horizon=None):
+        """
+        處理檔案
+        horizon: 目前列表的時間點（今日、昨日、1週前...），用於查詢下載紀錄
+        """
         try:
             if should_stop_callback():
                 debug_print("[DEBUG] 下載開始前檢測到停止信號", color='light_yellow')
@@ -72,13 +85,10 @@ class FileProcessor:
                 debug_print("錯誤: 無法確保視窗可見", color='light_red')
                 return
 
-            # 連接到視窗
-            main_window = app.window(handle=hwnd)
-            
             # 應該在這裡也重置滑鼠位置記錄
             reset_mouse_position()  # 添加這行
             
-            # 預加載所有列表區域和檔案信息
+            # 預加載所有列表區域和檔案信息（一次走訪取得快照）
             list_areas = {}
             list_files = {}
             list_types = [
@@ -88,177 +98,304 @@ class FileProcessor:
             ]
             
             debug_print("開始預加載列表信息...", color='light_cyan')
+            snapshot = get_list_snapshot(hwnd)
             for list_type, list_name in list_types:
-                try:
-                    # 預加載列表區域
-                    list_areas[list_type] = main_window.child_window(
-                        auto_id=f"listBox{list_type.capitalize()}Reports"
-                    )
-                    # 預加載檔案信息
-                    list_files[list_type] = get_list_items_by_id(main_window, list_type)
-                    debug_print(f"已預加載 [{list_name}] 列表，共 {len(list_files[list_type])} 個檔案", color='light_green')
-                except Exception as e:
-                    debug_print(f"預加載 {list_name} 列表時發生錯誤: {str(e)}", color='light_red')
-            
-            # 初始化全域的已下載檔案集合
-            downloaded_files = set()
-            is_first_click = True
-            click_count = 0
-            current_list_index = 0
+                list_areas[list_type] = snapshot.list_rect(list_type)
+                list_files[list_type] = snapshot.items(list_type)
+                debug_print(f"已預加載 [{list_name}] 列表，共 {len(list_files[list_type])} 個檔案", color='light_green')
             
-            while True:
-                # 重置列表位置到第一個列表（如果不是第一次循環）
-                if current_list_index > 0:
-                    debug_print("重置列表位置到第一個列表", color='light_cyan')
-                    for _ in range(current_list_index):
-                        switch_to_list(hwnd)
-                    current_list_index = 0
+            # 建立下載計畫：一次決定順序與列表切換點，並略過不需下載的項目
+            # 下載政策先以排除規則篩選，複製時會被排除的報告不點擊、不開分頁
+            ledger = get_download_ledger()
+            policy = DownloadPolicy(horizon)
+            calendar_date = horizon_to_date(horizon)
+            planned_names = set()
+
+            def should_skip(record):
+                """判斷項目是否略過，返回略過原因"""
+                reason = policy.skip_reason(record)
+                if reason:
+                    return reason
+                if record.name in planned_names:
+                    return '重複'
+                if ledger.is_done(record.list_type, record.name, calendar_date):
+                    return '已下載'
+                planned_names.add(record.name)
+                return None
+
+            plan = DownloadPlan.build(snapshot, should_skip)
+            policy.log_excluded()
+            for list_type, list_name in list_types:
+                skipped = sum(1 for record, reason in plan.skipped if record.list_type == list_type and reason == '已下載')
+                if skipped:
+                    debug_print(f"[{list_name}] 略過 {skipped} 個先前已下載的檔案", color='light_yellow')
+                excluded = sum(1 for record, reason in plan.skipped if record.list_type == list_type and reason == '排除')
+                if excluded:
+                    debug_print(f"[{list_name}] 略過 {excluded} 個符合排除規則的檔案", color='light_yellow')
+                overridden = sum(1 for item in plan.items if item.list_type == list_type and policy.is_overridden(item.record))
+                if overridden:
+                    debug_print(f"[{list_name}] 依 {horizon} 的例外設定，仍下載 {overridden} 個符合排除規則的檔案",
+                                color='light_yellow')
+                if plan.count(list_type):
+                    debug_print(f"[{list_name}] 找到 {plan.count(list_type)} 個未下載檔案", color='white')
+                else:
+                    debug_print(f"[{list_name}] 沒有新的檔案需要下載", color='light_yellow')
+
+            if not len(plan):
+                debug_print("所有檔案已下載完成", color='light_green')
+                return
+
+            debug_print(f"本輪需要下載 {len(plan)} 個檔案", color='light_green')
+
+            self.is_first_click = True
+            tracker = DownloadTracker()
+
+            def reconcile():
+                """對應已落地的檔案，並將逾時未落地的項目重新排入計畫"""
+                for download in tracker.poll():
+                    debug_print(f"下載完成: {download.name} -> {download.file_name}", color='white')
+                    plan.complete(download.item)
+                    ledger.mark_landed(download.item.list_type, download.name, calendar_date, download.file_name)
                 
-                # 使用預加載的數據獲取所有未下載的檔案
-                all_files = []
-                valid_areas = []
+                for download in tracker.take_overdue():
+                    retried = plan.fail(download.item)
+                    if retried is None:
+                        continue  # 已由較晚落地的檔案完成
+                    if retried:
+                        debug_print(f"檔案未落地，重新排入: {download.name}", color='light_magenta')
+                    else:
+                        debug_print(f"檔案始終未落地: {download.name}", color='light_red')
+
+            def close_landed_tabs(min_count):
+                """關閉最後開啟且已落地的分頁（達到 min_count 才關閉）"""
+                count = tracker.closable_tab_count()
+                if count and count >= min_count:
+                    self.close_windows(count)
+                    tracker.tabs_closed(count)
+
+            def on_opened(item):
+                """項目點擊成功：開始追蹤檔案落地，並關閉已落地的分頁"""
+                debug_print(f"已開啟: {item.name}", color='white')
+                ledger.mark_clicked(item.list_type, item.name, calendar_date)
                 
-                for list_type, list_name in list_types:
-                    if list_type in list_files and list_files[list_type]:
-                        # 使用預加載的列表區域
-                        valid_areas.append(list_areas[list_type])
-                        
-                        # 使用預加載的檔案信息
-                        valid_files = [
-                            (file, len(valid_areas) - 1) 
-                            for file in list_files[list_type]
-                            if not file.window_text().endswith("_公司") and 
-                               file.window_text() not in downloaded_files
-                        ]
-                        
-                        if valid_files:
-                            all_files.extend(valid_files)
-                            debug_print(f"[{list_name}] 找到 {len(valid_files)} 個未下載檔案", color='white')
-                        else:
-                            debug_print(f"[{list_name}] 沒有新的檔案需要下載", color='light_yellow')
+                # 第一個分頁保留不關（避免瀏覽器視窗關閉）
+                tracker.track(item, has_tab=not self.is_first_click)
+                self.is_first_click = False
                 
-                if not all_files:
-                    debug_print("所有檔案已下載完成", color='light_green')
-                    break
+                reconcile()
+                close_landed_tabs(Config.TAB_CLOSE_BATCH)
+                
+                # 開啟的分頁達到上限時，等待最後開啟的分頁落地後再繼續點擊
+                if tracker.open_tab_count() >= Config.CLICK_BATCH_SIZE:
+                    wait_until(tabs_closable, '等待分頁可關閉', timeout=Config.DOWNLOAD_LAND_TIMEOUT)
+                    close_landed_tabs(1)
+
+            def tabs_closable():
+                """條件：最後開啟的分頁已落地或逾時"""
+                reconcile()
+                return tracker.closable_tab_count()
+
+            def downloads_settled():
+                """條件：所有已點擊的項目都已落地或逾時"""
+                reconcile()
+                return tracker.all_settled()
+
+            tracker.start()
+            try:
+                while True:
+                    if Config.DOWNLOAD_MODE == 'keyboard':
+                        debug_print("使用鍵盤模式下載", color='light_cyan')
+                        finished = self.run_plan_by_keyboard(plan, hwnd, window_title, should_stop_callback, on_opened)
+                    else:
+                        finished = self.run_plan_by_mouse(plan, hwnd, window_title, should_stop_callback, list_areas, on_opened)
+                    if not finished:
+                        return
 
-                debug_print(f"本輪需要下載 {len(all_files)} 個檔案", color='light_green')
+                    # 等待尚未落地的檔案；逾時的項目會重新排入計畫，再執行一輪
+                    wait_until(downloads_settled, '等待檔案落地', timeout=Config.DOWNLOAD_LAND_TIMEOUT)
+                    reconcile()
+                    if not plan.pending_count():
+                        break
+            finally:
+                tracker.stop()
 
-                # 下載檔案
-                for file, area_index in all_files:
-                    if should_stop_callback(): 
-                        return
+            # 關閉剩餘的Chrome視窗
+            self.close_windows(tracker.open_tab_count())
+            tracker.tabs_closed(tracker.open_tab_count())
 
-                    try:
-                        file_name = file.window_text()
-                        list_area = valid_areas[area_index]
-                        
-                        # 如果需要切換到不同的列表
-                        if area_index != current_list_index:
-                            debug_print(f"切換列表: 從 {current_list_index} 到 {area_index}", color='light_cyan')
-                            for _ in range(area_index - current_list_index):
-                                switch_to_list(hwnd)
-                            current_list_index = area_index
-                            time.sleep(Config.SLEEP_INTERVAL * 2)  # 等待列表切換完成
-                        
-                        # 檢查檔案可見性
-                        if not is_file_visible(file, list_area):
-                            debug_print(f"檔案 '{file_name}' 不在可視範圍內，嘗試調整位置", color='light_magenta')
-                            if not scroll_to_file(file, list_area, hwnd):
-                                debug_print(f"無法使檔案 '{file_name}' 進入可視範圍，跳過")
-                                continue
-                        
-                        # 執行點擊並檢查結果
-                        rect = file.rectangle()
-                        center_x, center_y = calculate_center_position(rect)
-                        if center_x is None or center_y is None:
-                            debug_print("無法計算檔案位置，跳過此檔案")
-                            continue
-                        
-                        if click_at(
-                            center_x, 
-                            center_y, 
-                            clicks=2, 
-                            interval=Config.DOUBLE_CLICK_INTERVAL,
-                            sleep_interval=Config.DOWNLOAD_INTERVAL,
-                            is_first_click=is_first_click, 
-                            hwnd=hwnd, 
-                            window_title=window_title,
-                            expected_text=file_name
-                        ):  # 只有在點擊成功時才執行後續操作
-                            debug_print(f"下載完成: {file_name}", color='white')
-                            
-                            # 如果這是第一次點擊，多等待一段時間
-                            if is_first_click:
-                                is_first_click = False
-                            else:
-                                click_count += 1
-                                # 如果達到批次大小，關閉視窗
-                                if click_count >= Config.CLICK_BATCH_SIZE:
-                                    self.close_windows(Config.CLICK_BATCH_SIZE)
-                                    click_count = 0
-
-                            downloaded_files.add(file_name)  # 只有在點擊成功時才加入下載清單
-                        else:
-                            debug_print(f"下載失敗: {file_name}", color='light_red')
-                            continue  # 如果點擊失敗，跳過後續操作
-
-                        if self.is_last_file_in_list(file, area_index, all_files):
-                            if area_index == len(valid_areas) - 1:
-                                debug_print(f"已經是最後一個列表，跳過切換", color='light_yellow')
-                            else:
-                                debug_print(f"切換到下一個列表", color='light_cyan')
-                                switch_to_list(hwnd)
-                                current_list_index += 1  # 更新當前列表索引
-
-                    except Exception as e:
-                        debug_print(f"處理檔案時發生錯誤: {str(e)}", color='light_red')
-                        continue
+            if plan.failed:
+                debug_print(f"有 {len(plan.failed)} 個檔案重試 {plan.max_attempts} 次後仍失敗:", color='light_red')
+                for item in plan.failed:
+                    debug_print(f"- {item.name}", color='light_red')
 
-                # 關閉剩餘的Chrome視窗
-                if click_count > 0:
-                    self.close_windows(click_count)
+            tracker.log_summary()
+            debug_print(f"所有檔案下載完成，成功 {len(plan.completed)} 個", color='light_green')
 
-                # 檢查是否有漏掉的檔案
-                debug_print("檢查是否有漏掉的檔案...", color='light_cyan')
+        except Exception as e:
+            debug_print(f"處理檔案時發生錯誤: {str(e)}", color='light_red')
+
+    def run_plan_by_mouse(self, plan, hwnd, window_title, should_stop_callback, list_areas, on_opened):
+        """
+        以滑鼠雙擊執行下載計畫
+        返回: False=收到停止信號, True=計畫執行完畢
+        """
+        current_list_type = plan.items[0].list_type
+
+        while True:
+            if should_stop_callback(): 
+                return False
+
+            item = plan.next_item()
+            if item is None:
+                return True
+
+            try:
+                file = item.record
+                file_name = item.name
+                list_type = item.list_type
+
+                # 重試時列表可能已捲動，只重新擷取該列表取得最新位置
+                if item.attempts > 0:
+                    debug_print(f"重試第 {item.attempts} 次: {file_name}", color='light_magenta')
+                    refreshed = refresh_list_in_snapshot(hwnd, list_type)
+                    file = refreshed.find(file_name, list_type) or file
+                    list_areas[list_type] = refreshed.list_rect(list_type) or list_areas[list_type]
+                list_area = list_areas[list_type]
                 
-                # 獲取所有檔案（不含_公司）
-                current_files = set()
-                for list_type, _ in list_types:
-                    files = get_list_items_by_id(main_window, list_type)
-                    current_files.update(
-                        file.window_text() for file in files 
-                        if not file.window_text().endswith("_公司")
-                    )
-
-                # 找出漏掉的檔案
-                missed_files = current_files - downloaded_files
-
-                if not missed_files:  # 如果沒有漏掉的檔案，跳出循環
-                    debug_print("沒有漏掉的檔案，下載完成", color='light_green')
-                    break
+                # 如果需要切換到不同的列表
+                if list_type != current_list_type:
+                    debug_print(f"切換列表: 從 {current_list_type} 到 {list_type}", color='light_cyan')
+                    switch_to_list(hwnd, list_type, next_list=False)
+                    current_list_type = list_type
+                    time.sleep(Config.SLEEP_INTERVAL * 2)  # 等待列表切換完成
+                
+                # 檢查檔案可見性
+                if not is_file_visible(file, list_area):
+                    debug_print(f"檔案 '{file_name}' 不在可視範圍內，嘗試調整位置", color='light_magenta')
+                    if not scroll_to_file(file, list_area, hwnd):
+                        debug_print(f"無法使檔案 '{file_name}' 進入可視範圍", color='light_red')
+                        plan.fail(item)
+                        continue
+                    # 捲動後項目位置已改變，從更新後的快照取得最新位置
+                    file = get_list_snapshot(hwnd).find(file_name, list_type) or file
+                
+                # 執行點擊並檢查結果
+                center_x, center_y = calculate_center_position(file.rect)
+                if center_x is None or center_y is None:
+                    debug_print("無法計算檔案位置", color='light_red')
+                    plan.fail(item)
+                    continue
+                
+                if click_at(
+                    center_x, 
+                    center_y, 
+                    clicks=2, 
+                    interval=Config.DOUBLE_CLICK_INTERVAL,
+                    sleep_interval=Config.DOWNLOAD_INTERVAL,
+                    is_first_click=self.is_first_click, 
+                    hwnd=hwnd, 
+                    window_title=window_title,
+                    expected_text=file_name
+                ):  # 只有在點擊成功時才執行後續操作
+                    on_opened(item)
                 else:
-                    debug_print(f"發現 {len(missed_files)} 個漏掉的檔案，繼續下載...", color='light_cyan')
-                    # 下一輪循環將只處理漏掉的檔案
+                    debug_print(f"下載失敗: {file_name}", color='light_red')
+                    plan.fail(item)
 
-            debug_print("所有檔案下載完成", color='light_green')
+            except Exception as e:
+                debug_print(f"處理檔案時發生錯誤: {str(e)}", color='light_red')
+                plan.fail(item)
+
+    def run_plan_by_keyboard(self, plan, hwnd, window_title, should_stop_callback, on_opened):
+        """
+        以鍵盤執行下載計畫：每個列表只聚焦一次並選取第一項，
+        之後以方向鍵移動到目標項目、驗證選取名稱後按開啟鍵，不需要座標計算與捲動
+        返回: False=收到停止信號, True=計畫執行完畢
+        """
+        current_list_type = None
+        current_index = 0
+
+        while True:
+            if should_stop_callback():
+                return False
 
-        except Exception as e:
-            debug_print(f"處理檔案時發生錯誤: {str(e)}", color='light_red')
+            item = plan.next_item()
+            if item is None:
+                return True
 
-    def is_last_file_in_list(self, current_file, list_index, all_files):
-        """判斷是否為當前列表的最後一個檔案"""
-        current_index = all_files.index((current_file, list_index))
-        if current_index + 1 >= len(all_files):
-            return True
-        next_file, next_list_index = all_files[current_index + 1]
-        return next_list_index != list_index
+            try:
+                list_type = item.list_type
+                target_index = item.record.index
 
-    def get_all_files(self, main_window):
+                # 確保視窗在前景（開啟項目後焦點會被瀏覽器搶走）
+                if not ensure_foreground_window(hwnd, window_title):
+                    debug_print("視窗不在前景", color='light_red')
+                    plan.fail(item)
+                    continue
+
+                # 每個列表只聚焦一次，並選取第一項
+                if list_type != current_list_type:
+                    debug_print(f"聚焦列表: {LIST_CONTROLS[list_type]['name']}", color='light_cyan')
+                    if not switch_to_list(hwnd, list_type, next_list=False, press_list_top_or_bottom='top'):
+                        plan.fail(item)
+                        continue
+                    pyautogui.press('home')
+                    current_list_type = list_type
+                    current_index = 0
+
+                # 移動到目標項目
+                self._move_selection(target_index - current_index)
+                current_index = target_index
+
+                # 驗證選取項目與快照中的預期名稱一致，不一致時依實際位置重新對齊一次
+                selected_name = get_selected_name(hwnd, list_type)
+                if selected_name != item.name:
+                    actual = get_list_snapshot(hwnd).find(selected_name, list_type) if selected_name else None
+                    if actual is not None:
+                        debug_print(f"選取位置偏移: 預期 {item.name}，實際 {selected_name}，重新對齊", color='light_magenta')
+                        self._move_selection(target_index - actual.index)
+                        selected_name = get_selected_name(hwnd, list_type)
+
+                if selected_name != item.name:
+                    debug_print(f"選取項目不符: 預期 {item.name}，實際 {selected_name}", color='light_red')
+                    current_list_type = None  # 下一次重新聚焦列表
+                    plan.fail(item)
+                    continue
+
+                # 開啟項目，第一次開啟時等待瀏覽器出現新分頁
+                tab_opened = new_chrome_tab() if self.is_first_click else None
+                pyautogui.press(Config.KEYBOARD_OPEN_KEY)
+                if tab_opened:
+                    wait_until(tab_opened, '首次開啟分頁')
+                else:
+                    time.sleep(Config.SLEEP_INTERVAL * 0.5)
+
+                if check_error_dialog():
+                    debug_print(f"開啟項目觸發了錯誤對話框: {item.name}", color='light_red')
+                    plan.fail(item)
+                    continue
+
+                on_opened(item)
+
+            except Exception as e:
+                debug_print(f"處理檔案時發生錯誤: {str(e)}", color='light_red')
+                current_list_type = None
+                plan.fail(item)
+
+    def _move_selection(self, steps):
+        """以方向鍵移動列表選取項目，正數向下、負數向上"""
+        if steps > 0:
+            pyautogui.press('down', presses=steps, interval=Config.SLEEP_INTERVAL * 0.2)
+        elif steps < 0:
+            pyautogui.press('up', presses=-steps, interval=Config.SLEEP_INTERVAL * 0.2)
+
+    def get_all_files(self, hwnd):
         """獲取所有檔案"""
         all_files = []
-        for i in range(3):  # 三個列表
-            files = get_list_items_by_id(main_window, i)
-            all_files.extend([(file, i) for file in files if not file.window_text().endswith("_公司")])
+        snapshot = get_list_snapshot(hwnd)
+        for i, list_type in enumerate(LIST_CONTROLS):  # 三個列表
+            files = snapshot.items(list_type)
+            all_files.extend([(file, i) for file in files if get_report_metadata(file.name).report_type != '公司'])
         return all_files
 
 class MainApp:
@@ -271,6 +408,7 @@ class MainApp:
         self.stop_event = threading.Event()
         self.esc_thread = None  # 新增：保存 ESC 監聽線程的引用
         self.chrome_monitor = None
+        self.copy_thread = None  # 背景複製執行緒
         self.hotkeys_enabled = False  # 改為 False，預設禁用
         self.collected_lists = {
             '今日': [], '昨日': [], '1週前': [], '2週前': [], '3週前': [], 
@@ -301,7 +439,7 @@ class MainApp:
         """停止 ESC 監聽"""
         self.stop_event.set()  # 設置停止事件即可，不需要等待線程結束
 
-    def select_window(self, index):
+    def select_window(self, index, horizon=None):
         """選擇視窗並處理檔案"""
         self.start_esc_listener()  # 使用新的啟動方法
         
@@ -312,10 +450,10 @@ class MainApp:
             self.selected_window = target_windows[index - 1]
             debug_print(f"\n已選擇視窗: {self.selected_window[1]}")
             hwnd, window_title = self.selected_window
-            # 連接到視窗
-            app = PywinautoApp(backend="uia").connect(handle=hwnd)            
+            # 借用已連線的視窗
+            app = get_app(hwnd)
             # 處理檔案
-            self.file_processor.process_files(app, hwnd, window_title, lambda: self.should_stop)
+            self.file_processor.process_files(app, hwnd, window_title, lambda: self.should_stop, horizon)
         else:
             debug_print("無效的選擇")
         
@@ -329,9 +467,8 @@ class MainApp:
             if hwnd is None or window_title is None:
                 hwnd, window_title = self.selected_window or find_window_handle(Config.TARGET_WINDOW)[0]
             
-            # 連接到視窗並找到標籤
-            app = PywinautoApp(backend="uia").connect(handle=hwnd)
-            daily_report_tab = app.window(handle=hwnd).child_window(title="每日報告", control_type="TabItem")
+            # 借用已連線的視窗並找到標籤
+            daily_report_tab = get_uia_session(hwnd).child(title="每日報告", control_type="TabItem")
             
             # 使用 calculate_center_position 計算中心點
             center_x, center_y = calculate_center_position(daily_report_tab.rectangle())
@@ -360,6 +497,8 @@ class MainApp:
             return
         
         hwnd, window_title = target_windows[0]
+        # 超過保留天數的檔案在背景移入封存（每天最多一次）
+        start_daily_archive()
         folder_monitor = FolderMonitor()
         
         # 使用 self.collected_lists 而不是創建新的字典
@@ -385,57 +524,70 @@ class MainApp:
         def download_days_weeks(days_ago, weeks_ago, list_name=None):
             """下載 N 天前、或 N 週前的檔案，並收集列表"""
             if days_ago > 0 or weeks_ago > 0:
+                date_switched = list_refreshed(hwnd)
                 press_left_or_up(days_ago, weeks_ago)
+                wait_until(date_switched, '切換日期')
             
             # 在下載前收集當前列表
             if list_name and hwnd:
                 self.collect_current_list(list_name, hwnd)
             
-            self.select_window(1)
+            self.select_window(1, list_name)
+        
+        # 等待條件（在步驟執行前建立，以記錄執行前的狀態）
+        focus_back = lambda: focus_returned(hwnd)
+        lists_changed = lambda: list_refreshed(hwnd)
         
-        # 基本步驟
+        # 基本步驟：(步驟名稱, 執行函數, 等待條件)
         steps = [
-            ("點擊每日報告標籤", lambda: self.click_daily_report_tab(hwnd=hwnd, window_title=window_title)),
-            ("設定字型大小", lambda: set_font_size()),
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title)),
-            ("下載今日檔案，並收集列表", lambda: download_days_weeks(0, 0, '今日')),
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title)),
-            ("下載昨日檔案，並收集列表", lambda: download_days_weeks(1, 0, '昨日')),
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title)),
-            ("下載 1 週前檔案，並收集列表", lambda: download_days_weeks(0, 1, '1週前')),
-            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title)),
-            ("下載 2 週前檔案，並收集列表", lambda: download_days_weeks(0, 1, '2週前')),
-            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title)),
-            ("下載 4 週前檔案，並收集列表", lambda: download_days_weeks(0, 2, '4週前')),
-            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title)),
-            ("下載 8 週前檔案，並收集列表", lambda: download_days_weeks(0, 4, '8週前')),
-            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title)),
-            ("鍵盤向下 X8", lambda: [pyautogui.press('down') or time.sleep(0.2) for _ in range(8)]),
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title)),
-            ("複製今日檔案到指定位置", lambda: self.copy_today_files()),
-            ("分析檔案匹配", lambda: folder_monitor.store_and_analyze_lists(
-                today_list=self.collected_lists['今日'],
-                yesterday_list=self.collected_lists['昨日'],
-                last_week_list=self.collected_lists['1週前'],
-                last_2week_list=self.collected_lists['2週前'],
-                last_3week_list=self.collected_lists['4週前'],
-                last_4week_list=self.collected_lists['8週前']
-            ))
+            ("點擊每日報告標籤", lambda: self.click_daily_report_tab(hwnd=hwnd, window_title=window_title), focus_back),
+            ("設定字型大小", lambda: set_font_size(), focus_back),
+            # 行事曆通常已在今日，列表不會變動，只等焦點回來
+            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title), focus_back),
+            ("下載今日檔案，並收集列表", lambda: download_days_weeks(0, 0, '今日'), None),
+            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title), focus_back),
+            ("下載昨日檔案，並收集列表", lambda: download_days_weeks(1, 0, '昨日'), None),
+            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title), lists_changed),
+            ("下載 1 週前檔案，並收集列表", lambda: download_days_weeks(0, 1, '1週前'), None),
+            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title), focus_back),
+            ("下載 2 週前檔案，並收集列表", lambda: download_days_weeks(0, 1, '2週前'), None),
+            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title), focus_back),
+            ("下載 4 週前檔案，並收集列表", lambda: download_days_weeks(0, 2, '4週前'), None),
+            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title), focus_back),
+            ("下載 8 週前檔案，並收集列表", lambda: download_days_weeks(0, 4, '8週前'), None),
+            ("點擊日歷空白處", lambda: start_click_calendar_blank(hwnd=hwnd, window_title=window_title), focus_back),
+            ("鍵盤向下 X8", lambda: [pyautogui.press('down') or time.sleep(Config.SLEEP_INTERVAL) for _ in range(8)], lists_changed),
+            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title), focus_back),
+            ("確認今日檔案已複製到指定位置", folder_monitor.finish_publishing, None),
+            ("分析檔案匹配", lambda: folder_monitor.store_and_analyze_lists(self.collected_lists), None)
         ]
         
+        # 下載期間新落地的檔案在背景複製到指定位置，結束時只需補齊遺漏
+        folder_monitor.start_publishing()
+        
         # 執行所有步驟
-        for i, (step_name, step_func) in enumerate(steps, 1):
-            if self.should_stop:
-                debug_print("任務已停止", color='light_yellow')
-                break
-            
-            debug_print(f"步驟{i}: {step_name}", color='light_yellow')
-            step_func()
-            time.sleep(1)
+        try:
+            for i, (step_name, step_func, wait_for) in enumerate(steps, 1):
+                if self.should_stop:
+                    debug_print("任務已停止", color='light_yellow')
+                    break
+                
+                debug_print(f"步驟{i}: {step_name}", color='light_yellow')
+                self.run_step(step_name, step_func, wait_for)
+        finally:
+            folder_monitor.stop_publishing()
         
+        save_wait_stats()
         debug_print("連續任務執行完成", color='light_green')
         self.stop_esc_listener()
 
+    def run_step(self, step_name, step_func, wait_for=None):
+        """執行單一步驟，並等待步驟宣告的條件成立（取代固定等待時間）"""
+        condition = wait_for() if wait_for else None
+        step_func()
+        if condition:
+            wait_until(condition, step_name)
+
     def download_current_list(self):
         """下載當前列表檔案"""
         self.should_stop = False
@@ -450,14 +602,10 @@ class MainApp:
 
     def toggle_refresh_check(self):
         """切換列表刷新檢測"""
-        if not refresh_checking:
+        if not get_refresh_detector():
             hwnd = self.selected_window[0] if self.selected_window else None
             debug_print("開始檢測列表刷新", color='light_magenta')
-            threading.Thread(
-                target=start_refresh_check,
-                args=(hwnd,),
-                daemon=True
-            ).start()
+            start_refresh_check(hwnd)
         else:
             debug_print("停止檢測列表刷新", color='light_yellow')
             stop_refresh_check()
@@ -466,8 +614,19 @@ class MainApp:
         """切換 Chrome 監控狀態"""
         self.chrome_monitor = start_chrome_monitor(self.chrome_monitor)
 
-    def copy_today_files(self):
-        """複製今日檔案的快捷鍵處理"""
+    def copy_today_files(self, background=False):
+        """
+        複製今日檔案的快捷鍵處理
+        background: True 時在背景執行緒複製，不阻塞快捷鍵執行緒
+        """
+        if background:
+            if self.copy_thread and self.copy_thread.is_alive():
+                debug_print("複製仍在進行中", color='light_yellow')
+                return
+            self.copy_thread = threading.Thread(target=self.copy_today_files, daemon=True)
+            self.copy_thread.start()
+            return
+        
         folder_monitor = FolderMonitor()
         folder_monitor.copy_today_files()
 
@@ -481,12 +640,7 @@ class MainApp:
                 return
             
             hwnd = windows[0][0]
-            app = PywinautoApp(backend="uia").connect(handle=hwnd)
-            main_window = app.window(handle=hwnd)
             
-            # 預加載所有列表區域和檔案
-            list_areas = {}
-            list_files = {}
             list_types = {
                 'morning': '晨會報告',
                 'research': '研究報告',
@@ -494,60 +648,30 @@ class MainApp:
             }
             
             # 一次性獲取所有列表的檔案
-            for list_type, list_name in list_types.items():
-                try:
-                    list_areas[list_type] = main_window.child_window(
-                        auto_id=f"listBox{list_type.capitalize()}Reports"
-                    )
-                    list_files[list_type] = get_list_items_by_id(main_window, list_type)
-                except Exception as e:
-                    debug_print(f"獲取 {list_name} 列表時發生錯誤: {str(e)}", color='light_red')
-                    continue
+            snapshot = get_list_snapshot(hwnd, refresh=True)
             
             # 顯示結果
             for list_type, list_name in list_types.items():
-                if list_type in list_files:
-                    debug_print(f"\n=== {list_name} ===", color='light_cyan')
-                    for i, item in enumerate(list_files[list_type], 1):
-                        debug_print(f"{i}. {item.window_text()}", color='light_green')
+                debug_print(f"\n=== {list_name} ===", color='light_cyan')
+                for i, item in enumerate(snapshot.items(list_type), 1):
+                    debug_print(f"{i}. {item.name}", color='light_green')
                     
         except Exception as e:
             debug_print(f"列出報告清單時發生錯誤: {str(e)}", color='light_red')
 
     def collect_current_list(self, list_name, hwnd):
-        """從指定窗口收集列表項目"""
+        """從指定窗口收集列表項目，並封存該日期的列表"""
         if list_name and hwnd:
             try:
-                app = PywinautoApp(backend="uia").connect(handle=hwnd)
-                main_window = app.window(handle=hwnd)
-                
-                # 預加載所有列表區域和檔案信息
-                list_areas = {}
-                list_files = {}
-                list_types = [
-                    ('morning', '晨會報告'),
-                    ('research', '研究報告'),
-                    ('industry', '產業報告')
-                ]
-                
-                self.collected_lists[list_name] = []
-                
-                # 一次性獲取所有列表的檔案
-                for list_type, list_display_name in list_types:
-                    try:
-                        list_areas[list_type] = main_window.child_window(
-                            auto_id=f"listBox{list_type.capitalize()}Reports"
-                        )
-                        list_files[list_type] = get_list_items_by_id(main_window, list_type)
-                        if list_files[list_type]:
-                            self.collected_lists[list_name].extend(
-                                [f.window_text() for f in list_files[list_type] if f.window_text()]
-                            )
-                    except Exception as e:
-                        debug_print(f"收集 {list_display_name} 列表時發生錯誤: {str(e)}", color='light_red')
-                        continue
+                # 日期已切換，重新擷取快照；隨後的 process_files 會直接沿用
+                snapshot = get_list_snapshot(hwnd, refresh=True)
+                self.collected_lists[list_name] = snapshot.names()
                         
                 debug_print(f"已收集 {list_name} 列表，共 {len(self.collected_lists[list_name])} 個檔案", color='light_green')
+                
+                calendar_date = horizon_to_date(list_name)
+                if calendar_date:
+                    get_list_archive().save(calendar_date, {list_type: snapshot.names(list_type) for list_type in LIST_CONTROLS})
                 return True
                 
             except Exception as e:
@@ -555,8 +679,22 @@ class MainApp:
                 return False
         return False
 
+    def load_archived_list(self, list_name):
+        """使用封存的列表（過去日期且封存仍有效時），返回是否成功"""
+        calendar_date = horizon_to_date(list_name)
+        if not calendar_date or calendar_date >= datetime.now().date():
+            return False
+        archived = get_list_archive().load_fresh(calendar_date)
+        if archived is None:
+            return False
+        self.collected_lists[list_name] = [name for list_type in LIST_CONTROLS
+                                           for name in archived.lists.get(list_type, []) if name]
+        debug_print(f"使用封存的 {list_name} 列表（{calendar_date.strftime('%m/%d')}），共 {len(self.collected_lists[list_name])} 個檔案",
+                    color='light_green')
+        return True
+
     def collect_and_analyze_lists(self):
-        """收集各時間點列表並分析"""
+        """收集各時間點列表並分析（過去日期優先使用封存，只在封存缺少或過期時切換行事曆）"""
         debug_print("\n開始收集列表...", color='light_cyan')
         
         # 先獲取視窗句柄
@@ -568,39 +706,56 @@ class MainApp:
         hwnd, window_title = target_windows[0]
         folder_monitor = FolderMonitor()
         
-        # 執行步驟
+        def press_keys(key, times):
+            """連續按鍵指定次數"""
+            for _ in range(times):
+                pyautogui.press(key)
+                time.sleep(Config.SLEEP_INTERVAL)
+        
+        # 等待條件（在步驟執行前建立，以記錄執行前的狀態）
+        focus_back = lambda: focus_returned(hwnd)
+        lists_changed = lambda: list_refreshed(hwnd)
+        
+        # 過去日期：有效封存直接使用，其餘才需要在行事曆上切換
+        past_lists = ['昨日', '1週前', '2週前', '4週前', '8週前']
+        pending = [list_name for list_name in past_lists if not self.load_archived_list(list_name)]
+        pending_weeks = [list_name for list_name in pending if list_name != '昨日']
+        
+        # 執行步驟：(步驟名稱, 執行函數, 等待條件)
         steps = [
-            ("等待 1 秒", lambda: time.sleep(1)),
-            ("點擊每日報告標籤", lambda: self.click_daily_report_tab(hwnd=hwnd, window_title=window_title)),
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title) or time.sleep(2)),
-            ("收集今日列表", lambda: self.collect_current_list('今日', hwnd)),
-            ("向左 1 天", lambda: pyautogui.press('left') or time.sleep(1)), # 向左 1 天，等待 1 秒
-            ("收集昨日列表", lambda: self.collect_current_list('昨日', hwnd)),
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title) or time.sleep(2)),
-            ("向上 1 週", lambda: pyautogui.press('up') or time.sleep(1)), # 向上 1 週，等待 1 秒
-            ("收集 1 週前列表", lambda: self.collect_current_list('1週前', hwnd)),
-            ("向上 1 週", lambda: [pyautogui.press('up') or time.sleep(1) for _ in range(1)]), # 向上 1 週，等待 1 秒
-            ("收集 2 週前列表", lambda: self.collect_current_list('2週前', hwnd)),
-            ("向上 2 週", lambda: [pyautogui.press('up') or time.sleep(1) for _ in range(2)]), # 向上 2 週，等待 1 秒
-            ("收集 4 週前列表", lambda: self.collect_current_list('4週前', hwnd)),
-            ("向上 4 週", lambda: [pyautogui.press('up') or time.sleep(1) for _ in range(4)]), # 向上 4 週，等待 1 秒
-            ("收集 8 週前列表", lambda: self.collect_current_list('8週前', hwnd)),
-            ("鍵盤向下 X8", lambda: [pyautogui.press('down') or time.sleep(1) for _ in range(8)]), # 鍵盤向下 X8，每次等待 1 秒
-            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title)),
-            ('分析檔案匹配', lambda: folder_monitor.store_and_analyze_lists(
-                today_list=self.collected_lists['今日'],
-                yesterday_list=self.collected_lists['昨日'],
-                last_week_list=self.collected_lists['1週前'],
-                last_2week_list=self.collected_lists['2週前'],
-                last_3week_list=self.collected_lists['4週前'],
-                last_4week_list=self.collected_lists['8週前']
-            ))
+            ("等待快捷鍵放開", lambda: None, hotkeys_released),
+            ("點擊每日報告標籤", lambda: self.click_daily_report_tab(hwnd=hwnd, window_title=window_title), focus_back),
+            ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title), lists_changed),
+            ("收集今日列表", lambda: self.collect_current_list('今日', hwnd), None),
         ]
+        if '昨日' in pending:
+            steps += [
+                ("向左 1 天", lambda: press_keys('left', 1), lists_changed),
+                ("收集昨日列表", lambda: self.collect_current_list('昨日', hwnd), None),
+                ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title),
+                 lists_changed if pending_weeks else focus_back),
+            ]
+        weeks_back = 0
+        for list_name in pending_weeks:
+            weeks = Config.HORIZON_DAYS[list_name] // 7
+            steps += [
+                (f"向上 {weeks - weeks_back} 週", lambda n=weeks - weeks_back: press_keys('up', n), lists_changed),
+                (f"收集 {list_name} 列表", lambda name=list_name: self.collect_current_list(name, hwnd), None),
+            ]
+            weeks_back = weeks
+        if weeks_back:
+            steps += [
+                (f"鍵盤向下 X{weeks_back}", lambda n=weeks_back: press_keys('down', n), lists_changed),
+                ("點擊今日", lambda: start_calendar_checker(0, hwnd=hwnd, window_title=window_title), focus_back),
+            ]
+        steps.append(('分析檔案匹配', lambda: folder_monitor.store_and_analyze_lists(self.collected_lists), None))
         
         # 執行步驟
-        for step_name, step_func in steps:
+        for step_name, step_func, wait_for in steps:
             debug_print(f"執行: {step_name}", color='light_yellow')
-            step_func()
+            self.run_step(step_name, step_func, wait_for)
+        
+        save_wait_stats()
         
     def register_essential_hotkeys(self):
         """註冊必要的快捷鍵（F12開關和關閉程式）"""
@@ -631,7 +786,7 @@ class MainApp:
         keyboard.add_hotkey('ctrl+shift+f8', test_terminal_support)
         keyboard.add_hotkey('ctrl+shift+f9', self.collect_and_analyze_lists)
         keyboard.add_hotkey('ctrl+shift+f10', self.list_all_reports)
-        keyboard.add_hotkey('ctrl+shift+f11', self.copy_today_files)
+        keyboard.add_hotkey('ctrl+shift+f11', lambda: self.copy_today_files(background=True))
         keyboard.add_hotkey('ctrl+shift+f12', self.toggle_hotkeys)  # 新增：切換快捷鍵的快捷鍵
 
     def run(self):
@@ -664,6 +819,8 @@ class MainApp:
             schedule_times = Config.get_schedule_times() # 獲取排程時間
             debug_print("==================", color='light_cyan')
 
+            start_daily_archive()  # 在背景封存下載資料夾的舊檔案（每天最多一次）
+
             debug_print("已禁用所有快捷鍵（按下 CTRL + SHIFT + F12 切換）", color='light_yellow')
             
             # 使用阻塞方式等待 Ctrl+Shift+Q
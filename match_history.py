@@ -0,0 +1,195 @@
+"""
+匹配歷史模組
+功能: 保存每次列表匹配分析的結果，並統計各時間點的命中率、各券商的上架延遲與趨勢
+職責:
+- 每個檔案一列：時間點以位元集合存成一個整數、券商與報告日期取自報告中繼資料
+- 每次分析後只重新彙總當日的時間點統計，歷史統計直接讀取彙總表
+- 命中率：各時間點列表涵蓋了多少今日新檔案；獨占命中：只有該時間點才找得到的檔案
+- 延遲：報告日期到檔案出現在下載資料夾相隔幾天
+- 命令列報表 (python match_history.py --days 30)
+依賴: config.py, utils.py, report_metadata.py
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from utils import debug_print
+from report_metadata import get_report_metadata
+
+# 時間點位元順序（固定，歷史資料依此解讀）
+HORIZONS = list(Config.HORIZON_DAYS)
+HORIZON_BITS = {horizon: 1 << index for index, horizon in enumerate(HORIZONS)}
+
+
+class MatchHistory:
+    """匹配結果歷史與統計"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.MATCH_HISTORY_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS matches (
+                run_date TEXT NOT NULL,
+                file TEXT NOT NULL,
+                mask INTEGER NOT NULL,
+                near INTEGER NOT NULL,
+                broker TEXT,
+                report_date TEXT,
+                PRIMARY KEY (run_date, file)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS horizon_daily (
+                run_date TEXT NOT NULL,
+                horizon TEXT NOT NULL,
+                files INTEGER NOT NULL,
+                hits INTEGER NOT NULL,
+                exclusive INTEGER NOT NULL,
+                list_size INTEGER NOT NULL,
+                PRIMARY KEY (run_date, horizon)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    def record_run(self, run_date, matching_results, near_matches=None, list_sizes=None):
+        """
+        保存一次分析結果（同一天重複分析時覆蓋），並重新彙總當日統計
+        Args:
+            run_date: 分析日期
+            matching_results: {檔名: [時間點, ...]}
+            near_matches: {檔名: [NearMatch, ...]}
+            list_sizes: {時間點: 列表項目數}
+        """
+        near_matches = near_matches or {}
+        list_sizes = list_sizes or {}
+        key = run_date.isoformat()
+        rows = []
+        for file, horizons in matching_results.items():
+            mask = 0
+            for horizon in horizons:
+                mask |= HORIZON_BITS.get(horizon, 0)
+            metadata = get_report_metadata(file, has_extension=True)
+            rows.append((key, file, mask, int(file in near_matches), metadata.broker,
+                         metadata.report_date.isoformat() if metadata.report_date else None))
+
+        with self._lock:
+            self._conn.execute("DELETE FROM matches WHERE run_date = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO matches (run_date, file, mask, near, broker, report_date) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("DELETE FROM horizon_daily WHERE run_date = ?", (key,))
+            for horizon, bit in HORIZON_BITS.items():
+                if horizon not in list_sizes:
+                    continue  # 本次未收集的時間點不列入統計
+                files, hits, exclusive = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM((mask & ?) != 0), 0), COALESCE(SUM(mask = ?), 0) "
+                    "FROM matches WHERE run_date = ?", (bit, bit, key)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT INTO horizon_daily (run_date, horizon, files, hits, exclusive, list_size) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key, horizon, files, hits, exclusive, list_sizes[horizon])
+                )
+            self._conn.commit()
+
+    def hit_rates(self, days=30, end_date=None):
+        """
+        各時間點在最近 days 天的命中率
+        返回: {時間點: {'runs', 'files', 'hits', 'exclusive', 'list_size', 'rate', 'exclusive_rate'}}
+        """
+        end_date = end_date or datetime.now().date()
+        start_date = end_date - timedelta(days=days - 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT horizon, COUNT(*), SUM(files), SUM(hits), SUM(exclusive), SUM(list_size) "
+                "FROM horizon_daily WHERE run_date BETWEEN ? AND ? GROUP BY horizon",
+                (start_date.isoformat(), end_date.isoformat())
+            ).fetchall()
+        rates = {}
+        for horizon, runs, files, hits, exclusive, list_size in rows:
+            rates[horizon] = {
+                'runs': runs, 'files': files, 'hits': hits, 'exclusive': exclusive, 'list_size': list_size,
+                'rate': hits / files if files else 0.0,
+                'exclusive_rate': exclusive / files if files else 0.0,
+            }
+        return {horizon: rates[horizon] for horizon in HORIZONS if horizon in rates}
+
+    def trends(self, days=30):
+        """各時間點命中率與前一段期間的差異 {時間點: (本期命中率, 前期命中率)}"""
+        today = datetime.now().date()
+        current = self.hit_rates(days, today)
+        previous = self.hit_rates(days, today - timedelta(days=days))
+        return {horizon: (stats['rate'], previous[horizon]['rate'] if horizon in previous else None)
+                for horizon, stats in current.items()}
+
+    def broker_latency(self, days=30):
+        """
+        各券商報告從報告日期到出現在下載資料夾相隔的天數
+        返回: [(券商, 檔案數, 平均天數, 最短天數, 最長天數), ...]，依檔案數由多到少
+        """
+        start_date = datetime.now().date() - timedelta(days=days - 1)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT broker, COUNT(*), AVG(lag), MIN(lag), MAX(lag) FROM ("
+                "  SELECT COALESCE(broker, '(未知)') AS broker, "
+                "         julianday(run_date) - julianday(report_date) AS lag "
+                "  FROM matches WHERE run_date >= ? AND report_date IS NOT NULL"
+                ") GROUP BY broker ORDER BY COUNT(*) DESC",
+                (start_date.isoformat(),)
+            ).fetchall()
+
+    def log_report(self, days=30):
+        """輸出命中率、趨勢與券商延遲報表"""
+        debug_print(f"====== 最近 {days} 天時間點命中率 ======", color='light_cyan')
+        rates = self.hit_rates(days)
+        trends = self.trends(days)
+        if not rates:
+            debug_print("沒有匹配紀錄", color='light_yellow')
+        for horizon, stats in rates.items():
+            current, previous = trends.get(horizon, (stats['rate'], None))
+            trend = f"（前期 {previous:.0%}）" if previous is not None else ""
+            debug_print(f"{horizon}: 命中 {stats['hits']}/{stats['files']} = {stats['rate']:.0%}{trend}，"
+                        f"獨占 {stats['exclusive']} 個 ({stats['exclusive_rate']:.0%})，"
+                        f"分析 {stats['runs']} 次，平均列表 {stats['list_size'] / stats['runs']:.0f} 項",
+                        color='light_yellow')
+
+        debug_print(f"====== 最近 {days} 天券商上架延遲 ======", color='light_cyan')
+        for broker, count, average, shortest, longest in self.broker_latency(days):
+            debug_print(f"{broker}: {count} 個，平均 {average:.1f} 天（{shortest:.0f} ~ {longest:.0f} 天）",
+                        color='light_yellow')
+        debug_print("==================================", color='light_cyan')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 全域歷史
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_match_history():
+    """取得全域匹配歷史（第一次使用時開啟資料庫）"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = MatchHistory()
+        return _history
+
+
+def main(argv=None):
+    """命令列報表"""
+    parser = argparse.ArgumentParser(prog='match_history.py', description='時間點命中率與券商延遲統計')
+    parser.add_argument('--days', type=int, default=30, help='統計最近 N 天')
+    args = parser.parse_args(argv)
+    get_match_history().log_report(args.days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
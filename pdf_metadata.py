@@ -0,0 +1,853 @@
+"""
+PDF 中繼資料模組
+功能: 在背景行程池中讀取下載報告的 PDF 標題、頁數、建立日期，以及第一頁文字中的券商與股票代號
+職責:
+- 以串流方式解析 PDF：依檔尾的交叉參照表只讀取需要的物件與第一頁內容串流，不載入整個檔案
+- 解析在獨立行程中執行，CPU 密集的工作不佔用驅動介面的執行緒；全程式共用一個管線，停止監控時結束工作行程
+- 以內容 SHA-256 為鍵快取在資料夾索引資料庫中，同內容的檔案（重新下載、改名）只解析一次
+- 解析結果提供報告目錄（PDF 標題、頁數）與列表比對（檔名無法比對時改用 PDF 標題）
+- 命令列執行 (python pdf_metadata.py 檔案.pdf ...)
+依賴: config.py, utils.py, folder_index.py
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from config import Config
+from utils import debug_print
+from folder_index import get_folder_index
+
+# 解析結果
+# created: PDF 建立日期 (date)；pages: 頁數；text: 第一頁的文字（只含可解碼的部分）
+PdfMetadata = namedtuple('PdfMetadata', [
+    'sha256', 'title', 'author', 'created', 'pages', 'broker', 'ticker', 'text'
+])
+
+# 單一物件最多讀取的位元組數
+OBJECT_LIMIT = 64 * 1024
+# 內容串流最多讀取（壓縮前）與解壓的位元組數
+STREAM_LIMIT = 4 * 1024 * 1024
+CONTENT_LIMIT = 1024 * 1024
+# 檔尾搜尋 startxref 的範圍
+TAIL_SIZE = 2048
+# TJ 陣列中視為字間空白的位移（千分之一字寬）
+TJ_SPACE = 200
+
+WHITESPACE = b'\x00\t\n\x0c\r '
+DELIMITERS = b'()<>[]{}/%'
+
+# 第一頁文字中的股票代號：2330 TT、2330.TW、股票代號: 2330（只有括號的數字常是年份，不採用）
+TICKER_TEXT = re.compile(r'(?<![\d.])(\d{4,6})(?:\s?(?:TT|TW|TWO)\b|\.(?:TW|TWO)\b)'
+                         r'|(?:Stock code|Ticker|股票代號|代號)\s*[:：]?\s*(\d{4,6})', re.IGNORECASE)
+
+# PDF 日期，例如 D:20241015093000+08'00'
+PDF_DATE = re.compile(r'D:(\d{4})(\d{2})?(\d{2})?')
+
+# 由 Office 轉出的 PDF 常見的標題前綴，例如 "Microsoft Word - 報告.docx"
+TITLE_PREFIX = re.compile(r'^Microsoft (?:Word|PowerPoint|Excel) - ')
+
+
+class PdfError(Exception):
+    """PDF 結構無法解析"""
+
+
+class Ref(namedtuple('Ref', ['number', 'generation'])):
+    """間接物件參照 (n g R)"""
+
+
+class Name(str):
+    """PDF 名稱物件 (/Name)"""
+
+
+class Keyword(str):
+    """PDF 關鍵字（obj、stream、R 以外的運算子）"""
+
+
+def _skip_space(data, pos):
+    """略過空白與註解"""
+    length = len(data)
+    while pos < length:
+        char = data[pos]
+        if char in WHITESPACE:
+            pos += 1
+        elif char == 0x25:  # %
+            while pos < length and data[pos] not in b'\r\n':
+                pos += 1
+        else:
+            break
+    return pos
+
+
+def _read_token(data, pos):
+    """讀取一般字元組成的記號（數字、關鍵字）"""
+    end = pos
+    length = len(data)
+    while end < length and data[end] not in WHITESPACE and data[end] not in DELIMITERS:
+        end += 1
+    return data[pos:end], end
+
+
+def _read_literal(data, pos):
+    """讀取 (字串)，處理跳脫字元與巢狀括號；pos 指向左括號"""
+    out = bytearray()
+    depth = 1
+    pos += 1
+    length = len(data)
+    while pos < length:
+        char = data[pos]
+        if char == 0x5C:  # 反斜線
+            pos += 1
+            if pos >= length:
+                break
+            char = data[pos]
+            if char in b'01234567':
+                end = pos
+                while end < min(pos + 3, length) and data[end] in b'01234567':
+                    end += 1
+                out.append(int(data[pos:end], 8) & 0xFF)
+                pos = end
+                continue
+            if char == 0x0D:  # 跳脫的換行（接續下一行）
+                if pos + 1 < length and data[pos + 1] == 0x0A:
+                    pos += 1
+            elif char != 0x0A:
+                out.append({0x6E: 0x0A, 0x72: 0x0D, 0x74: 0x09, 0x62: 0x08, 0x66: 0x0C}.get(char, char))
+        elif char == 0x28:
+            depth += 1
+            out.append(char)
+        elif char == 0x29:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos + 1
+            out.append(char)
+        else:
+            out.append(char)
+        pos += 1
+    raise PdfError("字串未結束")
+
+
+def _read_hex(data, pos):
+    """讀取 <十六進位字串>；pos 指向左角括號"""
+    end = data.find(b'>', pos)
+    if end == -1:
+        raise PdfError("十六進位字串未結束")
+    digits = re.sub(rb'[^0-9A-Fa-f]', b'', data[pos + 1:end])
+    if len(digits) % 2:
+        digits += b'0'
+    return bytes.fromhex(digits.decode('ascii')), end + 1
+
+
+def _read_name(data, pos):
+    """讀取 /名稱（處理 #xx 跳脫）；pos 指向斜線"""
+    raw, end = _read_token(data, pos + 1)
+    name = re.sub(rb'#([0-9A-Fa-f]{2})', lambda match: bytes([int(match.group(1), 16)]), raw)
+    return Name(name.decode('latin-1')), end
+
+
+def parse_value(data, pos=0):
+    """
+    解析一個 PDF 物件
+    返回: (值, 結束位置)；字典為 dict、陣列為 list、字串為 bytes、參照為 Ref
+    """
+    pos = _skip_space(data, pos)
+    if pos >= len(data):
+        raise PdfError("物件不完整")
+    char = data[pos]
+    if data[pos:pos + 2] == b'<<':
+        result = {}
+        pos += 2
+        while True:
+            pos = _skip_space(data, pos)
+            if data[pos:pos + 2] == b'>>':
+                return result, pos + 2
+            if pos >= len(data) or data[pos] != 0x2F:
+                raise PdfError("字典格式錯誤")
+            key, pos = _read_name(data, pos)
+            result[key], pos = parse_value(data, pos)
+    if char == 0x5B:  # [
+        result = []
+        pos += 1
+        while True:
+            pos = _skip_space(data, pos)
+            if pos >= len(data):
+                raise PdfError("陣列未結束")
+            if data[pos] == 0x5D:  # ]
+                return result, pos + 1
+            value, pos = parse_value(data, pos)
+            result.append(value)
+    if char == 0x28:
+        return _read_literal(data, pos)
+    if char == 0x3C:
+        return _read_hex(data, pos)
+    if char == 0x2F:
+        return _read_name(data, pos)
+
+    token, end = _read_token(data, pos)
+    if not token:
+        raise PdfError(f"無法解析的字元: {chr(char)}")
+    if re.fullmatch(rb'[+-]?\d+', token):
+        # 整數，後面接 "g R" 時為間接參照
+        match = re.compile(rb'\s+(\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])').match(data, end)
+        if match:
+            return Ref(int(token), int(match.group(1))), match.end()
+        return int(token), end
+    if re.fullmatch(rb'[+-]?(\d+\.?\d*|\.\d+)', token):
+        return float(token), end
+    return {b'true': True, b'false': False, b'null': None}.get(token, Keyword(token.decode('latin-1'))), end
+
+
+def decode_text(value):
+    """PDF 文字字串轉為 str（UTF-16 BOM、UTF-8，其餘視為 PDFDocEncoding）"""
+    if not isinstance(value, bytes):
+        return None
+    if value.startswith(b'\xfe\xff'):
+        text = value[2:].decode('utf-16-be', errors='ignore')
+    elif value.startswith(b'\xef\xbb\xbf'):
+        text = value[3:].decode('utf-8', errors='ignore')
+    else:
+        try:
+            text = value.decode('utf-8')
+        except UnicodeDecodeError:
+            text = value.decode('latin-1')
+    return text.replace('\x00', '').strip() or None
+
+
+def _png_unpredict(data, columns):
+    """還原 PNG 預測（交叉參照串流常用的 /Predictor 12）"""
+    row_size = columns + 1
+    previous = bytearray(columns)
+    out = bytearray()
+    for start in range(0, len(data) - row_size + 1, row_size):
+        kind = data[start]
+        row = bytearray(data[start + 1:start + row_size])
+        if kind == 2:
+            row = bytearray((value + above) & 0xFF for value, above in zip(row, previous))
+        elif kind != 0:
+            raise PdfError(f"不支援的 PNG 預測類型: {kind}")
+        out.extend(row)
+        previous = row
+    return bytes(out)
+
+
+class PdfReader:
+    """只依交叉參照表讀取需要物件的最小化 PDF 讀取器（資料來源為記憶體映射，不載入整個檔案）"""
+
+    def __init__(self, mapped):
+        self.mapped = mapped
+        self.offsets = {}  # {物件編號: 檔案位置}
+        self.compressed = {}  # {物件編號: (物件串流編號, 索引)}
+        self.trailer = {}
+        self._object_streams = {}
+        try:
+            self._load_xref()
+        except (PdfError, ValueError, IndexError, TypeError, zlib.error):
+            self._scan_objects()
+
+    def _load_xref(self):
+        """由 startxref 讀取交叉參照表（含 /Prev 串起的舊版本，新版本優先）"""
+        tail_start = max(len(self.mapped) - TAIL_SIZE, 0)
+        tail = self.mapped[tail_start:]
+        match = None
+        for match in re.finditer(rb'startxref\s+(\d+)', tail):
+            pass
+        if match is None:
+            raise PdfError("找不到 startxref")
+        offset = int(match.group(1))
+        seen = set()
+        while offset is not None and offset not in seen and offset < len(self.mapped):
+            seen.add(offset)
+            if self.mapped[offset:offset + 4] == b'xref':
+                trailer = self._read_xref_table(offset)
+            else:
+                trailer = self._read_xref_stream(offset)
+            if isinstance(trailer.get('XRefStm'), int):
+                self._read_xref_stream(trailer['XRefStm'])
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            offset = trailer.get('Prev') if isinstance(trailer.get('Prev'), int) else None
+        if 'Root' not in self.trailer:
+            raise PdfError("找不到文件目錄")
+
+    def _read_xref_table(self, offset):
+        """讀取傳統交叉參照表，返回 trailer 字典"""
+        section = re.compile(rb'\s*(\d+)\s+(\d+)[ \t]*\r?\n?')
+        entry = re.compile(rb'\s*(\d{10})\s+(\d{5})\s+([nf])')
+        pos = offset + 4
+        while True:
+            match = section.match(self.mapped, pos)
+            if not match:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            pos = match.end()
+            for number in range(first, first + count):
+                match = entry.match(self.mapped, pos)
+                if not match:
+                    raise PdfError("交叉參照表格式錯誤")
+                pos = match.end()
+                if match.group(3) == b'n':
+                    self.offsets.setdefault(number, int(match.group(1)))
+        pos = _skip_space(self.mapped, pos)
+        if self.mapped[pos:pos + 7] != b'trailer':
+            raise PdfError("找不到 trailer")
+        trailer, _ = parse_value(self.mapped[pos + 7:pos + 7 + OBJECT_LIMIT])
+        return trailer
+
+    def _read_xref_stream(self, offset):
+        """讀取交叉參照串流（PDF 1.5 以後），返回串流字典"""
+        header, data = self._read_stream_at(offset)
+        widths = header.get('W')
+        if not isinstance(widths, list) or len(widths) != 3:
+            raise PdfError("交叉參照串流格式錯誤")
+        index = header.get('Index') or [0, header.get('Size', 0)]
+        row_size = sum(widths)
+        pos = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            for number in range(first, first + count):
+                row = data[pos:pos + row_size]
+                pos += row_size
+                if len(row) < row_size:
+                    return header
+                fields = []
+                start = 0
+                for width in widths:
+                    fields.append(int.from_bytes(row[start:start + width], 'big') if width else None)
+                    start += width
+                kind = 1 if fields[0] is None else fields[0]
+                if kind == 1:
+                    self.offsets.setdefault(number, fields[1])
+                elif kind == 2:
+                    self.compressed.setdefault(number, (fields[1], fields[2] or 0))
+        return header
+
+    def _scan_objects(self):
+        """交叉參照表損壞時，掃描整個檔案找出物件位置（較慢，只在必要時使用）"""
+        self.offsets = {}
+        self.compressed = {}
+        for match in re.finditer(rb'(?<![0-9])(\d+)\s+\d+\s+obj\b', self.mapped):
+            self.offsets[int(match.group(1))] = match.start()
+        position = self.mapped.rfind(b'trailer')
+        if position != -1:
+            try:
+                self.trailer, _ = parse_value(self.mapped[position + 7:position + 7 + OBJECT_LIMIT])
+            except PdfError:
+                self.trailer = {}
+
+    def _read_object_at(self, offset):
+        """解析檔案位置上的 "n g obj 值"，返回 (值, 值之後的位置)"""
+        match = re.compile(rb'\s*\d+\s+\d+\s+obj').match(self.mapped, offset)
+        if not match:
+            raise PdfError(f"位置 {offset} 不是物件")
+        window = self.mapped[match.end():match.end() + OBJECT_LIMIT]
+        value, end = parse_value(window)
+        return value, match.end() + end
+
+    def _read_stream_at(self, offset):
+        """解析檔案位置上的串流物件，返回 (字典, 解碼後的資料)"""
+        header, end = self._read_object_at(offset)
+        if not isinstance(header, dict):
+            raise PdfError("物件不是串流")
+        match = re.compile(rb'\s*stream\r?\n').match(self.mapped, end)
+        if not match:
+            raise PdfError("物件不是串流")
+        start = match.end()
+        length = self.resolve(header.get('Length'))
+        if not isinstance(length, int):
+            stop = self.mapped.find(b'endstream', start, start + STREAM_LIMIT)
+            length = (stop if stop != -1 else start + STREAM_LIMIT) - start
+        return header, self._decode(header, self.mapped[start:start + min(length, STREAM_LIMIT)])
+
+    def _decode(self, header, data):
+        """套用串流的解碼過濾器（只支援 FlateDecode）"""
+        filters = header.get('Filter')
+        filters = filters if isinstance(filters, list) else [filters] if filters else []
+        for name in filters:
+            if name != 'FlateDecode':
+                raise PdfError(f"不支援的過濾器: {name}")
+            decompressor = zlib.decompressobj()
+            data = decompressor.decompress(data, CONTENT_LIMIT)
+        params = self.resolve(header.get('DecodeParms'))
+        if isinstance(params, list):
+            params = params[0] if params else None
+        if isinstance(params, dict) and params.get('Predictor', 1) >= 10:
+            data = _png_unpredict(data, params.get('Columns', 1))
+        return data
+
+    def get(self, number):
+        """取得物件的值（串流物件只返回字典）"""
+        if number in self.offsets:
+            return self._read_object_at(self.offsets[number])[0]
+        if number in self.compressed:
+            stream_number, index = self.compressed[number]
+            data, offsets = self._object_stream(stream_number)
+            if index < len(offsets):
+                return parse_value(data, offsets[index])[0]
+        return None
+
+    def _object_stream(self, number):
+        """解壓物件串流，返回 (資料, [各物件的位置])"""
+        if number not in self._object_streams:
+            header, data = self._read_stream_at(self.offsets[number])
+            first = header.get('First', 0)
+            numbers = [int(value) for value in data[:first].split()]
+            self._object_streams[number] = (data, [first + offset for offset in numbers[1::2]])
+        return self._object_streams[number]
+
+    def stream(self, ref):
+        """取得串流物件解碼後的資料"""
+        if isinstance(ref, Ref) and ref.number in self.offsets:
+            return self._read_stream_at(self.offsets[ref.number])[1]
+        return b''
+
+    def resolve(self, value, depth=0):
+        """解開間接參照"""
+        while isinstance(value, Ref) and depth < 32:
+            value = self.get(value.number)
+            depth += 1
+        return value
+
+    def info(self):
+        """文件資訊字典（標題、作者、建立日期）"""
+        info = self.resolve(self.trailer.get('Info'))
+        return info if isinstance(info, dict) else {}
+
+    def root(self):
+        root = self.resolve(self.trailer.get('Root'))
+        return root if isinstance(root, dict) else {}
+
+    def page_count(self):
+        pages = self.resolve(self.root().get('Pages'))
+        count = self.resolve(pages.get('Count')) if isinstance(pages, dict) else None
+        return count if isinstance(count, int) else None
+
+    def first_page_contents(self):
+        """第一頁的內容串流（多個串流依序串接）"""
+        node = self.resolve(self.root().get('Pages'))
+        for _ in range(32):
+            if not isinstance(node, dict) or node.get('Type') == 'Page':
+                break
+            kids = self.resolve(node.get('Kids'))
+            if not kids:
+                return b''
+            node = self.resolve(kids[0])
+        if not isinstance(node, dict):
+            return b''
+        contents = node.get('Contents')
+        refs = self.resolve(contents) if not isinstance(contents, Ref) else [contents]
+        if not isinstance(refs, list):
+            return b''
+        chunks = []
+        size = 0
+        for ref in refs:
+            chunk = self.stream(ref)
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= CONTENT_LIMIT:
+                break
+        return b'\n'.join(chunks)[:CONTENT_LIMIT]
+
+
+def extract_text(content):
+    """
+    由內容串流取出文字（Tj、TJ、'、" 顯示的字串）
+    使用 CID 字型（多數中文字型）的字串無法不靠字型對照表解碼，只保留可讀的部分
+    """
+    pieces = []
+    pending = []  # 下一個文字運算子要顯示的字串
+    in_array = False
+    pos = 0
+    length = len(content)
+    while pos < length:
+        pos = _skip_space(content, pos)
+        if pos >= length:
+            break
+        char = content[pos]
+        try:
+            if char == 0x28:
+                value, pos = _read_literal(content, pos)
+                pending.append(value)
+                continue
+            if char == 0x3C and content[pos:pos + 2] != b'<<':
+                value, pos = _read_hex(content, pos)
+                pending.append(value)
+                continue
+        except PdfError:
+            break
+        if char in b'[]':
+            in_array = char == 0x5B
+            pos += 1
+            continue
+        if char in DELIMITERS:
+            pos += 1
+            if char == 0x2F:
+                _, pos = _read_token(content, pos)
+            continue
+        token, pos = _read_token(content, pos)
+        if not token:
+            pos += 1
+            continue
+        if token in (b'Tj', b'TJ', b"'", b'"'):
+            text = b''.join(pending)
+            if b'\x00' in text:
+                pass  # 兩位元組的 CID 字串，需要字型對照表才能解碼
+            elif text and all(32 <= byte < 127 for byte in text):
+                pieces.append(text.decode('ascii'))
+            elif text:
+                decoded = decode_text(text)
+                if decoded and decoded.isprintable() and not any('\x80' <= ch <= '\xff' for ch in decoded):
+                    pieces.append(decoded)
+            pending = []
+        elif token in (b'Td', b'TD', b'T*', b'Tm'):
+            pending = []
+            pieces.append(' ')
+        elif token == b'ET':
+            pending = []
+            pieces.append('\n')
+        elif re.fullmatch(rb'[+-]?[\d.]+', token):
+            # TJ 陣列中較大的負位移通常是字間空白
+            if in_array and float(token) <= -TJ_SPACE:
+                pending.append(b' ')
+        else:
+            pending = []
+    text = re.sub(r'[ \t]+', ' ', ''.join(pieces))
+    return re.sub(r' ?\n[\s]*', '\n', text).strip()
+
+
+def _find_broker(*texts):
+    """以券商別名（英文名稱、中文簡稱）在標題、作者與第一頁文字中尋找券商"""
+    for text in texts:
+        if not text:
+            continue
+        lowered = text.lower()
+        for alias, broker in Config.PDF_BROKER_ALIASES.items():
+            if re.search(r'(?<![a-z])' + re.escape(alias.lower()) + r'(?![a-z])', lowered) or broker in text:
+                return broker
+    return None
+
+
+def _find_ticker(text):
+    """第一頁文字中的第一個股票代號"""
+    match = TICKER_TEXT.search(text or '')
+    if not match:
+        return None
+    return next(group for group in match.groups() if group)
+
+
+def _pdf_date(value):
+    """PDF 日期字串轉為 date，無法解析時返回 None"""
+    match = PDF_DATE.search(value or '')
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2) or 1), int(match.group(3) or 1))
+    except ValueError:
+        return None
+
+
+def _clean_title(title):
+    """移除 Office 轉出的前綴與副檔名"""
+    if not title:
+        return None
+    title = TITLE_PREFIX.sub('', title)
+    title = re.sub(r'\.(docx?|pptx?|xlsx?)$', '', title, flags=re.IGNORECASE).strip()
+    return title or None
+
+
+def _file_sha256(f):
+    """以串流方式計算內容的 SHA-256（每次只讀取 1MB）"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_pdf_metadata(path):
+    """
+    解析單一 PDF（在行程池的工作行程中執行）
+    返回: dict，含 sha256、size、mtime 與 PdfMetadata 的欄位；結構無法解析時 error 欄位為錯誤訊息
+    """
+    stat = os.stat(path)
+    result = {'sha256': None, 'size': stat.st_size, 'mtime': stat.st_mtime, 'title': None, 'author': None,
+              'created': None, 'pages': None, 'broker': None, 'ticker': None, 'text': None, 'error': None}
+    with open(path, 'rb') as f:
+        result['sha256'] = _file_sha256(f)
+        if stat.st_size == 0:
+            result['error'] = '空檔案'
+            return result
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if not mapped[:1024].lstrip().startswith(b'%PDF'):
+                result['error'] = '不是 PDF 檔案'
+                return result
+            try:
+                reader = PdfReader(mapped)
+                if 'Root' not in reader.trailer:
+                    raise PdfError("找不到文件目錄")
+                info = reader.info()
+                result['title'] = _clean_title(decode_text(reader.resolve(info.get('Title'))))
+                result['author'] = decode_text(reader.resolve(info.get('Author')))
+                created = _pdf_date(decode_text(reader.resolve(info.get('CreationDate'))))
+                result['created'] = created.isoformat() if created else None
+                result['pages'] = reader.page_count()
+                text = extract_text(reader.first_page_contents())
+                result['text'] = text[:Config.PDF_TEXT_LIMIT] or None
+            except (PdfError, ValueError, IndexError, KeyError, TypeError, zlib.error) as e:
+                result['error'] = str(e) or type(e).__name__
+    result['broker'] = _find_broker(result['title'], result['author'], result['text'])
+    result['ticker'] = _find_ticker(result['text'])
+    return result
+
+
+def _to_metadata(row):
+    """資料庫或工作行程的結果轉為 PdfMetadata"""
+    return PdfMetadata(
+        sha256=row['sha256'],
+        title=row['title'],
+        author=row['author'],
+        created=date.fromisoformat(row['created']) if row['created'] else None,
+        pages=row['pages'],
+        broker=row['broker'],
+        ticker=row['ticker'],
+        text=row['text'],
+    )
+
+
+class PdfMetadataExtractor:
+    """PDF 中繼資料解析管線：行程池解析 + 內容雜湊快取"""
+
+    def __init__(self, on_extracted=None, db_path=None, max_workers=None):
+        """
+        Args:
+            on_extracted: callable(資料夾, 檔名, PdfMetadata)，排入時未指定通知的檔案解析完成時呼叫（在背景執行緒中）
+            db_path: 快取資料庫
+            max_workers: 解析行程數
+        """
+        self.on_extracted = on_extracted
+        self.max_workers = max_workers or Config.PDF_METADATA_WORKERS
+        self.db_path = db_path or Config.FOLDER_INDEX_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_metadata (
+                sha256 TEXT PRIMARY KEY,
+                title TEXT,
+                author TEXT,
+                created TEXT,
+                pages INTEGER,
+                broker TEXT,
+                ticker TEXT,
+                text TEXT,
+                error TEXT,
+                extracted_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._files = {}  # {(資料夾, 檔名): PdfMetadata}
+        self._pending = {}  # {(資料夾, 檔名): Future}
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def cached(self, sha256):
+        """依內容雜湊取得快取的解析結果"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pdf_metadata WHERE sha256 = ?", (sha256,)).fetchone()
+        return _to_metadata(row) if row else None
+
+    def get(self, folder, name):
+        """取得檔案的解析結果（尚未解析完成時返回 None，不會等待）"""
+        with self._lock:
+            metadata = self._files.get((folder, name))
+        if metadata is not None:
+            return metadata
+        index = get_folder_index(folder)
+        entry = index.get(name)
+        digest = index.get_fingerprint(entry, 'full') if entry is not None else None
+        return self.cached(digest) if digest else None
+
+    def submit(self, folder, name, on_extracted=None):
+        """
+        排入解析（非 PDF 檔案略過）
+        內容雜湊已在資料夾索引中且有快取時不啟動工作行程
+        on_extracted: callable(資料夾, 檔名, PdfMetadata)，此檔案解析完成時呼叫，預設使用管線的通知
+        返回: Future（結果為 PdfMetadata，解析失敗時為 None）；略過時返回 None
+        """
+        if not name.lower().endswith('.pdf'):
+            return None
+        key = (folder, name)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending
+        index = get_folder_index(folder)
+        entry = index.get(name)
+        if entry is None:
+            return None
+
+        digest = index.get_fingerprint(entry, 'full')
+        metadata = self.cached(digest) if digest else None
+        if metadata is not None:
+            future = Future()
+            future.set_result(metadata)
+            self._remember(folder, name, metadata)
+            self._notify(on_extracted, folder, name, metadata)
+            return future
+
+        try:
+            job = self._get_executor().submit(extract_pdf_metadata, os.path.join(folder, name))
+        except (BrokenProcessPool, RuntimeError) as e:
+            debug_print(f"無法排入 PDF 解析: {name}, 錯誤: {str(e)}", color='light_red')
+            with self._lock:
+                self._executor = None
+            return None
+        # 返回的 Future 在結果保存後才完成，等待者取得的一定是已快取的結果
+        future = Future()
+        with self._lock:
+            self._pending[key] = future
+        job.add_done_callback(lambda done: self._finish(folder, entry, done, future, on_extracted))
+        return future
+
+    def submit_many(self, folder, names, on_extracted=None):
+        """排入多個檔案，返回 [Future, ...]"""
+        futures = (self.submit(folder, name, on_extracted) for name in names)
+        return [future for future in futures if future is not None]
+
+    def _finish(self, folder, entry, job, future, on_extracted):
+        """工作行程完成：保存快取與內容雜湊，並通知（在行程池的管理執行緒中執行）"""
+        metadata = None
+        try:
+            metadata = self._store(folder, entry, job)
+        finally:
+            with self._lock:
+                self._pending.pop((folder, entry.name), None)
+            future.set_result(metadata)
+        if metadata is not None:
+            self._notify(on_extracted, folder, entry.name, metadata)
+
+    def _store(self, folder, entry, job):
+        """保存工作行程的結果，返回 PdfMetadata；解析失敗時返回 None"""
+        try:
+            result = job.result()
+        except CancelledError:
+            return None  # 停止行程池時尚未開始的解析，下次排入時重新解析
+        except BrokenProcessPool as e:
+            debug_print(f"PDF 解析行程異常結束: {entry.name}, 錯誤: {str(e)}", color='light_red')
+            with self._lock:
+                self._executor = None
+            return None
+        except Exception as e:
+            debug_print(f"解析 PDF 時發生錯誤: {entry.name}, 錯誤: {str(e)}", color='light_red')
+            return None
+
+        if result['error']:
+            debug_print(f"PDF 中繼資料不完整: {entry.name} ({result['error']})", color='light_yellow')
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pdf_metadata "
+                    "(sha256, title, author, created, pages, broker, ticker, text, error, extracted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (result['sha256'], result['title'], result['author'], result['created'], result['pages'],
+                     result['broker'], result['ticker'], result['text'], result['error'], time.time())
+                )
+                self._conn.commit()
+            # 解析時的檔案仍是索引中的版本時，內容雜湊一併提供重複檔案偵測使用
+            if result['size'] == entry.size and result['mtime'] == entry.mtime:
+                get_folder_index(folder).set_fingerprint(entry, 'full', result['sha256'])
+        except Exception as e:
+            debug_print(f"保存 PDF 中繼資料時發生錯誤: {str(e)}", color='light_red')
+
+        metadata = _to_metadata(result)
+        self._remember(folder, entry.name, metadata)
+        return metadata
+
+    def _remember(self, folder, name, metadata):
+        with self._lock:
+            self._files[(folder, name)] = metadata
+
+    def _notify(self, on_extracted, folder, name, metadata):
+        """呼叫解析完成通知"""
+        callback = on_extracted or self.on_extracted
+        try:
+            if callback:
+                callback(folder, name, metadata)
+        except Exception as e:
+            debug_print(f"PDF 中繼資料通知處理時發生錯誤: {str(e)}", color='light_red')
+
+    def wait(self, folder, names, timeout=None):
+        """等待指定檔案解析完成（最多 timeout 秒），返回 {檔名: PdfMetadata}"""
+        with self._lock:
+            futures = [self._pending[(folder, name)] for name in names if (folder, name) in self._pending]
+        if futures:
+            wait_futures(futures, timeout=timeout)
+        results = {}
+        for name in names:
+            metadata = self.get(folder, name) if name.lower().endswith('.pdf') else None
+            if metadata is not None:
+                results[name] = metadata
+        return results
+
+    def shutdown(self):
+        """停止行程池（尚未開始的解析取消，下次排入時重新建立）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def close(self):
+        self.shutdown()
+        with self._lock:
+            self._conn.close()
+
+
+# 全域解析管線（工作行程與快取連線只有一份）
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_pdf_metadata_extractor():
+    """取得全域 PDF 中繼資料解析管線（行程池在第一次排入解析時才啟動）"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = PdfMetadataExtractor()
+        return _extractor
+
+
+def main(argv=None):
+    """命令列介面：直接解析檔案（不使用快取）"""
+    parser = argparse.ArgumentParser(prog='pdf_metadata.py', description='PDF 中繼資料解析')
+    parser.add_argument('files', nargs='+', help='PDF 檔案')
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        start = time.perf_counter()
+        result = extract_pdf_metadata(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        debug_print(f"=== {os.path.basename(path)} ({elapsed:.1f} 毫秒) ===", color='light_cyan')
+        for field in ('title', 'author', 'created', 'pages', 'broker', 'ticker', 'error'):
+            if result[field] is not None:
+                debug_print(f"{field}: {result[field]}", color='light_green')
+        if result['text']:
+            debug_print(result['text'][:200], color='white')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+列表刷新檢測模組
+功能: 以 UIA 事件檢測三個報告列表的刷新，並發出「列表已變更」事件
+職責:
+- 訂閱列表控件的 StructureChanged 與 PropertyChanged 事件
+- 合併短時間內的大量事件 (debounce，事件持續不斷時最多等待 REFRESH_DEBOUNCE_MAX_WAIT 秒)，只在指紋改變時發出通知
+- 無法訂閱事件時，改以低頻率比對指紋（項目數 + 名稱滾動雜湊）
+- 通知列表快照失效，並將事件轉發給所有訂閱者
+依賴: config.py, utils.py, control_info.py, list_snapshot.py, uia_session.py
+"""
+
+import threading
+import time
+import zlib
+from collections import namedtuple
+from config import Config
+from utils import debug_print, find_window_handle
+from control_info import LIST_CONTROLS
+from list_snapshot import capture_list_names, invalidate_list_snapshot, get_iuia
+from uia_session import get_uia_session
+
+# 列表變更事件
+# reason: 'structure' | 'property' | 'fingerprint'
+ListChangedEvent = namedtuple('ListChangedEvent', ['hwnd', 'list_type', 'reason', 'count', 'fingerprint', 'timestamp'])
+
+# 列表指紋：項目數與名稱滾動雜湊
+ListFingerprint = namedtuple('ListFingerprint', ['count', 'name_hash'])
+
+
+def compute_fingerprint(names):
+    """計算列表指紋（項目數 + 名稱的 CRC32 滾動雜湊）"""
+    name_hash = 0
+    for name in names:
+        name_hash = zlib.crc32(name.encode('utf-8'), name_hash)
+        name_hash = zlib.crc32(b'\0', name_hash)  # 分隔符，避免相鄰名稱串接後相同
+    return ListFingerprint(len(names), name_hash)
+
+
+def _create_event_handlers(uia_dll, detector, list_type):
+    """建立 UIA 事件處理器（COM 物件）"""
+    import comtypes
+
+    class StructureChangedHandler(comtypes.COMObject):
+        _com_interfaces_ = [uia_dll.IUIAutomationStructureChangedEventHandler]
+
+        def HandleStructureChangedEvent(self, sender, changeType, runtimeId):
+            detector.notify(list_type, 'structure')
+
+    class PropertyChangedHandler(comtypes.COMObject):
+        _com_interfaces_ = [uia_dll.IUIAutomationPropertyChangedEventHandler]
+
+        def HandlePropertyChangedEvent(self, sender, propertyId, newValue):
+            detector.notify(list_type, 'property')
+
+    return StructureChangedHandler(), PropertyChangedHandler()
+
+
+class RefreshDetector:
+    """列表刷新檢測器"""
+
+    def __init__(self, hwnd):
+        self.hwnd = hwnd
+        self.is_running = False
+        self.use_events = False
+        self.fingerprints = {}
+        self._subscribers = []
+        self._pending = {}  # {list_type: (第一個事件時間, 最後事件時間, 原因)}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._registered = []  # [(list_element, structure_handler, property_handler)]
+
+    def subscribe(self, callback):
+        """訂閱列表變更事件，callback 接收 ListChangedEvent"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """取消訂閱列表變更事件"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def notify(self, list_type, reason):
+        """由事件處理器呼叫：記錄待處理事件，實際通知延後到合併等待結束"""
+        now = time.monotonic()
+        with self._condition:
+            first_time = self._pending[list_type][0] if list_type in self._pending else now
+            self._pending[list_type] = (first_time, now, reason)
+            self._condition.notify()
+
+    def start(self):
+        """開始檢測"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止檢測"""
+        with self._condition:
+            self.is_running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _register_events(self):
+        """訂閱三個列表的 UIA 事件，失敗時返回 False"""
+        iuia = get_iuia()
+        if iuia is None:
+            return False
+
+        try:
+            session = get_uia_session(self.hwnd)
+            uia_dll = iuia.UIA_dll
+            for list_type, list_info in LIST_CONTROLS.items():
+                element = session.child(auto_id=list_info['id']).element_info.element
+                structure_handler, property_handler = _create_event_handlers(uia_dll, self, list_type)
+                iuia.iuia.AddStructureChangedEventHandler(
+                    element, iuia.tree_scope['subtree'], None, structure_handler)
+                iuia.iuia.AddPropertyChangedEventHandler(
+                    element, iuia.tree_scope['subtree'], None, property_handler,
+                    [uia_dll.UIA_NamePropertyId])
+                self._registered.append((element, structure_handler, property_handler))
+            return True
+        except Exception as e:
+            debug_print(f"無法訂閱列表事件，改用指紋輪詢: {str(e)}", color='light_magenta')
+            self._unregister_events()
+            return False
+
+    def _unregister_events(self):
+        """取消所有 UIA 事件訂閱"""
+        iuia = get_iuia()
+        if iuia is not None:
+            for element, structure_handler, property_handler in self._registered:
+                try:
+                    iuia.iuia.RemoveStructureChangedEventHandler(element, structure_handler)
+                    iuia.iuia.RemovePropertyChangedEventHandler(element, property_handler)
+                except Exception:
+                    continue
+        self._registered = []
+
+    def _check_fingerprint(self, list_type, reason):
+        """重新計算單一列表指紋，與上次不同時發出事件"""
+        try:
+            fingerprint = compute_fingerprint(capture_list_names(self.hwnd, list_type))
+        except Exception as e:
+            debug_print(f"計算 {LIST_CONTROLS[list_type]['name']} 列表指紋時發生錯誤: {str(e)}", color='light_red')
+            return
+
+        previous = self.fingerprints.get(list_type)
+        self.fingerprints[list_type] = fingerprint
+        if previous is None or previous == fingerprint:
+            return
+
+        self._emit(ListChangedEvent(
+            hwnd=self.hwnd,
+            list_type=list_type,
+            reason=reason,
+            count=fingerprint.count,
+            fingerprint=fingerprint,
+            timestamp=time.time()
+        ))
+
+    def _emit(self, event):
+        """使快照失效並通知所有訂閱者"""
+        invalidate_list_snapshot(self.hwnd)
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                debug_print(f"列表變更事件處理時發生錯誤: {str(e)}", color='light_red')
+
+    def _take_due_events(self):
+        """
+        取出已超過合併等待時間的事件，並返回下一次需要醒來的等待秒數
+        事件持續不斷時，距第一個事件超過 REFRESH_DEBOUNCE_MAX_WAIT 也視為到期，避免一直延後檢查
+        """
+        now = time.monotonic()
+        due = []
+        wait = None
+        for list_type, (first_time, last_time, reason) in list(self._pending.items()):
+            deadline = min(last_time + Config.REFRESH_DEBOUNCE, first_time + Config.REFRESH_DEBOUNCE_MAX_WAIT)
+            remaining = deadline - now
+            if remaining <= 0:
+                due.append((list_type, reason))
+                del self._pending[list_type]
+            else:
+                wait = remaining if wait is None else min(wait, remaining)
+        return due, wait
+
+    def _run(self):
+        """檢測執行緒主迴圈"""
+        com_initialized = False
+        try:
+            import comtypes
+            comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+            com_initialized = True
+        except Exception:
+            pass
+
+        try:
+            # 建立初始指紋
+            for list_type in LIST_CONTROLS:
+                self._check_fingerprint(list_type, 'fingerprint')
+
+            self.use_events = self._register_events()
+            interval = Config.REFRESH_HEARTBEAT_INTERVAL if self.use_events else Config.REFRESH_POLL_INTERVAL
+            mode = "UIA 事件" if self.use_events else "指紋輪詢"
+            debug_print(f"開始檢測列表刷新（{mode}）...", color='light_cyan')
+
+            next_full_check = time.monotonic() + interval
+            while self.is_running:
+                with self._condition:
+                    due, wait = self._take_due_events()
+                    if not due:
+                        timeout = max(0.0, next_full_check - time.monotonic())
+                        if wait is not None:
+                            timeout = min(timeout, wait)
+                        self._condition.wait(timeout)
+                        due, _ = self._take_due_events()
+
+                if not self.is_running:
+                    break
+
+                for list_type, reason in due:
+                    self._check_fingerprint(list_type, reason)
+
+                if time.monotonic() >= next_full_check:
+                    for list_type in LIST_CONTROLS:
+                        self._check_fingerprint(list_type, 'fingerprint')
+                    next_full_check = time.monotonic() + interval
+
+        except Exception as e:
+            debug_print(f"檢測列表刷新時發生錯誤: {str(e)}", color='light_red')
+        finally:
+            self._unregister_events()
+            self.is_running = False
+            if com_initialized:
+                try:
+                    import comtypes
+                    comtypes.CoUninitialize()
+                except Exception:
+                    pass
+
+
+# 目前執行中的檢測器
+_detector = None
+
+
+def get_refresh_detector():
+    """取得目前執行中的檢測器，沒有時返回 None"""
+    return _detector if _detector and _detector.is_running else None
+
+
+def log_list_changed(event):
+    """預設的事件訂閱者：輸出列表刷新訊息"""
+    list_name = LIST_CONTROLS[event.list_type]['name']
+    debug_print(f"檢測到 [{list_name}] 列表刷新，共 {event.count} 個項目（{event.reason}）", color='light_green')
+
+
+def start_refresh_check(hwnd=None):
+    """開始檢測列表刷新"""
+    global _detector
+
+    if hwnd is None:
+        windows = find_window_handle(Config.TARGET_WINDOW)
+        if not windows:
+            debug_print("錯誤: 找不到目標視窗", color='light_red')
+            return None
+        hwnd = windows[0][0]
+
+    if get_refresh_detector():
+        return _detector
+
+    _detector = RefreshDetector(hwnd)
+    _detector.subscribe(log_list_changed)
+    _detector.start()
+    return _detector
+
+
+def stop_refresh_check():
+    """停止檢測列表刷新"""
+    global _detector
+    if _detector:
+        _detector.stop()
+        _detector = None
+    debug_print("停止檢測列表刷新", color='light_yellow')
@@ -0,0 +1,286 @@
+"""
+報告目錄模組
+功能: 在本機 SQLite 建立下載資料夾與共用目標資料夾中所有報告的可搜尋目錄
+職責:
+- 以 FTS5 全文索引檔名、券商、股票代號、標題與 PDF 標題（trigram 分詞，可搜尋中文字串片段）
+- 由 FolderMonitor（新檔案落地）與 copy_today_files（複製完成）逐筆更新，不需掃描網路磁碟
+- PDF 中繼資料解析完成後補上 PDF 標題與頁數，檔名缺少的券商、代號由 PDF 內容補齊
+- 依關鍵字、券商、代號、報告類型、位置與天數查詢
+- 命令列查詢 (python report_catalog.py search 台積電 --days 30)
+依賴: config.py, utils.py, report_metadata.py, folder_index.py
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from config import Config
+from utils import debug_print
+from report_metadata import get_report_metadata, save_report_metadata
+
+# 目錄中的單一報告檔案
+# location: 'download'（下載資料夾）| 'target'（複製目標）| 'archive'（已封存）
+CatalogEntry = namedtuple('CatalogEntry', [
+    'path', 'location', 'name', 'broker', 'ticker', 'report_date', 'report_type', 'title', 'size', 'mtime',
+    'pdf_title', 'pages'
+])
+
+# trigram 分詞的最短查詢長度，較短的關鍵字改用 LIKE
+TRIGRAM_MIN_LENGTH = 3
+
+
+class ReportCatalog:
+    """可全文搜尋的報告目錄"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.CATALOG_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                location TEXT NOT NULL,
+                broker TEXT,
+                ticker TEXT,
+                report_date TEXT,
+                report_type TEXT,
+                title TEXT,
+                day TEXT,
+                size INTEGER,
+                mtime REAL,
+                added_at REAL NOT NULL,
+                pdf_title TEXT,
+                pages INTEGER
+            )
+        """)
+        fts_outdated = self._add_pdf_columns()
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_day ON reports(day)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_ticker ON reports(ticker)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_name ON reports(name)")
+        self.has_fts = self._create_fts(rebuild=fts_outdated)
+        self._conn.commit()
+
+    def _add_pdf_columns(self):
+        """舊版資料庫補上 PDF 標題與頁數欄位，返回全文索引是否需要重建"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reports)")}
+        if 'pdf_title' in columns:
+            return False
+        self._conn.execute("ALTER TABLE reports ADD COLUMN pdf_title TEXT")
+        self._conn.execute("ALTER TABLE reports ADD COLUMN pages INTEGER")
+        self._conn.executescript("""
+            DROP TRIGGER IF EXISTS reports_ai;
+            DROP TRIGGER IF EXISTS reports_ad;
+            DROP TRIGGER IF EXISTS reports_au;
+            DROP TABLE IF EXISTS reports_fts;
+        """)
+        return True
+
+    def _create_fts(self, rebuild=False):
+        """建立全文索引（SQLite 不支援 FTS5 trigram 時改用 LIKE 查詢）"""
+        try:
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+                    name, broker, ticker, title, pdf_title,
+                    content='reports', content_rowid='id', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            debug_print(f"無法建立全文索引，改用一般查詢: {str(e)}", color='light_yellow')
+            return False
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+                INSERT INTO reports_fts(rowid, name, broker, ticker, title, pdf_title)
+                VALUES (new.id, new.name, new.broker, new.ticker, new.title, new.pdf_title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+                INSERT INTO reports_fts(reports_fts, rowid, name, broker, ticker, title, pdf_title)
+                VALUES ('delete', old.id, old.name, old.broker, old.ticker, old.title, old.pdf_title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reports_au AFTER UPDATE ON reports BEGIN
+                INSERT INTO reports_fts(reports_fts, rowid, name, broker, ticker, title, pdf_title)
+                VALUES ('delete', old.id, old.name, old.broker, old.ticker, old.title, old.pdf_title);
+                INSERT INTO reports_fts(rowid, name, broker, ticker, title, pdf_title)
+                VALUES (new.id, new.name, new.broker, new.ticker, new.title, new.pdf_title);
+            END;
+        """)
+        if rebuild:
+            self._conn.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+        return True
+
+    @staticmethod
+    def _row(folder, name, location, size, mtime):
+        """建立寫入資料庫的一列"""
+        metadata = get_report_metadata(name, has_extension=True)
+        report_date = metadata.report_date.isoformat() if metadata.report_date else None
+        # 查詢天數時使用的日期：報告日期，沒有時使用檔案修改日期
+        day = report_date or (datetime.fromtimestamp(mtime).date().isoformat() if mtime else None)
+        return (os.path.join(folder, name), folder, name, location, metadata.broker, metadata.ticker,
+                report_date, metadata.report_type, metadata.title, day, size, mtime, time.time())
+
+    def add_many(self, files):
+        """
+        新增或更新多筆報告
+        files: [(資料夾, 檔名, 位置, 大小, 修改時間), ...]
+        """
+        rows = [self._row(*file) for file in files]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO reports (path, folder, name, location, broker, ticker, report_date,
+                                     report_type, title, day, size, mtime, added_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime = excluded.mtime, day = excluded.day
+                WHERE size IS NOT excluded.size OR mtime IS NOT excluded.mtime
+            """, rows)
+            self._conn.commit()
+
+    def add(self, folder, name, location, size=None, mtime=None):
+        """新增或更新單一報告"""
+        self.add_many([(folder, name, location, size, mtime)])
+
+    def set_pdf_metadata(self, name, metadata):
+        """
+        以 PDF 中繼資料補充同名的所有報告（下載資料夾與各複製目標）
+        PDF 標題與頁數直接寫入；券商、代號只在檔名解析不到時補上
+        """
+        with self._lock:
+            self._conn.execute("""
+                UPDATE reports SET pdf_title = ?, pages = ?,
+                                   broker = COALESCE(broker, ?), ticker = COALESCE(ticker, ?)
+                WHERE name = ?
+            """, (metadata.title, metadata.pages, metadata.broker, metadata.ticker, name))
+            self._conn.commit()
+
+    def remove(self, folder, name):
+        """移除單一報告（檔案被刪除或移走）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM reports WHERE path = ?", (os.path.join(folder, name),))
+            self._conn.commit()
+
+    def search(self, query='', days=None, broker=None, ticker=None, report_type=None, location=None, limit=200):
+        """
+        查詢報告
+        Args:
+            query: 關鍵字（以空白分隔，全部符合）
+            days: 只列出最近 N 天的報告（依報告日期，沒有時依檔案修改日期）
+            broker / ticker / report_type / location: 欄位完全相符
+            limit: 最多返回筆數
+        返回: [CatalogEntry, ...]，依日期由新到舊
+        """
+        conditions = []
+        params = []
+        fts_terms = []
+        for term in query.split():
+            if self.has_fts and len(term) >= TRIGRAM_MIN_LENGTH:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                conditions.append("(r.name LIKE ? OR r.ticker LIKE ? OR r.pdf_title LIKE ?)")
+                params.extend([f"%{term}%", f"%{term}%", f"%{term}%"])
+        if fts_terms:
+            conditions.append("r.id IN (SELECT rowid FROM reports_fts WHERE reports_fts MATCH ?)")
+            params.append(' AND '.join(fts_terms))
+        if days is not None:
+            conditions.append("r.day >= ?")
+            params.append((datetime.now().date() - timedelta(days=days)).isoformat())
+        for column, value in (('broker', broker), ('ticker', ticker and ticker.upper()),
+                              ('report_type', report_type), ('location', location)):
+            if value:
+                conditions.append(f"r.{column} = ?")
+                params.append(value)
+
+        sql = ("SELECT r.path, r.location, r.name, r.broker, r.ticker, r.report_date, r.report_type, r.title, "
+               "r.size, r.mtime, r.pdf_title, r.pages FROM reports r")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY r.day DESC, r.name LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [CatalogEntry(*row) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 全域目錄
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_report_catalog():
+    """取得全域報告目錄（第一次使用時開啟資料庫）"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ReportCatalog()
+        return _catalog
+
+
+def rebuild_from_folder_index(catalog, folder_path=None):
+    """由資料夾索引補齊下載資料夾中的所有報告（不需走訪網路磁碟）"""
+    from folder_index import get_folder_index
+
+    folder_path = folder_path or Config.DOWNLOAD_FOLDER
+    index = get_folder_index(folder_path)
+    entries = index.select(lambda entry: entry.name != 'sync.ffs_db')
+    catalog.add_many((folder_path, entry.name, 'download', entry.size, entry.mtime) for entry in entries)
+    save_report_metadata()
+    return len(entries)
+
+
+def main(argv=None):
+    """命令列介面"""
+    parser = argparse.ArgumentParser(prog='report_catalog.py', description='報告目錄查詢')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search_parser = subparsers.add_parser('search', help='查詢報告')
+    search_parser.add_argument('query', nargs='*', help='關鍵字（檔名、券商、代號、標題、PDF 標題）')
+    search_parser.add_argument('--days', type=int, help='只列出最近 N 天')
+    search_parser.add_argument('--broker', help='券商')
+    search_parser.add_argument('--ticker', help='股票代號')
+    search_parser.add_argument('--type', dest='report_type', help='報告類型（個股、產業、晨會...）')
+    search_parser.add_argument('--location', choices=('download', 'target', 'archive'), help='位置')
+    search_parser.add_argument('--limit', type=int, default=200, help='最多列出筆數')
+
+    subparsers.add_parser('rebuild', help='由下載資料夾索引補齊目錄')
+
+    args = parser.parse_args(argv)
+    catalog = get_report_catalog()
+
+    if args.command == 'rebuild':
+        count = rebuild_from_folder_index(catalog)
+        debug_print(f"已補齊 {count} 個檔案，目錄共 {len(catalog)} 筆", color='light_green')
+        return 0
+
+    start = time.perf_counter()
+    results = catalog.search(' '.join(args.query), days=args.days, broker=args.broker, ticker=args.ticker,
+                             report_type=args.report_type, location=args.location, limit=args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for entry in results:
+        date_text = entry.report_date or '----------'
+        debug_print(f"{date_text}  [{entry.location}]  {entry.path}", color='light_green')
+        if entry.pdf_title:
+            debug_print(f"            {entry.pdf_title} ({entry.pages or '?'} 頁)", color='white')
+    debug_print(f"共 {len(results)} 筆，查詢耗時 {elapsed:.1f} 毫秒", color='light_cyan')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
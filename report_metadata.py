@@ -0,0 +1,218 @@
+"""
+報告中繼資料模組
+功能: 將列表項目名稱與下載檔名解析為結構化紀錄，並快取解析結果
+職責:
+- 解析券商、股票代號、民國日期（轉為西元日期）、報告類型與標題
+- 產生比對鍵（filename_utils.normalize_filename 的標準化結果）
+- 以名稱為鍵在記憶體中快取，並保存在資料夾索引資料庫中，下次啟動直接載入
+- 快取紀錄附帶解析規則版本，規則變更後舊紀錄在載入時重新解析
+- 讓統計、排除與比對只需對紀錄做分組，不必每次重新切割字串
+依賴: config.py, utils.py, filename_utils.py
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import date
+from config import Config
+from utils import debug_print
+from filename_utils import normalize_filename, strip_duplicate_suffix
+
+# 報告紀錄
+# report_type: '公司' | '晨會' | '定期' | '產業' | '策略' | '個股' | '其他'
+ReportMetadata = namedtuple('ReportMetadata', [
+    'name', 'broker', 'ticker', 'report_date', 'report_type', 'title', 'key'
+])
+
+# 解析規則版本：parse_report_name 的結果改變時遞增，快取中舊版本的紀錄會重新解析
+PARSER_VERSION = 1
+
+# 民國日期（7 碼，例如 1131015 = 2024/10/15）
+ROC_DATE = re.compile(r'^(1\d{2})(\d{2})(\d{2})$')
+
+# 股票代號：台股 4~6 碼（可帶一個英文字母），或帶交易所後綴的外國代號（7203.JP、005930.KS）
+TICKER = re.compile(r'^(\d{4,6}[A-Za-z]?|[0-9A-Za-z]{1,6}[.\-][A-Za-z]{2})$')
+
+# 依關鍵字判斷報告類型（依序比對，先符合者為準）
+REPORT_TYPE_KEYWORDS = [
+    ('晨會', ('晨訊', '晨報', '晨會')),
+    ('定期', ('日報', '週報', '月報', '週刊', '月刊', 'weekly', 'monthly')),
+    ('產業', ('產業', 'industry', 'sector')),
+    ('策略', ('策略', 'strategy')),
+]
+
+
+def roc_to_date(text):
+    """民國日期字串轉為 date，格式不符或日期無效時返回 None"""
+    match = ROC_DATE.match(text)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)) + 1911, int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+def parse_report_name(name, has_extension=False):
+    """
+    解析報告名稱或檔名
+    Args:
+        name: 列表項目名稱或檔名
+        has_extension: 是否包含副檔名（檔名為 True）
+    """
+    stem = os.path.splitext(name)[0] if has_extension else name
+    stem = strip_duplicate_suffix(stem)
+
+    if stem.endswith('_公司'):
+        report_type = '公司'
+        stem_body = stem[:-len('_公司')]
+    else:
+        report_type = None
+        stem_body = stem
+
+    broker = None
+    ticker = None
+    report_date = None
+    title_parts = []
+    for index, part in enumerate(part.strip() for part in stem_body.split('_')):
+        if not part:
+            continue
+        if report_date is None and roc_to_date(part):
+            report_date = roc_to_date(part)
+        elif ticker is None and TICKER.match(part):
+            ticker = part.upper()
+        elif index == 0 and len(part) <= 8 and not any(char.isdigit() for char in part):
+            broker = part
+        else:
+            title_parts.append(part)
+
+    title = '_'.join(title_parts)
+    if report_type is None:
+        lowered = stem.lower()
+        for type_name, keywords in REPORT_TYPE_KEYWORDS:
+            if any(keyword in lowered for keyword in keywords):
+                report_type = type_name
+                break
+        else:
+            report_type = '個股' if ticker else '其他'
+
+    return ReportMetadata(
+        name=name,
+        broker=broker,
+        ticker=ticker,
+        report_date=report_date,
+        report_type=report_type,
+        title=title,
+        key=normalize_filename(stem, has_extension=False)
+    )
+
+
+class MetadataCache:
+    """解析結果快取（記憶體 + 資料夾索引資料庫）"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.FOLDER_INDEX_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS report_metadata (
+                name TEXT NOT NULL,
+                has_extension INTEGER NOT NULL,
+                broker TEXT,
+                ticker TEXT,
+                report_date TEXT,
+                report_type TEXT NOT NULL,
+                title TEXT NOT NULL,
+                key TEXT NOT NULL,
+                parser_version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (name, has_extension)
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(report_metadata)")}
+        if 'parser_version' not in columns:
+            # 舊版資料庫的紀錄視為版本 0，載入時重新解析
+            self._conn.execute("ALTER TABLE report_metadata ADD COLUMN parser_version INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_report_metadata_key ON report_metadata(key)")
+        self._conn.commit()
+
+        self._records = {}  # {(名稱, 是否含副檔名): ReportMetadata}
+        self._unsaved = []
+        for name, has_extension, broker, ticker, report_date, report_type, title, key, version in self._conn.execute(
+                "SELECT name, has_extension, broker, ticker, report_date, report_type, title, key, parser_version "
+                "FROM report_metadata"):
+            if version != PARSER_VERSION:
+                record = parse_report_name(name, bool(has_extension))
+                self._unsaved.append((record, bool(has_extension)))
+            else:
+                record = ReportMetadata(name, broker, ticker, date.fromisoformat(report_date) if report_date else None,
+                                        report_type, title, key)
+            self._records[(name, bool(has_extension))] = record
+        if self._unsaved:
+            debug_print(f"解析規則已更新，重新解析 {len(self._unsaved)} 筆報告中繼資料", color='light_blue')
+            self.save()
+
+    def get(self, name, has_extension=False):
+        """取得名稱的解析紀錄，第一次遇到時解析並排入保存"""
+        cache_key = (name, bool(has_extension))
+        with self._lock:
+            record = self._records.get(cache_key)
+        if record is not None:
+            return record
+
+        record = parse_report_name(name, has_extension)
+        with self._lock:
+            self._records[cache_key] = record
+            self._unsaved.append((record, bool(has_extension)))
+            should_save = len(self._unsaved) >= Config.METADATA_SAVE_BATCH
+        if should_save:
+            self.save()
+        return record
+
+    def save(self):
+        """將新解析的紀錄寫入資料庫"""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+            if not unsaved:
+                return
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO report_metadata "
+                    "(name, has_extension, broker, ticker, report_date, report_type, title, key, parser_version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(record.name, int(has_extension), record.broker, record.ticker,
+                      record.report_date.isoformat() if record.report_date else None,
+                      record.report_type, record.title, record.key, PARSER_VERSION)
+                     for record, has_extension in unsaved]
+                )
+                self._conn.commit()
+            except Exception as e:
+                debug_print(f"保存報告中繼資料時發生錯誤: {str(e)}", color='light_red')
+
+
+# 全域快取
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """取得全域解析快取（第一次使用時載入）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MetadataCache()
+        return _cache
+
+
+def get_report_metadata(name, has_extension=False):
+    """取得名稱的解析紀錄（使用全域快取）"""
+    return get_metadata_cache().get(name, has_extension)
+
+
+def save_report_metadata():
+    """保存全域快取中新解析的紀錄"""
+    if _cache is not None:
+        _cache.save()
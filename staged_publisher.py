@@ -0,0 +1,301 @@
+"""
+暫存發佈模組
+功能: 先將檔案放入本機暫存區，再由背景執行緒分批發佈到共用雲端硬碟上的目標資料夾
+職責:
+- 提交時只在本機建立暫存（同磁碟以硬連結，否則複製），自動化流程不需等待網路磁碟
+- 快取每個目標資料夾的檔案清單，不再逐檔逐目標呼叫 exists / makedirs；寫入失敗或開始新一輪複製時重新列出
+- 短時間內提交的檔案合併為一批，以複製引擎寫入暫存檔後改名，目標資料夾中只會出現完整的檔案
+- 完成的複製記錄在複製進度資料庫，程式中斷後重新提交時略過已完成的目標（續傳）
+- 雲端硬碟暫時性錯誤排入重試佇列，依設定的間隔在背景重試
+- 每個檔案所有目標完成（或放棄重試）後呼叫提交時指定的通知，並刪除暫存
+- 全程式共用一個發佈器（get_staged_publisher），暫存區只由一個背景執行緒管理
+依賴: config.py, utils.py, copy_engine.py
+"""
+
+import os
+import shutil
+import threading
+import time
+from config import Config
+from utils import debug_print
+from copy_engine import CopyEngine, CopyJob, CopyResult
+
+
+class TargetListing:
+    """目標資料夾檔案清單快取"""
+
+    def __init__(self):
+        self._listings = {}  # {目標資料夾: {檔名: (大小, 修改時間)}}
+        self._lock = threading.Lock()
+
+    def _load(self, target_dir):
+        """列出目標資料夾（不存在時建立）；失敗時返回 None，下次再試"""
+        listing = {}
+        try:
+            with os.scandir(target_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        listing[entry.name] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            try:
+                os.makedirs(target_dir, exist_ok=True)
+                debug_print(f"已建立目標資料夾: {target_dir}", color='light_green')
+            except OSError as e:
+                debug_print(f"無法建立目標資料夾: {target_dir}, 錯誤: {str(e)}", color='light_red')
+                return None
+        except OSError as e:
+            debug_print(f"無法列出目標資料夾: {target_dir}, 錯誤: {str(e)}", color='light_red')
+            return None
+        return listing
+
+    def get(self, target_dir):
+        """取得目標資料夾的檔案清單（每個資料夾只列出一次）"""
+        with self._lock:
+            listing = self._listings.get(target_dir)
+        if listing is None:
+            listing = self._load(target_dir)
+            if listing is None:
+                return {}
+            with self._lock:
+                listing = self._listings.setdefault(target_dir, listing)
+        return listing
+
+    def is_current(self, target_dir, name, stat):
+        """目標已有大小、修改時間相同的檔案（網路磁碟的時間精度只到 2 秒）"""
+        existing = self.get(target_dir).get(name)
+        return existing is not None and existing[0] == stat.st_size and abs(existing[1] - stat.st_mtime) < 2
+
+    def record(self, target_dir, name, stat):
+        """發佈完成後更新快取"""
+        with self._lock:
+            self._listings.setdefault(target_dir, {})[name] = (stat.st_size, stat.st_mtime)
+
+    def invalidate(self, target_dir=None):
+        """清除快取（寫入失敗、或開始新一輪複製時使用，目標資料夾可能已被外部修改）"""
+        with self._lock:
+            if target_dir is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(target_dir, None)
+
+
+class PublishItem:
+    """單一檔案的發佈工作"""
+
+    def __init__(self, name, source, staged, target_dirs, on_published=None):
+        self.name = name
+        self.source = source
+        self.staged = staged
+        self.target_dirs = list(target_dirs)
+        self.on_published = on_published  # 此檔案完成時的通知
+        self.pending = list(target_dirs)  # 尚未完成的目標
+        self.results = {}  # {目標資料夾: 最近一次的 CopyResult}
+        self.attempts = 0
+        self.due = 0.0
+        self.attempted = threading.Event()  # 第一次發佈已執行
+        self.done = threading.Event()  # 全部完成或放棄重試
+
+    @property
+    def succeeded(self):
+        return not self.pending and all(result.status != 'failed' for result in self.results.values())
+
+
+class StagedPublisher:
+    """本機暫存 + 背景分批發佈 + 重試佇列"""
+
+    def __init__(self, on_published=None, staging_dir=None, batch_size=None, retry_delays=None, progress=None):
+        """
+        Args:
+            on_published: callable(PublishItem)，提交時未指定通知的檔案完成（或放棄重試）時呼叫（在背景執行緒中）
+            staging_dir: 本機暫存資料夾
+            batch_size: 每批最多發佈的檔案數
+            retry_delays: 失敗後每次重試前等待的秒數
+            progress: 複製引擎的 CopyProgress，None 時使用預設資料庫；False 時不記錄
+        """
+        self.on_published = on_published
+        self.staging_dir = staging_dir or Config.STAGING_DIR
+        self.batch_size = batch_size or Config.PUBLISH_BATCH_SIZE
+        self.retry_delays = list(Config.PUBLISH_RETRY_DELAYS if retry_delays is None else retry_delays)
+        # 目標是否已有相同檔案由清單快取判斷，複製引擎不再逐檔比對；完成的複製仍記錄以便中斷後續傳
+        self.engine = CopyEngine(progress=progress, verify_existing=False)
+        self.listing = TargetListing()
+        self._items = {}  # {檔名: PublishItem}，尚未完成的工作
+        self._queue = []  # 等待發佈的工作
+        self._condition = threading.Condition()
+        self._stopping = False
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _stage(self, source, name):
+        """在本機暫存區建立檔案（同磁碟以硬連結，否則複製）"""
+        staged = os.path.join(self.staging_dir, name)
+        if os.path.exists(staged):
+            os.remove(staged)
+        try:
+            os.link(source, staged)
+        except OSError:
+            shutil.copy2(source, staged)
+        return staged
+
+    def submit(self, source, target_dirs, on_published=None):
+        """
+        提交檔案發佈（只建立本機暫存，立即返回）
+        on_published: callable(PublishItem)，此檔案完成（或放棄重試）時呼叫，預設使用發佈器的通知
+        返回: PublishItem；同名檔案仍在發佈中時返回原有的工作
+        """
+        name = os.path.basename(source)
+        with self._condition:
+            existing = self._items.get(name)
+            if existing is not None:
+                return existing
+        item = PublishItem(name, source, self._stage(source, name), target_dirs, on_published or self.on_published)
+        item.due = time.monotonic() + Config.PUBLISH_BATCH_WINDOW
+        with self._condition:
+            self._items[name] = item
+            self._queue.append(item)
+            self._condition.notify()
+        return item
+
+    def _take_batch(self):
+        """取出一批到期的工作，沒有時等待；停止時返回 None"""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                # 最早的工作到期時，一併帶走批次等待時間內提交的工作
+                earliest = min((item.due for item in self._queue), default=None)
+                if earliest is not None and (earliest <= now or self._stopping):
+                    due = sorted((item for item in self._queue if item.due <= now + Config.PUBLISH_BATCH_WINDOW
+                                  or self._stopping), key=lambda item: item.due)
+                    batch = due[:self.batch_size]
+                    for item in batch:
+                        self._queue.remove(item)
+                    return batch
+                if self._stopping:
+                    return None
+                self._condition.wait(None if earliest is None else max(earliest - now, 0.05))
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                self._publish_batch(batch)
+            except Exception as e:
+                debug_print(f"發佈檔案時發生錯誤: {str(e)}", color='light_red')
+                for item in batch:
+                    if not item.done.is_set():
+                        self._retry_or_finish(item, str(e))
+
+    def _publish_batch(self, batch):
+        """發佈一批檔案：略過目標已有的檔案，其餘以複製引擎平行寫入"""
+        jobs = []
+        by_staged = {}
+        for item in batch:
+            item.attempts += 1
+            stat = os.stat(item.staged)
+            for target_dir in list(item.pending):
+                if self.listing.is_current(target_dir, item.name, stat):
+                    item.results[target_dir] = CopyResult(CopyJob(item.staged, (target_dir,)), target_dir,
+                                                          'skipped', stat.st_size, 0.0, None, None)
+                    item.pending.remove(target_dir)
+            if item.pending:
+                jobs.append(CopyJob(item.staged, tuple(item.pending)))
+                by_staged[item.staged] = (item, stat)
+
+        for result in (self.engine.run(jobs) if jobs else []):
+            item, stat = by_staged[result.job.source]
+            item.results[result.target_dir] = result
+            if result.status != 'failed':
+                item.pending.remove(result.target_dir)
+                self.listing.record(result.target_dir, item.name, stat)
+            else:
+                # 寫入失敗時目標資料夾的狀態不明，重試前重新列出
+                self.listing.invalidate(result.target_dir)
+
+        for item in batch:
+            if item.pending:
+                self._retry_or_finish(item, item.results[item.pending[0]].error)
+            else:
+                self._finish(item)
+
+    def _retry_or_finish(self, item, error):
+        """失敗的目標排入重試，超過重試次數時放棄"""
+        if item.attempts <= len(self.retry_delays):
+            delay = self.retry_delays[item.attempts - 1]
+            debug_print(f"發佈失敗，{delay} 秒後重試: {item.name}, 錯誤: {error}", color='light_yellow')
+            with self._condition:
+                item.due = time.monotonic() + delay
+                self._queue.append(item)
+                self._condition.notify()
+            item.attempted.set()
+        else:
+            debug_print(f"發佈失敗，已放棄: {item.name}, 錯誤: {error}", color='light_red')
+            self._finish(item)
+
+    def _finish(self, item):
+        """完成發佈：刪除暫存並通知"""
+        try:
+            os.remove(item.staged)
+        except OSError:
+            pass
+        with self._condition:
+            self._items.pop(item.name, None)
+        try:
+            if item.on_published:
+                item.on_published(item)
+        except Exception as e:
+            debug_print(f"發佈完成通知處理時發生錯誤: {str(e)}", color='light_red')
+        item.attempted.set()
+        item.done.set()
+
+    def flush(self, items=None, timeout=None):
+        """
+        等待工作至少發佈過一次（失敗的目標繼續在背景重試）
+        items: 要等待的工作，預設為目前所有工作
+        """
+        with self._condition:
+            items = list(self._items.values()) if items is None else list(items)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for item in items:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not item.attempted.wait(remaining):
+                return False
+        return True
+
+    def pending_count(self):
+        """尚未完成的工作數（含等待重試）"""
+        with self._condition:
+            return len(self._items)
+
+    def stop(self):
+        """停止背景發佈（執行中的批次完成後結束，等待重試的工作保留暫存，下次複製時重新提交）"""
+        with self._condition:
+            self._stopping = True
+            # 等待重試的工作不再處理，從工作表移除，之後同名檔案的提交會建立新的工作
+            for item in self._queue:
+                if item.attempts:
+                    self._items.pop(item.name, None)
+            self._queue = [item for item in self._queue if item.attempts == 0]
+            self._condition.notify()
+        self._thread.join()
+
+    @property
+    def is_stopped(self):
+        return self._stopping
+
+
+# 全域發佈器（暫存區與背景執行緒只有一份，重複啟動監控不會累積執行緒）
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_staged_publisher():
+    """取得全域發佈器（第一次使用或已停止時建立）"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None or _publisher.is_stopped:
+            _publisher = StagedPublisher()
+        return _publisher
@@ -0,0 +1,91 @@
+"""
+測試共用設定
+
+功能：
+- 將專案根目錄加入 sys.path
+- 非 Windows 環境下以假模組取代 pywin32 / pywinauto / pyautogui 等 Windows 專用套件
+- 每個測試使用獨立的資料目錄，並重設各模組的單例
+"""
+
+import importlib
+import os
+import sys
+import types
+from unittest import mock
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+WINDOWS_MODULES = (
+    'win32gui', 'win32con', 'win32api', 'win32file', 'win32process',
+    'win32event', 'pywintypes', 'pyautogui', 'keyboard',
+    'pywinauto', 'pywinauto.application',
+)
+
+
+class _FakeModule(types.ModuleType):
+    """任何屬性都回傳 MagicMock 的假模組"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = mock.MagicMock(name=f'{self.__name__}.{name}')
+        setattr(self, name, value)
+        return value
+
+
+for _name in WINDOWS_MODULES:
+    try:
+        importlib.import_module(_name)
+    except Exception:
+        sys.modules[_name] = _FakeModule(_name)
+
+# 各模組的單例：(模組, 屬性, 重設值)
+SINGLETONS = (
+    ('download_ledger', '_ledger', None),
+    ('exclusion_rules', '_rules', None),
+    ('folder_index', '_indexes', dict),
+    ('list_archive', '_archive', None),
+    ('list_snapshot', '_snapshots', dict),
+    ('match_history', '_history', None),
+    ('pdf_metadata', '_extractor', None),
+    ('refresh_detector', '_detector', None),
+    ('report_catalog', '_catalog', None),
+    ('report_metadata', '_cache', None),
+    ('staged_publisher', '_publisher', None),
+    ('wait_conditions', '_waiter', None),
+)
+
+DATA_PATHS = (
+    'FOLDER_INDEX_DB', 'LEDGER_DB', 'CATALOG_DB', 'MATCH_HISTORY_DB',
+    'LIST_ARCHIVE_DB', 'COPY_PROGRESS_DB', 'WAIT_STATS_FILE',
+)
+
+
+def _reset_singletons():
+    for module_name, attr, value in SINGLETONS:
+        module = sys.modules.get(module_name)
+        if module is not None and hasattr(module, attr):
+            setattr(module, attr, value() if callable(value) else value)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path, monkeypatch):
+    """將資料庫與暫存目錄導向 tmp_path"""
+    from config import Config
+
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    monkeypatch.setattr(Config, 'DATA_DIR', str(data_dir), raising=False)
+    for attr in DATA_PATHS:
+        if hasattr(Config, attr):
+            name = os.path.basename(getattr(Config, attr))
+            monkeypatch.setattr(Config, attr, str(data_dir / name))
+    if hasattr(Config, 'STAGING_DIR'):
+        monkeypatch.setattr(Config, 'STAGING_DIR', str(data_dir / 'staging'))
+    _reset_singletons()
+    yield data_dir
+    _reset_singletons()
@@ -0,0 +1,76 @@
+"""copy_engine 平行、可續傳複製測試"""
+
+import hashlib
+import os
+
+import pytest
+
+from copy_engine import CopyEngine, CopyJob, CopyProgress
+
+
+@pytest.fixture
+def source(tmp_path):
+    folder = tmp_path / 'source'
+    folder.mkdir()
+    for index in range(5):
+        (folder / f'{index}.pdf').write_bytes(bytes([index]) * (1000 + index))
+    return folder
+
+
+def _jobs(source, *targets):
+    return [CopyJob(str(path), [str(target) for target in targets]) for path in sorted(source.iterdir())]
+
+
+def test_copies_all_files_to_all_targets(source, tmp_path):
+    engine = CopyEngine(max_workers=4, progress=CopyProgress(str(tmp_path / 'progress.db')))
+    results = engine.run(_jobs(source, tmp_path / 't1', tmp_path / 't2'))
+    assert len(results) == 10
+    assert {result.status for result in results} == {'copied'}
+    for path in source.iterdir():
+        for target in ('t1', 't2'):
+            copied = tmp_path / target / path.name
+            assert copied.read_bytes() == path.read_bytes()
+            assert copied.stat().st_mtime == pytest.approx(path.stat().st_mtime)
+    assert not list((tmp_path / 't1').glob('*.part'))
+
+
+def test_resume_skips_completed_copies(source, tmp_path):
+    progress_db = str(tmp_path / 'progress.db')
+    CopyEngine(progress=CopyProgress(progress_db)).run(_jobs(source, tmp_path / 't1'))
+
+    # 中斷後重新執行：已完成的略過，來源變更或目標遺失的重新複製
+    (source / '0.pdf').write_bytes(b'changed')
+    os.remove(tmp_path / 't1' / '1.pdf')
+    results = CopyEngine(progress=CopyProgress(progress_db), verify_existing=False).run(_jobs(source, tmp_path / 't1'))
+    status = {os.path.basename(result.job.source): result.status for result in results}
+    assert status == {'0.pdf': 'copied', '1.pdf': 'copied', '2.pdf': 'skipped', '3.pdf': 'skipped', '4.pdf': 'skipped'}
+    assert (tmp_path / 't1' / '0.pdf').read_bytes() == b'changed'
+
+
+def test_existing_identical_target_is_skipped_without_progress(source, tmp_path):
+    CopyEngine(progress=False).run(_jobs(source, tmp_path / 't1'))
+    results = CopyEngine(progress=False).run(_jobs(source, tmp_path / 't1'))
+    assert {result.status for result in results} == {'skipped'}
+
+
+def test_missing_source_fails_every_target(tmp_path):
+    job = CopyJob(str(tmp_path / 'missing.pdf'), [str(tmp_path / 't1'), str(tmp_path / 't2')])
+    results = CopyEngine(progress=False).run([job])
+    assert [result.status for result in results] == ['failed', 'failed']
+
+
+def test_fan_out_reads_source_once_and_hashes_content(source, tmp_path):
+    path = source / '4.pdf'
+    results = CopyEngine(progress=False).run([CopyJob(str(path), [str(tmp_path / 't1'), str(tmp_path / 't2')])])
+    expected = hashlib.sha256(path.read_bytes()).hexdigest()
+    assert [result.sha256 for result in results] == [expected, expected]
+
+
+def test_fan_out_failed_target_does_not_stop_others(source, tmp_path):
+    blocked = tmp_path / 'blocked'
+    blocked.write_bytes(b'')  # 目標位置是檔案，無法寫入
+    path = source / '0.pdf'
+    results = CopyEngine(progress=False).run([CopyJob(str(path), [str(blocked), str(tmp_path / 't1')])])
+    status = {result.target_dir: result.status for result in results}
+    assert status == {str(blocked): 'failed', str(tmp_path / 't1'): 'copied'}
+    assert (tmp_path / 't1' / '0.pdf').read_bytes() == path.read_bytes()
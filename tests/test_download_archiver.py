@@ -0,0 +1,46 @@
+"""download_archiver 每日封存測試"""
+
+import pytest
+
+import download_archiver
+from config import Config
+from download_archiver import DownloadArchiver, should_keep, start_daily_archive
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """記錄 archive() 的呼叫（不實際移動檔案）"""
+    calls = []
+    monkeypatch.setattr(DownloadArchiver, 'archive', lambda self, *args, **kwargs: calls.append(self.folder_path) or 0)
+    return calls
+
+
+def test_archive_runs_at_most_once_per_day(tmp_path, runs):
+    archiver = DownloadArchiver(str(tmp_path))
+    assert archiver.last_run() is None
+    assert archiver.archive_if_due() == 0
+    assert archiver.archive_if_due() is None
+    archiver.close()
+    # 日期保存在資料庫，重新啟動後同一天不再封存
+    assert DownloadArchiver(str(tmp_path)).archive_if_due() is None
+    assert runs == [str(tmp_path)]
+
+
+def test_archive_disabled(tmp_path, runs, monkeypatch):
+    monkeypatch.setattr(Config, 'ARCHIVE_AFTER_DAYS', 0)
+    assert DownloadArchiver(str(tmp_path)).archive_if_due() is None
+    assert runs == []
+
+
+def test_start_daily_archive_runs_in_background(tmp_path, runs, monkeypatch):
+    monkeypatch.setattr(download_archiver, '_archive_thread', None)
+    thread = start_daily_archive(str(tmp_path))
+    thread.join(timeout=10)
+    start_daily_archive(str(tmp_path)).join(timeout=10)
+    assert runs == [str(tmp_path)]
+
+
+def test_should_keep_sync_metadata_and_partial_downloads():
+    assert should_keep('sync.ffs_db')
+    assert should_keep('report.pdf.crdownload')
+    assert not should_keep('report.pdf')
@@ -0,0 +1,75 @@
+"""download_ledger 下載紀錄測試"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from config import Config
+from download_ledger import DownloadLedger, date_to_horizon
+
+
+@pytest.fixture
+def ledger():
+    ledger = DownloadLedger()
+    yield ledger
+    ledger.close()
+
+
+def _db_status(ledger, report_name):
+    return ledger._conn.execute(
+        "SELECT status, clicked_at IS NOT NULL, file_name FROM downloads WHERE report_name = ?", (report_name,)
+    ).fetchall()
+
+
+def test_status_never_moves_backwards(ledger):
+    today = date(2024, 5, 2)
+    ledger.mark_landed('research', '元大_台積電_2330', today, '元大_台積電_2330.pdf')
+    assert ledger.mark_copied('元大_台積電_2330.pdf') == 1
+
+    # 重新點擊只更新點擊時間，狀態與檔名保持不變
+    ledger.mark_clicked('research', '元大_台積電_2330', today)
+    assert ledger.get_status('research', '元大_台積電_2330', today) == 'copied'
+    assert _db_status(ledger, '元大_台積電_2330') == [('copied', 1, '元大_台積電_2330.pdf')]
+
+    ledger.mark_clicked('research', '富邦_聯發科_2454', today)
+    ledger.mark_landed('research', '富邦_聯發科_2454', today, '富邦_聯發科_2454.pdf')
+    assert _db_status(ledger, '富邦_聯發科_2454') == [('landed', 1, '富邦_聯發科_2454.pdf')]
+
+
+def test_hot_set_is_reloaded_for_recent_and_undated_rows(ledger, monkeypatch):
+    monkeypatch.setattr(Config, 'LEDGER_HOT_DAYS', 7)
+    today = datetime.now().date()
+    ledger.mark_landed('research', '近期', today)
+    ledger.mark_landed('research', '未知日期', None)
+    ledger.mark_landed('research', '過期', today - timedelta(days=30))
+    ledger.close()
+
+    reopened = DownloadLedger()
+    try:
+        assert reopened.get_status('research', '近期', today) == 'landed'
+        assert reopened.get_status('research', '未知日期') == 'landed'
+        assert reopened.get_status('research', '過期', today - timedelta(days=30)) is None
+        # 熱集合以外的紀錄仍保存在資料庫
+        assert _db_status(reopened, '過期') == [('landed', 0, None)]
+    finally:
+        reopened.close()
+
+
+def test_is_done_without_date_uses_highest_status(ledger, monkeypatch):
+    monkeypatch.setattr(Config, 'LEDGER_SKIP_STATUS', 'landed')
+    ledger.mark_clicked('research', '元大_台積電_2330', date(2024, 5, 1))
+    ledger.mark_landed('research', '元大_台積電_2330', date(2024, 5, 2))
+
+    assert ledger.is_done('research', '元大_台積電_2330')
+    assert not ledger.is_done('research', '元大_台積電_2330', date(2024, 5, 1))
+    assert ledger.is_done('research', '元大_台積電_2330', date(2024, 5, 2))
+    assert not ledger.is_done('research', '元大_台積電_2330', min_status='copied')
+    assert not ledger.is_done('industry', '元大_台積電_2330')
+
+
+def test_date_to_horizon(monkeypatch):
+    monkeypatch.setattr(Config, 'HORIZON_DAYS', {'今日': 0, '昨日': 1})
+    today = date(2024, 5, 2)
+    assert date_to_horizon(date(2024, 5, 1), today) == '昨日'
+    assert date_to_horizon(date(2024, 4, 1), today) is None
+    assert date_to_horizon(None, today) is None
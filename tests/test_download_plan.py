@@ -0,0 +1,146 @@
+"""download_plan 下載計畫與下載政策測試"""
+
+import pytest
+
+import download_plan
+from config import Config
+from download_plan import DownloadPlan, DownloadPolicy
+from exclusion_rules import ExclusionRules
+from list_snapshot import ListItemRecord
+
+
+def _record(name, list_type='research', index=0):
+    return ListItemRecord(list_type, index, name, None, False)
+
+
+class FakeSnapshot:
+    def __init__(self, lists):
+        self.lists = lists
+
+    def items(self, list_type):
+        return [_record(name, list_type, index) for index, name in enumerate(self.lists.get(list_type, []))]
+
+
+@pytest.fixture
+def rules(tmp_path):
+    path = tmp_path / 'rules.txt'
+    path.write_text('_公司\n晨報\nETF\nKS\n', encoding='utf-8')
+    return ExclusionRules(str(path))
+
+
+def test_policy_skips_company_and_excluded_reports(rules):
+    policy = DownloadPolicy('今日', rules=rules, overrides={})
+    assert policy.skip_reason(_record('')) == '空白名稱'
+    assert policy.skip_reason(_record('元大_台積電_公司')) == '公司'
+    assert policy.skip_reason(_record('元大_ETF 觀察')) == '排除'
+    assert policy.skip_reason(_record('元大_2330_台積電')) is None
+
+
+def test_policy_does_not_count_rule_hits(rules):
+    policy = DownloadPolicy('今日', rules=rules, overrides={})
+    policy.skip_reason(_record('元大_ETF 觀察'))
+    assert rules.hits['ETF'] == 0
+    rules.match('元大_ETF 觀察.pdf')
+    assert rules.hits['ETF'] == 1
+
+
+def test_overrides_by_rule_text_and_report_type(rules):
+    overrides = {'今日': ['晨會'], '*': ['ETF']}
+    today = DownloadPolicy('今日', rules=rules, overrides=overrides)
+    assert today.skip_reason(_record('元大_晨報')) is None
+    assert today.is_overridden(_record('元大_晨報'))
+    assert today.skip_reason(_record('元大_ETF 觀察')) is None
+
+    week = DownloadPolicy('1週前', rules=rules, overrides=overrides)
+    assert week.skip_reason(_record('元大_晨報')) == '排除'
+    assert week.skip_reason(_record('元大_ETF 觀察')) is None
+
+
+def test_unknown_override_is_reported(rules, monkeypatch):
+    messages = []
+    monkeypatch.setattr(download_plan, 'debug_print', lambda msg, **kwargs: messages.append(msg))
+    DownloadPolicy('今日', rules=rules, overrides={'今日': ['晨會', '不存在']})
+    assert messages == ['下載例外「不存在」不是排除規則，也不是報告類型，不會生效']
+
+
+def test_excluded_items_are_logged_by_rule(rules, monkeypatch):
+    policy = DownloadPolicy('今日', rules=rules, overrides={})
+    for name in ('Asian Banks review', 'Stocks to watch', '元大_晨報'):
+        policy.skip_reason(_record(name))
+    messages = []
+    monkeypatch.setattr(download_plan, 'debug_print', lambda msg, **kwargs: messages.append(msg))
+    policy.log_excluded()
+    assert '   規則「KS」: 2 個' in messages
+    assert messages.index('   規則「KS」: 2 個') < messages.index('   規則「晨報」: 1 個')
+    assert '      Stocks to watch' in messages
+
+
+def test_policy_can_be_disabled(rules, monkeypatch):
+    monkeypatch.setattr(Config, 'EXCLUDE_BEFORE_DOWNLOAD', False)
+    policy = DownloadPolicy('今日', rules=rules, overrides={})
+    assert policy.skip_reason(_record('元大_ETF 觀察')) is None
+
+
+def test_plan_keeps_list_order_and_bounds():
+    snapshot = FakeSnapshot({'industry': ['i1'], 'morning': ['m1', 'm2'], 'research': ['r1', '略過', 'r2']})
+    plan = DownloadPlan.build(snapshot, lambda record: '排除' if record.name == '略過' else None)
+    assert [item.name for item in plan.items] == ['m1', 'm2', 'r1', 'r2', 'i1']
+    assert [item.position for item in plan.items] == [0, 1, 2, 3, 4]
+    assert plan.list_bounds == {'morning': (0, 1), 'research': (2, 3), 'industry': (4, 4)}
+    assert plan.count('research') == 2
+    assert [(record.name, reason) for record, reason in plan.skipped] == [('略過', '排除')]
+
+
+def test_failed_items_are_retried_with_backoff(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(download_plan.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(download_plan.time, 'sleep', lambda seconds: now.__setitem__(0, now[0] + seconds))
+    plan = DownloadPlan.build(FakeSnapshot({'research': ['a', 'b']}), max_attempts=2, backoff=1.0)
+
+    first = plan.next_item()
+    assert first.name == 'a'
+    assert plan.fail(first) is True
+    assert first.next_try_at == 101.0
+    assert plan.next_item().name == 'b'
+    # 計畫順序已走完，等待重試項目到期
+    assert plan.next_item() is first
+    assert now[0] == 101.0
+    assert plan.fail(first) is False
+    assert plan.failed == [first]
+    assert plan.next_item() is None
+    assert plan.pending_count() == 0
+
+
+def test_due_retry_is_taken_before_next_item(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(download_plan.time, 'monotonic', lambda: now[0])
+    plan = DownloadPlan.build(FakeSnapshot({'research': ['a', 'b', 'c']}), backoff=1.0)
+    first = plan.next_item()
+    plan.fail(first)
+    now[0] += 1.0
+    assert plan.next_item() is first
+    plan.complete(first)
+    assert plan.completed == [first]
+    assert plan.next_item().name == 'b'
+
+
+def test_late_landing_removes_item_from_retry_queue(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(download_plan.time, 'monotonic', lambda: now[0])
+    plan = DownloadPlan.build(FakeSnapshot({'research': ['a', 'b']}), backoff=1.0)
+    first = plan.next_item()
+    # 逾時重排後，原本的檔案才落地
+    assert plan.fail(first) is True
+    assert plan.pending_count() == 2
+    plan.complete(first)
+    assert plan.completed == [first]
+    assert plan.pending_count() == 1
+
+    # 較晚到達的失敗與重複完成都被忽略
+    assert plan.fail(first) is None
+    plan.complete(first)
+    assert plan.completed == [first]
+    now[0] += 10.0
+    assert plan.next_item().name == 'b'
+    assert plan.next_item() is None
+    assert plan.failed == []
@@ -0,0 +1,123 @@
+"""download_tracker 檔案落地追蹤測試"""
+
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from download_tracker import DownloadTracker
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    monkeypatch.setattr(Config, 'WATCH_DEBOUNCE', 0.05)
+    monkeypatch.setattr(Config, 'WATCH_POLL_INTERVAL', 0.05)
+    return folder
+
+
+@pytest.fixture
+def tracker(downloads):
+    tracker = DownloadTracker(str(downloads), land_timeout=30)
+    tracker.start()
+    yield tracker
+    tracker.stop()
+
+
+def _item(name):
+    return SimpleNamespace(name=name)
+
+
+def _write(folder, name, data=b'report'):
+    with open(os.path.join(folder, name), 'wb') as f:
+        f.write(data)
+
+
+def _poll_until(tracker, condition, timeout=3.0):
+    """持續 poll 直到條件成立，返回期間落地的項目"""
+    landed = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        landed.extend(tracker.poll())
+        if condition(landed):
+            return landed
+        time.sleep(0.02)
+    return landed
+
+
+def test_landed_file_matches_pending_key(tracker, downloads):
+    tracker.track(_item('元大_台積電_2330'))
+    other = tracker.track(_item('富邦_聯發科_2454'))
+
+    # 重複下載的 " (1)" 後綴不影響比對
+    _write(downloads, '元大_台積電_2330 (1).pdf')
+    landed = _poll_until(tracker, lambda landed: landed)
+
+    assert [d.name for d in landed] == ['元大_台積電_2330']
+    assert landed[0].state == 'landed'
+    assert landed[0].file_name == '元大_台積電_2330 (1).pdf'
+    assert other.state == 'clicked'
+    assert not tracker.all_settled()
+
+
+def test_existing_and_unrelated_files_do_not_land(downloads):
+    _write(downloads, '元大_台積電_2330.pdf')
+    tracker = DownloadTracker(str(downloads), land_timeout=30)
+    tracker.start()
+    try:
+        download = tracker.track(_item('元大_台積電_2330'))
+        _write(downloads, '凱基_鴻海_2317.pdf')
+        assert _poll_until(tracker, lambda landed: landed, timeout=0.5) == []
+        assert download.state == 'clicked'
+    finally:
+        tracker.stop()
+
+
+def test_temp_file_keeps_item_in_progress_until_renamed(downloads):
+    tracker = DownloadTracker(str(downloads), land_timeout=0)
+    tracker.start()
+    try:
+        download = tracker.track(_item('元大_台積電_2330'))
+        _write(downloads, '元大_台積電_2330.pdf.crdownload')
+        _poll_until(tracker, lambda landed: tracker._in_progress)
+
+        # 暫存檔存在時不視為逾時
+        assert tracker.take_overdue() == []
+        assert download.state == 'clicked'
+
+        os.rename(os.path.join(downloads, '元大_台積電_2330.pdf.crdownload'),
+                  os.path.join(downloads, '元大_台積電_2330.pdf'))
+        landed = _poll_until(tracker, lambda landed: landed)
+        assert landed == [download]
+        assert not tracker._in_progress
+        assert tracker.all_settled()
+    finally:
+        tracker.stop()
+
+
+def test_items_that_never_land_are_taken_as_overdue(downloads):
+    tracker = DownloadTracker(str(downloads), land_timeout=0.1)
+    waiting = tracker.track(_item('元大_台積電_2330'))
+    assert tracker.take_overdue() == []
+
+    time.sleep(0.15)
+    assert tracker.take_overdue() == [waiting]
+    assert waiting.state == 'lost'
+    assert tracker.all_settled()
+    assert tracker.take_overdue() == []
+
+
+def test_tabs_close_from_last_opened_until_unsettled(tracker, downloads):
+    first = tracker.track(_item('元大_台積電_2330'))
+    tracker.track(_item('富邦_聯發科_2454'))
+    assert tracker.closable_tab_count() == 0
+
+    _write(downloads, '富邦_聯發科_2454.pdf')
+    _poll_until(tracker, lambda landed: landed)
+    assert tracker.closable_tab_count() == 1
+    tracker.tabs_closed(1)
+    assert tracker.open_tab_count() == 1
+    assert first.state == 'clicked'
@@ -0,0 +1,71 @@
+"""exclusion_rules 排除規則測試"""
+
+import os
+
+import pytest
+
+from config import Config
+from exclusion_rules import ExclusionRules, KeywordAutomaton, Rule
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / 'rules.txt'
+    path.write_text('# 註解\n\n晨報\n"Asia "\nETF\nre:,jp(?!M)\n', encoding='utf-8')
+    return path
+
+
+def test_parse_rule_kinds():
+    assert ExclusionRules.parse(['# 註解', '', '晨報', '"Asia "', 're:JP(?!M)']) == [
+        Rule('晨報', 'keyword'), Rule('Asia ', 'keyword'), Rule('JP(?!M)', 'regex')]
+
+
+def test_automaton_returns_first_complete_keyword():
+    automaton = KeywordAutomaton([('she', 1), ('he', 2), ('hers', 3)])
+    assert automaton.search('ushers') == (4, 1)
+    assert automaton.search('ahe') == (3, 2)
+    assert automaton.search('xyz') is None
+
+
+def test_match_keywords_case_insensitive_and_regex(rules_file):
+    rules = ExclusionRules(str(rules_file))
+    assert rules.match('元大_台股晨報.pdf') == Rule('晨報', 'keyword')
+    assert rules.match('Asia Strategy.pdf') == Rule('Asia ', 'keyword')
+    assert rules.match('Asian banks.pdf') is None
+    assert rules.match('元大_etf 觀察.pdf') == Rule('ETF', 'keyword')
+    assert rules.match('Toyota,JP.pdf') == Rule(',jp(?!M)', 'regex')
+    assert rules.match('Toyota,JPM.pdf') is None
+
+
+def test_earliest_match_wins(rules_file):
+    rules = ExclusionRules(str(rules_file))
+    assert rules.match('ETF 晨報').text == 'ETF'
+    assert rules.match('晨報 ETF').text == '晨報'
+
+
+def test_hit_counts(rules_file):
+    rules = ExclusionRules(str(rules_file))
+    rules.match('晨報 1')
+    rules.match('晨報 2')
+    rules.match('晨報 3', count=False)
+    rules.match('一般報告')
+    assert rules.hits['晨報'] == 2
+    assert rules.hits['ETF'] == 0
+
+
+def test_reload_when_file_changes(rules_file, monkeypatch):
+    monkeypatch.setattr(Config, 'EXCLUDE_RULES_CHECK_INTERVAL', 0)
+    rules = ExclusionRules(str(rules_file))
+    assert rules.match('週報') is None
+    rules_file.write_text('週報\n', encoding='utf-8')
+    stat = os.stat(rules_file)
+    os.utime(rules_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert rules.match('週報') == Rule('週報', 'keyword')
+    assert rules.match('晨報') is None
+
+
+def test_invalid_regex_keeps_previous_rules(rules_file):
+    rules = ExclusionRules(str(rules_file))
+    rules_file.write_text('re:(\n', encoding='utf-8')
+    assert rules.reload() is False
+    assert rules.match('晨報') is not None
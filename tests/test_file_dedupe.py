@@ -0,0 +1,46 @@
+"""file_dedupe 重複檔案偵測測試"""
+
+import pytest
+
+from config import Config
+from file_dedupe import Deduplicator
+from folder_index import get_folder_index
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DEDUPE_SAMPLE_SIZE', 4)
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    (folder / '報告 (1).pdf').write_bytes(b'head-middle-tail')
+    (folder / '報告.pdf').write_bytes(b'head-middle-tail')
+    (folder / '同大小.pdf').write_bytes(b'head-MIDDLE-tail')  # 快速指紋相同，完整內容不同
+    (folder / '其他.pdf').write_bytes(b'other')
+    (folder / '空白1.pdf').write_bytes(b'')
+    (folder / '空白2.pdf').write_bytes(b'')
+    return folder
+
+
+def _names(folder):
+    return sorted(path.name for path in folder.iterdir())
+
+
+def test_find_duplicates_keeps_name_without_suffix(folder):
+    deduplicator = Deduplicator(str(folder))
+    assert deduplicator.find_duplicates(_names(folder)) == {'報告 (1).pdf': '報告.pdf'}
+
+
+def test_fingerprints_are_cached_in_folder_index(folder):
+    Deduplicator(str(folder)).find_duplicates(_names(folder))
+    index = get_folder_index(str(folder))
+    entry = index.get('同大小.pdf')
+    assert index.get_fingerprint(entry, 'quick') is not None
+    assert index.get_fingerprint(entry, 'full') is not None
+    assert index.get_fingerprint(index.get('其他.pdf'), 'quick') is None  # 大小唯一，不需讀檔
+
+
+def test_duplicate_of_published_file(folder):
+    deduplicator = Deduplicator(str(folder))
+    assert deduplicator.duplicate_of('報告 (1).pdf', {'報告.pdf', '其他.pdf'}) == '報告.pdf'
+    assert deduplicator.duplicate_of('同大小.pdf', {'報告.pdf'}) is None
+    assert deduplicator.duplicate_of('報告.pdf', {'報告.pdf'}) is None
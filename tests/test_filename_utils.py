@@ -0,0 +1,26 @@
+"""filename_utils 檔名共用規則測試"""
+
+from filename_utils import (has_duplicate_suffix, is_temp_file, normalize_filename,
+                            strip_duplicate_suffix, strip_temp_suffix)
+
+
+def test_temp_files():
+    assert is_temp_file('報告.pdf.crdownload')
+    assert is_temp_file('報告.PART')
+    assert not is_temp_file('報告.pdf')
+    assert strip_temp_suffix('報告.pdf.crdownload') == '報告.pdf'
+    assert strip_temp_suffix('報告.pdf') == '報告.pdf'
+
+
+def test_duplicate_suffix():
+    assert strip_duplicate_suffix('報告 (1).pdf', has_extension=True) == '報告.pdf'
+    assert strip_duplicate_suffix('報告(12)', has_extension=False) == '報告'
+    assert strip_duplicate_suffix('v1.5 (2)', has_extension=False) == 'v1.5'
+    assert strip_duplicate_suffix('報告 (1) 摘要.pdf', has_extension=True) == '報告 (1) 摘要.pdf'
+    assert has_duplicate_suffix('報告 (1).pdf')
+    assert not has_duplicate_suffix('報告.pdf')
+
+
+def test_normalize_filename():
+    assert normalize_filename('元大_台積電 2330-報告.pdf', has_extension=True) == '元大台積電2330報告'
+    assert normalize_filename('A.B_C') == 'ABC'
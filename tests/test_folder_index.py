@@ -0,0 +1,85 @@
+"""folder_index 資料夾索引測試"""
+
+import os
+from datetime import date
+
+import pytest
+
+from folder_index import FolderIndex, get_folder_index
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    (folder / 'a.pdf').write_bytes(b'a')
+    (folder / 'b.pdf').write_bytes(b'bb')
+    (folder / 'sub').mkdir()
+    return folder
+
+
+def test_refresh_indexes_files_only(folder, tmp_path):
+    index = FolderIndex(str(folder), str(tmp_path / 'index.db'))
+    assert index.refresh() == (2, 0)
+    assert len(index) == 2
+    assert index.get('b.pdf').size == 2
+    assert index.get('sub') is None
+    assert index.files_created_on(date.today()) == ['a.pdf', 'b.pdf']
+
+
+def test_refresh_detects_added_and_removed_files(folder, tmp_path):
+    index = FolderIndex(str(folder), str(tmp_path / 'index.db'))
+    index.refresh()
+    assert index.refresh() == (0, 0)  # 資料夾未變更時不重新走訪
+    (folder / 'a.pdf').unlink()
+    (folder / 'c.pdf').write_bytes(b'c')
+    assert index.refresh(force=True) == (1, 1)
+    assert index.get('a.pdf') is None
+    assert index.get('c.pdf') is not None
+
+
+def test_index_persists_between_instances(folder, tmp_path):
+    db_path = str(tmp_path / 'index.db')
+    index = FolderIndex(str(folder), db_path)
+    index.refresh()
+    entry = index.get('a.pdf')
+    index.set_fingerprint(entry, 'full', 'digest')
+    index.close()
+
+    reloaded = FolderIndex(str(folder), db_path)
+    assert reloaded.get('a.pdf') == entry
+    assert reloaded.get_fingerprint(entry, 'full') == 'digest'
+    # 沒有變更時不需要重新寫入
+    assert reloaded.refresh() == (0, 0)
+
+
+def test_fingerprint_invalidated_when_file_changes(folder, tmp_path):
+    index = FolderIndex(str(folder), str(tmp_path / 'index.db'))
+    index.refresh()
+    index.set_fingerprint(index.get('a.pdf'), 'quick', 'old')
+    (folder / 'a.pdf').write_bytes(b'changed')
+    entry = index.update_file('a.pdf')
+    assert entry.size == 7
+    assert index.get_fingerprint(entry, 'quick') is None
+
+
+def test_update_and_remove_single_files(folder, tmp_path):
+    index = FolderIndex(str(folder), str(tmp_path / 'index.db'))
+    index.refresh()
+    (folder / 'new.pdf').write_bytes(b'new')
+    assert index.update_file('new.pdf').name == 'new.pdf'
+    os.remove(folder / 'new.pdf')
+    assert index.update_file('new.pdf') is None
+    assert index.get('new.pdf') is None
+    index.remove_file('a.pdf')
+    assert index.select(lambda entry: True) == [index.get('b.pdf')]
+
+
+def test_shared_index_is_not_rescanned_on_lookup(folder):
+    index = get_folder_index(str(folder))
+    assert len(index) == 2
+    (folder / 'c.pdf').write_bytes(b'c')
+    assert get_folder_index(str(folder)) is index
+    assert index.get('c.pdf') is None  # 只有明確 refresh 或變更通知才更新
+    index.refresh()
+    assert index.get('c.pdf') is not None
@@ -0,0 +1,122 @@
+"""folder_monitor 複製結果與列表比對測試"""
+
+import threading
+import time
+
+import pytest
+
+import folder_monitor
+from config import Config
+from file_dedupe import Deduplicator
+from folder_monitor import FolderMonitor
+from pdf_metadata import PdfMetadata
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    monkeypatch.setattr(Config, 'COPY_EXTRA_TARGETS', [])
+    monkeypatch.setattr(Config, 'PUBLISH_RETRY_DELAYS', [])
+    monitor = FolderMonitor(str(downloads))
+    monitor.target_path = str(tmp_path / 'target')
+    monitor.daily_report_base_path = str(tmp_path / 'daily')
+    yield monitor
+    monitor.stop_publishing()
+    if monitor.publisher is not None:
+        monitor.publisher.stop()
+
+
+def _messages(monkeypatch):
+    messages = []
+    monkeypatch.setattr(folder_monitor, 'debug_print', lambda msg, **kwargs: messages.append(msg))
+    return messages
+
+
+def test_copy_today_files_lists_only_successful_files(monitor, monkeypatch):
+    with open(f'{monitor.folder_path}/元大_台積電_2330.pdf', 'wb') as f:
+        f.write(b'report')
+    messages = _messages(monkeypatch)
+    monitor.copy_today_files()
+    assert '已複製: 元大_台積電_2330.pdf' in messages
+    assert '   複製成功: 1 個' in messages
+
+
+def test_copy_today_files_reports_failed_targets(monitor, monkeypatch, tmp_path):
+    with open(f'{monitor.folder_path}/元大_台積電_2330.pdf', 'wb') as f:
+        f.write(b'report')
+    # 目標位置是檔案，無法建立資料夾，複製必定失敗
+    (tmp_path / 'blocked').write_bytes(b'')
+    monitor.target_path = str(tmp_path / 'blocked')
+    messages = _messages(monkeypatch)
+    monitor.copy_today_files()
+    assert not any(message.startswith('已複製') for message in messages)
+    assert '複製失敗: 元大_台積電_2330.pdf' in messages
+    assert '   複製成功: 0 個' in messages
+
+
+def test_concurrent_duplicates_are_published_once(monitor, monkeypatch):
+    for name in ('元大_2330.pdf', '元大_2330 (1).pdf'):
+        with open(f'{monitor.folder_path}/{name}', 'wb') as f:
+            f.write(b'same content')
+    original = Deduplicator.duplicate_of
+
+    def slow_duplicate_of(self, name, published):
+        time.sleep(0.05)  # 放大兩個執行緒同時檢查的時間窗
+        return original(self, name, published)
+
+    monkeypatch.setattr(Deduplicator, 'duplicate_of', slow_duplicate_of)
+    submitted = []
+    publisher = monitor.get_publisher()
+    monkeypatch.setattr(publisher, 'submit', lambda source, *args, **kwargs: submitted.append(source))
+
+    threads = [threading.Thread(target=monitor._publish_file, args=(name,))
+               for name in ('元大_2330.pdf', '元大_2330 (1).pdf')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(submitted) == 1
+    assert len(monitor.published_files) == 1
+
+
+class FakeExtractor:
+    """已解析完成的 PDF 中繼資料；記錄 wait 是否在呼叫端執行緒執行"""
+
+    def __init__(self, titles):
+        self.titles = titles
+        self.wait_threads = []
+        self.waited = threading.Event()
+
+    def submit_many(self, folder, names, on_extracted=None):
+        return []
+
+    def get(self, folder, name):
+        title = self.titles.get(name)
+        return PdfMetadata(None, title, None, None, 1, None, None, '') if title else None
+
+    def wait(self, folder, names, timeout=None):
+        self.wait_threads.append(threading.current_thread())
+        self.waited.set()
+        return {}
+
+    def shutdown(self):
+        pass
+
+
+def test_list_analysis_uses_parsed_pdf_titles_without_waiting(monitor, monkeypatch):
+    for name in ('元大_台積電_2330.pdf', 'download_8812.pdf', 'download_8813.pdf'):
+        with open(f'{monitor.folder_path}/{name}', 'wb') as f:
+            f.write(b'report')
+    extractor = FakeExtractor({'download_8812.pdf': '富邦_聯發科_2454'})
+    monitor.pdf_extractor = extractor
+    _messages(monkeypatch)
+
+    results = monitor.analyze_new_files_with_lists({'今日': ['元大_台積電_2330', '富邦_聯發科_2454']})
+    assert results['元大_台積電_2330.pdf'] == ['今日']
+    assert results['download_8812.pdf'] == ['今日']
+    assert results['download_8813.pdf'] == []
+
+    # 未監控時只在背景等待解析完成
+    assert extractor.waited.wait(2.0)
+    assert threading.current_thread() not in extractor.wait_threads
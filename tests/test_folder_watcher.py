@@ -0,0 +1,120 @@
+"""folder_watcher 資料夾變更監看測試"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import folder_watcher
+from config import Config
+from folder_watcher import FolderWatcher, _InotifyBackend, _PollingBackend
+
+BACKENDS = [
+    pytest.param(_InotifyBackend, marks=pytest.mark.skipif(not sys.platform.startswith('linux'),
+                                                          reason='inotify 只在 Linux 可用')),
+    _PollingBackend,
+]
+
+
+class Recorder:
+    """記錄監看器的通知"""
+
+    def __init__(self):
+        self.events = []
+        self._changed = threading.Condition()
+
+    def callback(self, kind):
+        def record(*args):
+            with self._changed:
+                self.events.append((kind, *args))
+                self._changed.notify_all()
+        return record
+
+    def wait_for(self, event, timeout=3.0):
+        with self._changed:
+            return self._changed.wait_for(lambda: event in self.events, timeout)
+
+
+@pytest.fixture(params=BACKENDS)
+def watch(request, tmp_path, monkeypatch):
+    """以指定後端監看 tmp_path/downloads，返回 (資料夾, 記錄器)"""
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    monkeypatch.setattr(Config, 'WATCH_POLL_INTERVAL', 0.05)
+    monkeypatch.setattr(folder_watcher, '_create_backend', request.param)
+    recorder = Recorder()
+    watcher = FolderWatcher(
+        str(folder),
+        on_new_file=recorder.callback('new'),
+        on_removed=recorder.callback('removed'),
+        on_overflow=recorder.callback('overflow'),
+        on_temp_file=recorder.callback('temp'),
+        debounce=0.2,
+    )
+    watcher.start()
+    assert watcher.backend_name == request.param.__name__
+    yield folder, recorder
+    watcher.stop()
+
+
+def _write(path, data=b'report'):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_created_file_is_reported(watch):
+    folder, recorder = watch
+    _write(folder / '元大_台積電_2330.pdf')
+    assert recorder.wait_for(('new', '元大_台積電_2330.pdf'))
+
+
+def test_temp_file_is_reported_after_rename(watch):
+    folder, recorder = watch
+    _write(folder / '元大_台積電_2330.pdf.crdownload')
+    assert recorder.wait_for(('temp', '元大_台積電_2330.pdf.crdownload'))
+
+    os.rename(folder / '元大_台積電_2330.pdf.crdownload', folder / '元大_台積電_2330.pdf')
+    assert recorder.wait_for(('new', '元大_台積電_2330.pdf'))
+    assert recorder.wait_for(('removed', '元大_台積電_2330.pdf.crdownload'))
+    assert ('new', '元大_台積電_2330.pdf.crdownload') not in recorder.events
+
+
+def test_file_moved_in_is_reported(watch, tmp_path):
+    folder, recorder = watch
+    _write(tmp_path / '富邦_聯發科_2454.pdf')
+    os.rename(tmp_path / '富邦_聯發科_2454.pdf', folder / '富邦_聯發科_2454.pdf')
+    assert recorder.wait_for(('new', '富邦_聯發科_2454.pdf'))
+
+
+def test_deleted_file_is_reported(watch):
+    folder, recorder = watch
+    _write(folder / '元大_台積電_2330.pdf')
+    assert recorder.wait_for(('new', '元大_台積電_2330.pdf'))
+    os.remove(folder / '元大_台積電_2330.pdf')
+    assert recorder.wait_for(('removed', '元大_台積電_2330.pdf'))
+
+
+def test_writes_are_debounced_into_one_notification(watch):
+    folder, recorder = watch
+    path = folder / '元大_台積電_2330.pdf'
+    started = time.monotonic()
+    with open(path, 'wb') as f:
+        for _ in range(5):
+            f.write(b'chunk')
+            f.flush()
+            time.sleep(0.06)
+    assert recorder.wait_for(('new', '元大_台積電_2330.pdf'))
+    # 寫入期間不通知，最後一次寫入靜止後才通知一次
+    assert time.monotonic() - started >= 0.3
+    time.sleep(0.3)
+    assert recorder.events.count(('new', '元大_台積電_2330.pdf')) == 1
+
+
+def test_file_removed_before_settling_is_not_reported(watch):
+    folder, recorder = watch
+    _write(folder / '元大_台積電_2330.pdf')
+    os.remove(folder / '元大_台積電_2330.pdf')
+    time.sleep(0.5)
+    assert ('new', '元大_台積電_2330.pdf') not in recorder.events
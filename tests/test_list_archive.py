@@ -0,0 +1,56 @@
+"""list_archive 列表封存測試"""
+
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import list_archive
+from list_archive import ListArchive
+
+LISTS = {'morning': ['晨會 A'], 'research': ['元大_2330_台積電', '凱基_2454_聯發科'], 'industry': []}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ListArchive(str(tmp_path / 'archive.db'))
+
+
+def test_save_and_load_roundtrip(archive):
+    day = date(2024, 10, 15)
+    assert archive.save(day, LISTS) is True
+    loaded = archive.load(day)
+    assert loaded.lists == LISTS
+    assert loaded.date == day
+    assert archive.load(date(2024, 10, 16)) is None
+
+
+def test_unchanged_lists_only_update_collection_time(archive, monkeypatch):
+    day = date(2024, 10, 15)
+    archive.save(day, LISTS)
+    first = archive.load(day)
+    monkeypatch.setattr(list_archive.time, 'time', lambda: first.collected_at + 60)
+    assert archive.save(day, LISTS) is False
+    second = archive.load(day)
+    assert second.fingerprint == first.fingerprint
+    assert second.collected_at == first.collected_at + 60
+    assert archive.save(day, dict(LISTS, industry=['新報告'])) is True
+
+
+def test_load_fresh_requires_collection_after_the_day(archive):
+    today = date.today()
+    archive.save(today, LISTS)
+    assert archive.load_fresh(today) is None  # 當日收集的列表可能仍會增加
+
+    yesterday = today - timedelta(days=1)
+    archive.save(yesterday, LISTS)
+    assert archive.load_fresh(yesterday).lists == LISTS
+
+
+def test_load_fresh_rejects_old_collections(archive, monkeypatch):
+    day = date.today() - timedelta(days=30)
+    with monkeypatch.context() as patch:
+        patch.setattr(list_archive.time, 'time', lambda: time.mktime((day + timedelta(days=1)).timetuple()))
+        archive.save(day, LISTS)
+    assert archive.load_fresh(day, max_age_days=14) is None
+    assert archive.load_fresh(day, max_age_days=60) is not None
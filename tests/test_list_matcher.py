@@ -0,0 +1,45 @@
+"""list_matcher 列表比對測試"""
+
+from list_matcher import ListMatcher, _ngrams
+
+
+def _matcher():
+    return ListMatcher.from_lists({
+        '今日': ['元大_2330_台積電法說會', '凱基_2454_聯發科'],
+        '昨日': ['元大_2330_台積電法說會', '富邦_2317_鴻海'],
+        '1週前': ['', '國泰_2881_富邦金'],
+    })
+
+
+def test_ngrams():
+    assert _ngrams('abcd', 2) == {'ab', 'bc', 'cd'}
+    assert _ngrams('ab', 3) == {'ab'}
+    assert _ngrams('', 2) == set()
+
+
+def test_exact_match_returns_all_horizons():
+    matcher = _matcher()
+    assert len(matcher) == 4
+    assert matcher.match('元大_2330_台積電法說會.pdf') == ['今日', '昨日']
+    assert matcher.match('元大_2330_台積電法說會 (1).pdf') == ['今日', '昨日']
+    assert matcher.match('國泰 2881 富邦金.pdf') == ['1週前']
+    assert matcher.match('不存在.pdf') == []
+
+
+def test_list_names_match_without_extension():
+    assert _matcher().match('凱基_2454_聯發科', has_extension=False) == ['今日']
+
+
+def test_nearest_ranks_similar_names():
+    matcher = _matcher()
+    near = matcher.nearest('元大_2330_台積電法說會摘要.pdf', threshold=0.5)
+    assert near[0].name == '元大_2330_台積電法說會'
+    assert near[0].horizons == ['今日', '昨日']
+    assert 0.5 <= near[0].score < 1
+    assert matcher.nearest('完全無關的檔名.pdf', threshold=0.5) == []
+
+
+def test_add_list_with_new_horizon():
+    matcher = _matcher()
+    matcher.add_list('2週前', ['凱基_2454_聯發科'])
+    assert matcher.match('凱基_2454_聯發科.pdf') == ['今日', '2週前']
@@ -0,0 +1,55 @@
+"""match_history 匹配歷史與命中率測試"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from match_history import MatchHistory
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def history(tmp_path):
+    return MatchHistory(str(tmp_path / 'history.db'))
+
+
+def test_hit_rates_and_exclusive_hits(history):
+    history.record_run(TODAY, {
+        '元大_2330_1131015_台積電.pdf': ['今日', '昨日'],
+        '凱基_2454_聯發科.pdf': ['昨日'],
+        '富邦_2317_鴻海.pdf': [],
+        '國泰_2881_富邦金.pdf': ['今日'],
+    }, list_sizes={'今日': 10, '昨日': 20})
+    rates = history.hit_rates(days=1)
+    assert list(rates) == ['今日', '昨日']
+    assert rates['今日']['hits'] == 2
+    assert rates['今日']['exclusive'] == 1
+    assert rates['今日']['rate'] == 0.5
+    assert rates['昨日']['exclusive_rate'] == 0.25
+    assert rates['昨日']['list_size'] == 20
+
+
+def test_rerun_on_same_day_replaces_results(history):
+    history.record_run(TODAY, {'a.pdf': ['今日']}, list_sizes={'今日': 1})
+    history.record_run(TODAY, {'a.pdf': [], 'b.pdf': ['今日']}, list_sizes={'今日': 1})
+    stats = history.hit_rates(days=1)['今日']
+    assert (stats['runs'], stats['files'], stats['hits']) == (1, 2, 1)
+
+
+def test_horizons_not_collected_are_not_counted(history):
+    history.record_run(TODAY, {'a.pdf': ['今日']}, list_sizes={'今日': 1})
+    assert '1週前' not in history.hit_rates(days=1)
+
+
+def test_trends_compare_with_previous_period(history):
+    history.record_run(TODAY - timedelta(days=10), {'a.pdf': [], 'b.pdf': ['今日']}, list_sizes={'今日': 1})
+    history.record_run(TODAY, {'a.pdf': ['今日']}, list_sizes={'今日': 1})
+    assert history.trends(days=7) == {'今日': (1.0, 0.5)}
+
+
+def test_broker_latency_uses_report_date(history):
+    report_day = TODAY - timedelta(days=2)
+    roc = f"{report_day.year - 1911}{report_day.month:02d}{report_day.day:02d}"
+    history.record_run(TODAY, {f'元大_2330_{roc}_台積電.pdf': ['今日'], '未知格式.pdf': []}, list_sizes={'今日': 1})
+    assert history.broker_latency(days=1) == [('元大', 1, 2.0, 2.0, 2.0)]
@@ -0,0 +1,139 @@
+"""pdf_metadata 解析器測試（測試用 PDF 於測試中產生）"""
+
+import zlib
+
+import pytest
+
+import pdf_metadata
+from pdf_metadata import Name, Ref, extract_pdf_metadata, extract_text, parse_value
+
+
+def _write_classic(path, title):
+    """傳統 xref 表、UTF-16 標題、FlateDecode 內容"""
+    content = zlib.compress(
+        b"BT /F1 12 Tf 72 720 Td (Yuanta Research) Tj 0 -20 Td [(TSMC )-50(\\(2330 TT\\))] TJ ET")
+    title_hex = (b'\xfe\xff' + title.encode('utf-16-be')).hex().encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 7 >>",
+        b"<< /Type /Page /Parent 2 0 R /Contents 4 0 R >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Title <" + title_hex + b"> /Author (KGI Securities) /CreationDate (D:20241015093000+08'00') >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def _write_xref_stream(path):
+    """xref 串流（PNG Up 預測器）+ 物件串流"""
+    content = zlib.compress(b"BT 72 720 Td (Ticker: 2454) Tj ET")
+    inner = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [3 0 R] /Count 3 >>",
+        3: b"<< /Type /Page /Parent 2 0 R /Contents 4 0 R >>",
+        6: b"<< /Title (Microsoft Word - MediaTek note.docx) >>",
+    }
+    body = b""
+    header = []
+    for number, obj in inner.items():
+        header.append(b"%d %d" % (number, len(body)))
+        body += obj + b" "
+    header = b" ".join(header) + b" "
+    object_stream = zlib.compress(header + body)
+
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = {4: len(out)}
+    out += b"4 0 obj\n<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream\nendobj\n"
+    offsets[5] = len(out)
+    out += (b"5 0 obj\n<< /Type /ObjStm /N 4 /First %d /Length %d /Filter /FlateDecode >>\nstream\n"
+            % (len(header), len(object_stream)) + object_stream + b"\nendstream\nendobj\n")
+    offsets[7] = len(out)
+
+    rows = [(0, 0, 255)]
+    for number in range(1, 8):
+        if number in inner:
+            rows.append((2, 5, list(inner).index(number)))
+        else:
+            rows.append((1, offsets[number], 0))
+    raw = bytearray()
+    previous = bytes(5)
+    for kind, field, extra in rows:
+        row = bytes([kind]) + field.to_bytes(3, 'big') + bytes([extra])
+        raw += b'\x02' + bytes((a - b) & 0xff for a, b in zip(row, previous))
+        previous = row
+    data = zlib.compress(bytes(raw))
+    out += (b"7 0 obj\n<< /Type /XRef /Size 8 /W [1 3 1] /Root 1 0 R /Info 6 0 R /Filter /FlateDecode "
+            b"/DecodeParms << /Columns 5 /Predictor 12 >> /Length %d >>\nstream\n" % len(data)
+            + data + b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % offsets[7])
+    path.write_bytes(bytes(out))
+    return path
+
+
+def test_parse_value_basic_types():
+    value, _ = parse_value(b"<< /Type /Page /Kids [3 0 R 4 0 R] /Count 2 /Title (a\\(b\\)) >>")
+    assert value[Name('Type')] == 'Page'
+    assert value[Name('Kids')] == [Ref(3, 0), Ref(4, 0)]
+    assert value[Name('Count')] == 2
+    assert value[Name('Title')] == b'a(b)'
+
+
+def test_classic_xref(tmp_path):
+    metadata = extract_pdf_metadata(str(_write_classic(tmp_path / 'a.pdf', '元大投顧_台積電_2330 報告')))
+    assert metadata['error'] is None
+    assert metadata['title'] == '元大投顧_台積電_2330 報告'
+    assert metadata['author'] == 'KGI Securities'
+    assert metadata['created'] == '2024-10-15'
+    assert metadata['pages'] == 7
+    assert metadata['broker'] == '元大'
+    assert metadata['ticker'] == '2330'
+    assert 'Yuanta Research' in metadata['text']
+
+
+def test_xref_stream_and_object_stream(tmp_path):
+    metadata = extract_pdf_metadata(str(_write_xref_stream(tmp_path / 'b.pdf')))
+    assert metadata['error'] is None
+    assert metadata['title'] == 'MediaTek note'
+    assert metadata['pages'] == 3
+    assert metadata['ticker'] == '2454'
+
+
+def test_corrupt_file_reports_error(tmp_path):
+    path = tmp_path / 'c.pdf'
+    path.write_bytes(b"%PDF-1.4\ngarbage 1 0 obj << /Type /Catalog >> endobj")
+    metadata = extract_pdf_metadata(str(path))
+    assert metadata['error']
+    assert metadata['title'] is None
+    assert metadata['pages'] is None
+    assert metadata['sha256']
+
+
+def test_cid_font_text_is_not_decoded():
+    # 已知限制：CID 字型（Identity-H 兩位元組編碼）需 ToUnicode 對照表，不解析
+    assert extract_text(b"BT <00410042> Tj ET") == ''
+    assert extract_text(b"BT (Plain) Tj ET") == 'Plain'
+
+
+def test_extractor_caches_by_content(tmp_path):
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    _write_classic(folder / 'a.pdf', '元大投顧_台積電_2330 報告')
+    extractor = pdf_metadata.PdfMetadataExtractor(max_workers=1)
+    try:
+        assert extractor.submit(str(folder), 'note.txt') is None
+        result = extractor.submit(str(folder), 'a.pdf').result(timeout=30)
+        assert result.ticker == '2330'
+        assert result.pages == 7
+        assert extractor.cached(result.sha256) == result
+        assert extractor.get(str(folder), 'a.pdf') == result
+    finally:
+        extractor.close()
@@ -0,0 +1,58 @@
+"""refresh_detector 事件合併測試"""
+
+import pytest
+
+import refresh_detector
+from config import Config
+from refresh_detector import RefreshDetector, compute_fingerprint
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(refresh_detector.time, 'monotonic', clock)
+    monkeypatch.setattr(Config, 'REFRESH_DEBOUNCE', 0.3)
+    monkeypatch.setattr(Config, 'REFRESH_DEBOUNCE_MAX_WAIT', 1.0)
+    return clock
+
+
+def test_fingerprint_separates_names():
+    assert compute_fingerprint(['ab', 'c']) != compute_fingerprint(['a', 'bc'])
+    assert compute_fingerprint(['a', 'b']).count == 2
+
+
+def test_events_are_merged_until_quiet(clock):
+    detector = RefreshDetector(hwnd=1)
+    detector.notify('research', 'structure')
+    clock.now += 0.2
+    detector.notify('research', 'property')
+    due, wait = detector._take_due_events()
+    assert due == []
+    assert wait == pytest.approx(0.3)
+    clock.now += 0.3
+    due, _ = detector._take_due_events()
+    assert due == [('research', 'property')]
+
+
+def test_continuous_events_are_checked_after_max_wait(clock):
+    detector = RefreshDetector(hwnd=1)
+    detector.notify('research', 'structure')
+    for _ in range(4):
+        clock.now += 0.2
+        detector.notify('research', 'structure')
+        assert detector._take_due_events()[0] == []
+    # 事件仍持續，但距第一個事件已達最長等待時間
+    clock.now += 0.2
+    detector.notify('research', 'structure')
+    assert detector._take_due_events()[0] == [('research', 'structure')]
+    # 到期後重新開始計算
+    detector.notify('research', 'structure')
+    assert detector._take_due_events()[0] == []
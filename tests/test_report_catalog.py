@@ -0,0 +1,110 @@
+"""report_catalog 報告目錄測試"""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from pdf_metadata import PdfMetadata
+from report_catalog import ReportCatalog, rebuild_from_folder_index
+
+
+@pytest.fixture
+def catalog():
+    catalog = ReportCatalog()
+    yield catalog
+    catalog.close()
+
+
+def _pdf(title, pages=12, broker=None, ticker=None):
+    return PdfMetadata(None, title, None, None, pages, broker, ticker, '')
+
+
+def _names(entries):
+    return sorted(entry.name for entry in entries)
+
+
+def test_trigram_search_matches_cjk_substrings(catalog):
+    if not catalog.has_fts:
+        pytest.skip('SQLite 不支援 FTS5 trigram')
+    catalog.add_many([
+        ('/downloads', '元大_台積電_2330_1130502.pdf', 'download', 100, time.time()),
+        ('/downloads', '富邦_半導體產業展望_1130501.pdf', 'download', 100, time.time()),
+        ('/target', '元大_台積電_2330_1130502.pdf', 'target', 100, time.time()),
+    ])
+
+    # 字串片段（不在詞首）也能找到
+    assert _names(catalog.search('導體產業')) == ['富邦_半導體產業展望_1130501.pdf']
+    assert _names(catalog.search('台積電 2330')) == ['元大_台積電_2330_1130502.pdf'] * 2
+    # 少於三個字的關鍵字改用 LIKE
+    assert _names(catalog.search('積電', location='target')) == ['元大_台積電_2330_1130502.pdf']
+    assert catalog.search('聯發科') == []
+
+    entry = catalog.search('台積電', location='download')[0]
+    assert (entry.broker, entry.ticker, entry.report_type) == ('元大', '2330', '個股')
+    assert entry.report_date == '2024-05-02'
+
+
+def test_set_pdf_metadata_updates_all_copies(catalog):
+    catalog.add('/downloads', '半導體產業展望2024.pdf', 'download', 100, time.time())
+    catalog.add('/target', '半導體產業展望2024.pdf', 'target', 100, time.time())
+    catalog.set_pdf_metadata('半導體產業展望2024.pdf', _pdf('AI 伺服器供應鏈', pages=8, broker='凱基', ticker='2382'))
+
+    entries = catalog.search('伺服器供應鏈')
+    assert len(entries) == 2
+    assert {(e.pdf_title, e.pages, e.broker, e.ticker) for e in entries} == {('AI 伺服器供應鏈', 8, '凱基', '2382')}
+
+    # 檔名已解析出的券商與代號不被 PDF 內容覆蓋
+    catalog.add('/downloads', '元大_台積電_2330.pdf', 'download', 100, time.time())
+    catalog.set_pdf_metadata('元大_台積電_2330.pdf', _pdf('先進製程', broker='凱基', ticker='2382'))
+    entry = catalog.search('先進製程')[0]
+    assert (entry.broker, entry.ticker) == ('元大', '2330')
+
+
+def test_remove_drops_only_that_path(catalog):
+    catalog.add('/downloads', '元大_台積電_2330.pdf', 'download', 100, time.time())
+    catalog.add('/target', '元大_台積電_2330.pdf', 'target', 100, time.time())
+    catalog.remove('/downloads', '元大_台積電_2330.pdf')
+
+    assert len(catalog) == 1
+    assert [entry.location for entry in catalog.search('台積電')] == ['target']
+
+
+def test_rebuild_from_folder_index(catalog, tmp_path):
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    for name in ('元大_台積電_2330.pdf', '富邦_聯發科_2454.pdf', 'sync.ffs_db'):
+        (downloads / name).write_bytes(b'report')
+
+    assert rebuild_from_folder_index(catalog, str(downloads)) == 2
+    assert len(catalog) == 2
+    assert _names(catalog.search(location='download')) == ['元大_台積電_2330.pdf', '富邦_聯發科_2454.pdf']
+    # 再次補齊不會重複新增
+    assert rebuild_from_folder_index(catalog, str(downloads)) == 2
+    assert len(catalog) == 2
+
+
+def test_old_database_gets_pdf_columns_and_rebuilt_index(tmp_path):
+    db_path = str(tmp_path / 'old_catalog.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE reports (
+            id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, folder TEXT NOT NULL, name TEXT NOT NULL,
+            location TEXT NOT NULL, broker TEXT, ticker TEXT, report_date TEXT, report_type TEXT, title TEXT,
+            day TEXT, size INTEGER, mtime REAL, added_at REAL NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO reports (path, folder, name, location, day, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                 (os.path.join('/downloads', '元大_台積電_2330.pdf'), '/downloads', '元大_台積電_2330.pdf',
+                  'download', '2024-05-02', time.time()))
+    conn.commit()
+    conn.close()
+
+    catalog = ReportCatalog(db_path)
+    try:
+        if not catalog.has_fts:
+            pytest.skip('SQLite 不支援 FTS5 trigram')
+        assert _names(catalog.search('台積電')) == ['元大_台積電_2330.pdf']
+    finally:
+        catalog.close()
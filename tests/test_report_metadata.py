@@ -0,0 +1,83 @@
+"""report_metadata 報告名稱解析與快取測試"""
+
+import sqlite3
+from datetime import date
+
+import report_metadata
+from report_metadata import MetadataCache, parse_report_name, roc_to_date
+
+
+def test_roc_to_date():
+    assert roc_to_date('1131015') == date(2024, 10, 15)
+    assert roc_to_date('1000101') == date(2011, 1, 1)
+    assert roc_to_date('1130231') is None  # 不存在的日期
+    assert roc_to_date('2024101') is None
+    assert roc_to_date('113101') is None
+
+
+def test_parse_list_name():
+    record = parse_report_name('元大_2330_1131015_台積電 法說會')
+    assert record.broker == '元大'
+    assert record.ticker == '2330'
+    assert record.report_date == date(2024, 10, 15)
+    assert record.report_type == '個股'
+    assert record.title == '台積電 法說會'
+
+
+def test_parse_filename_strips_extension_and_duplicate_suffix():
+    record = parse_report_name('元大_2330_1131015_台積電 (1).pdf', has_extension=True)
+    assert record.key == parse_report_name('元大_2330_1131015_台積電').key
+    assert record.title == '台積電'
+
+
+def test_report_types():
+    assert parse_report_name('元大_台積電_公司').report_type == '公司'
+    assert parse_report_name('凱基_台股晨報').report_type == '晨會'
+    assert parse_report_name('凱基_Weekly Outlook').report_type == '定期'
+    assert parse_report_name('凱基_半導體產業').report_type == '產業'
+    assert parse_report_name('凱基_雜談').report_type == '其他'
+    assert parse_report_name('Nomura_7203.JP_Toyota').ticker == '7203.JP'
+
+
+def test_cache_persists_records(tmp_path):
+    db_path = str(tmp_path / 'index.db')
+    cache = MetadataCache(db_path)
+    record = cache.get('元大_2330_1131015_台積電')
+    cache.save()
+    assert MetadataCache(db_path).get('元大_2330_1131015_台積電') == record
+
+
+def test_cache_reparses_records_from_other_parser_versions(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'index.db')
+    cache = MetadataCache(db_path)
+    cache.get('元大_2330_1131015_台積電')
+    cache.save()
+    # 舊規則解析的紀錄（標題錯誤）
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE report_metadata SET title = '舊標題'")
+    conn.commit()
+
+    assert MetadataCache(db_path).get('元大_2330_1131015_台積電').title == '舊標題'
+
+    monkeypatch.setattr(report_metadata, 'PARSER_VERSION', report_metadata.PARSER_VERSION + 1)
+    assert MetadataCache(db_path).get('元大_2330_1131015_台積電').title == '台積電'
+    assert conn.execute("SELECT title, parser_version FROM report_metadata").fetchall() == [
+        ('台積電', report_metadata.PARSER_VERSION)]
+    conn.close()
+
+
+def test_cache_upgrades_database_without_parser_version(tmp_path):
+    db_path = str(tmp_path / 'index.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE report_metadata (
+            name TEXT NOT NULL, has_extension INTEGER NOT NULL, broker TEXT, ticker TEXT, report_date TEXT,
+            report_type TEXT NOT NULL, title TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (name, has_extension)
+        )
+    """)
+    conn.execute("INSERT INTO report_metadata VALUES ('元大_2330_1131015_台積電', 0, NULL, NULL, NULL, '其他', '', '')")
+    conn.commit()
+    conn.close()
+
+    record = MetadataCache(db_path).get('元大_2330_1131015_台積電')
+    assert record == parse_report_name('元大_2330_1131015_台積電')
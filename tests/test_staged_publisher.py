@@ -0,0 +1,132 @@
+"""staged_publisher 暫存發佈與重試測試"""
+
+import os
+
+import pytest
+
+from config import Config
+from staged_publisher import StagedPublisher, get_staged_publisher
+
+
+@pytest.fixture(autouse=True)
+def short_window(monkeypatch):
+    monkeypatch.setattr(Config, 'PUBLISH_BATCH_WINDOW', 0.01)
+
+
+@pytest.fixture
+def source(tmp_path):
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    path = folder / '報告.pdf'
+    path.write_bytes(b'report')
+    return path
+
+
+@pytest.fixture
+def publishers():
+    created = []
+
+    def create(**kwargs):
+        publisher = StagedPublisher(staging_dir=kwargs.pop('staging_dir'), **kwargs)
+        created.append(publisher)
+        return publisher
+
+    yield create
+    for publisher in created:
+        publisher.stop()
+
+
+def test_publishes_to_all_targets_and_removes_staging(source, tmp_path, publishers):
+    finished = []
+    publisher = publishers(staging_dir=str(tmp_path / 'staging'), on_published=finished.append)
+    item = publisher.submit(str(source), [str(tmp_path / 't1'), str(tmp_path / 't2')])
+    assert item.done.wait(10)
+    assert item.succeeded
+    assert (tmp_path / 't1' / '報告.pdf').read_bytes() == b'report'
+    assert (tmp_path / 't2' / '報告.pdf').read_bytes() == b'report'
+    assert not os.path.exists(item.staged)
+    assert finished == [item]
+    assert publisher.pending_count() == 0
+
+
+def test_duplicate_submit_returns_pending_item(source, tmp_path, publishers):
+    blocked = tmp_path / 'blocked'
+    blocked.write_bytes(b'')
+    publisher = publishers(staging_dir=str(tmp_path / 'staging'), retry_delays=[30])
+    first = publisher.submit(str(source), [str(blocked)])
+    assert publisher.submit(str(source), [str(blocked)]) is first
+    assert publisher.flush([first], timeout=10)
+    # 等待重試中仍是同一個工作
+    assert publisher.submit(str(source), [str(blocked)]) is first
+    assert not first.done.is_set()
+
+
+def test_failed_target_is_retried(source, tmp_path, publishers):
+    blocked = tmp_path / 'target'
+    blocked.write_bytes(b'')  # 目標位置暫時是檔案，第一次寫入失敗
+    publisher = publishers(staging_dir=str(tmp_path / 'staging'), retry_delays=[0.5])
+    item = publisher.submit(str(source), [str(blocked), str(tmp_path / 'ok')])
+    assert publisher.flush([item], timeout=10)
+    assert item.pending == [str(blocked)]
+    assert item.results[str(tmp_path / 'ok')].status == 'copied'
+    blocked.unlink()
+    assert item.done.wait(10)
+    assert item.succeeded
+    assert item.attempts == 2
+    assert (blocked / '報告.pdf').read_bytes() == b'report'
+
+
+def test_gives_up_after_retries(source, tmp_path, publishers):
+    blocked = tmp_path / 'blocked'
+    blocked.write_bytes(b'')
+    publisher = publishers(staging_dir=str(tmp_path / 'staging'), retry_delays=[0.01, 0.01])
+    item = publisher.submit(str(source), [str(blocked)])
+    assert item.done.wait(10)
+    assert not item.succeeded
+    assert item.attempts == 3
+    assert item.results[str(blocked)].status == 'failed'
+    assert publisher.pending_count() == 0
+
+
+def test_stop_drains_new_items_and_drops_retries(tmp_path, publishers, monkeypatch):
+    folder = tmp_path / 'downloads'
+    folder.mkdir()
+    (folder / 'retry.pdf').write_bytes(b'r')
+    (folder / 'new.pdf').write_bytes(b'n')
+    blocked = tmp_path / 'blocked'
+    blocked.write_bytes(b'')
+    publisher = publishers(staging_dir=str(tmp_path / 'staging'), retry_delays=[30])
+    retrying = publisher.submit(str(folder / 'retry.pdf'), [str(blocked)])
+    assert publisher.flush([retrying], timeout=10)
+
+    monkeypatch.setattr(Config, 'PUBLISH_BATCH_WINDOW', 30)  # 新工作尚未到期，停止時仍應發佈
+    fresh = publisher.submit(str(folder / 'new.pdf'), [str(tmp_path / 'ok')])
+    publisher.stop()
+    assert fresh.done.is_set() and fresh.succeeded
+    assert not retrying.done.is_set()
+    assert publisher.pending_count() == 0
+    assert publisher.is_stopped
+
+
+def test_shared_publisher_is_recreated_after_stop():
+    publisher = get_staged_publisher()
+    assert get_staged_publisher() is publisher
+    publisher.stop()
+    replacement = get_staged_publisher()
+    assert replacement is not publisher
+    replacement.stop()
+
+
+def test_completed_copies_are_resumed(source, tmp_path, publishers):
+    targets = [str(tmp_path / 't1')]
+    first_publisher = publishers(staging_dir=str(tmp_path / 'staging'))
+    first = first_publisher.submit(str(source), targets)
+    assert first.done.wait(10)
+    assert first.results[targets[0]].status == 'copied'
+    first_publisher.stop()
+    # 重新啟動後（清單快取視為過期），複製進度中已完成的目標不再寫入
+    second = publishers(staging_dir=str(tmp_path / 'staging'))
+    second.listing.is_current = lambda *args: False
+    item = second.submit(str(source), targets)
+    assert item.done.wait(10)
+    assert item.results[targets[0]].status == 'skipped'
@@ -0,0 +1,40 @@
+"""wait_conditions 自動調整逾時測試"""
+
+from config import Config
+from wait_conditions import AdaptiveWaiter
+
+
+def test_timeout_uses_p95_of_samples(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'WAIT_MIN_SAMPLES', 5)
+    waiter = AdaptiveWaiter(str(tmp_path / 'stats.json'))
+    assert waiter.timeout_for('步驟') == Config.WAIT_DEFAULT_TIMEOUT
+    for latency in (1, 1, 1, 1, 2):
+        waiter.record('步驟', latency)
+    assert waiter.timeout_for('步驟') == 2 * Config.WAIT_SAFETY_FACTOR
+
+
+def test_success_records_latency(tmp_path):
+    waiter = AdaptiveWaiter(str(tmp_path / 'stats.json'))
+    assert waiter.wait_until(lambda: 'ok', '步驟', timeout=1) == 'ok'
+    assert waiter.stats('步驟')[0] == 1
+
+
+def test_timeout_is_recorded_and_raises_next_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'WAIT_MIN_SAMPLES', 1)
+    monkeypatch.setattr(Config, 'WAIT_MIN_TIMEOUT', 0.01)
+    waiter = AdaptiveWaiter(str(tmp_path / 'stats.json'))
+    waiter.record('步驟', 0.01)
+    first = waiter.timeout_for('步驟')
+    assert waiter.wait_until(lambda: False, '步驟') is None
+    count, _, maximum = waiter.stats('步驟')
+    assert count == 2
+    assert maximum == round(first, 3)
+    assert waiter.timeout_for('步驟') > first
+
+
+def test_stats_survive_save_and_load(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    waiter = AdaptiveWaiter(path)
+    waiter.record('步驟', 0.25)
+    waiter.save()
+    assert AdaptiveWaiter(path).stats('步驟') == (1, 0.25, 0.25)
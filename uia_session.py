@@ -0,0 +1,98 @@
+"""
+UIA 連線池模組
+功能: 依視窗句柄保存一份已連線的 pywinauto 應用程式與主視窗
+職責:
+- 以 IsWindow 與行程 ID 做低成本的健康檢查
+- 只有在視窗消失或行程改變時才重新連線
+- 快取已解析的子控件，供各模組借用
+依賴: utils.py
+"""
+
+import threading
+import time
+import win32gui
+import win32process
+from pywinauto.application import Application as PywinautoApp
+from utils import debug_print
+
+
+class UIASession:
+    """單一視窗的 UIA 連線"""
+
+    def __init__(self, hwnd):
+        self.hwnd = hwnd
+        self.process_id = self._get_process_id(hwnd)
+        self.app = PywinautoApp(backend="uia").connect(handle=hwnd)
+        self.main_window = self.app.window(handle=hwnd)  # WindowSpecification，供 child_window 使用
+        self.main_wrapper = self.main_window.wrapper_object()  # 已解析的主視窗，供 from_point/descendants 使用
+        self.connected_at = time.monotonic()
+        self._children = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_process_id(hwnd):
+        """取得視窗所屬行程 ID"""
+        try:
+            return win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            return None
+
+    def is_alive(self):
+        """低成本健康檢查：視窗仍存在且仍屬於同一個行程"""
+        try:
+            return bool(win32gui.IsWindow(self.hwnd)) and self._get_process_id(self.hwnd) == self.process_id
+        except Exception:
+            return False
+
+    def child(self, **criteria):
+        """取得已解析的子控件，同一條件只解析一次"""
+        key = tuple(sorted(criteria.items()))
+        with self._lock:
+            wrapper = self._children.get(key)
+        if wrapper is not None:
+            return wrapper
+
+        wrapper = self.main_window.child_window(**criteria).wrapper_object()
+        with self._lock:
+            self._children[key] = wrapper
+        return wrapper
+
+    def forget_child(self, **criteria):
+        """移除快取的子控件（例如控件已重建）"""
+        with self._lock:
+            self._children.pop(tuple(sorted(criteria.items())), None)
+
+
+class UIASessionPool:
+    """以視窗句柄為鍵的 UIA 連線池"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, hwnd):
+        """借用指定視窗的連線，必要時才重新連線"""
+        with self._lock:
+            session = self._sessions.get(hwnd)
+            if session is not None and session.is_alive():
+                return session
+
+            if session is not None:
+                debug_print(f"視窗 {hwnd} 的連線已失效，重新連線", color='light_magenta')
+            session = UIASession(hwnd)
+            self._sessions[hwnd] = session
+            return session
+
+
+# 全域連線池
+session_pool = UIASessionPool()
+
+
+def get_uia_session(hwnd):
+    """借用指定視窗的 UIA 連線"""
+    return session_pool.get(hwnd)
+
+
+def get_app(hwnd):
+    """取得指定視窗已連線的應用程式"""
+    return session_pool.get(hwnd).app
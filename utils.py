@@ -3,7 +3,6 @@ from queue import Queue
 import win32gui
 import win32con
 import time
-from pywinauto.application import Application as PywinautoApp
 import win32api
 import pyautogui
 from config import Config, COLORS  # 添加這行
@@ -14,7 +13,6 @@ SLEEP_INTERVAL = Config.SLEEP_INTERVAL  # 基本等待時間
 
 # 全域變數
 debug_queue = Queue() # 用於儲存 debug 訊息的佇列
-refresh_checking = False  # 用於控制刷新檢測的開關
 last_mouse_pos = None # 用於儲存滑鼠最後位置
 is_program_moving = False # 用於控制程式是否移動
 
@@ -193,63 +191,6 @@ def calculate_center_position(rect):
         debug_print(f"計算中心點位置時發生錯誤: {str(e)}", color='light_red')
         return None, None
 
-def start_refresh_check(hwnd=None):
-    """開始檢測列表刷新"""
-    global refresh_checking
-    CHECK_INTERVAL = 0.3
-    
-    try:
-        if hwnd is None:
-            windows = find_window_handle("stocks")
-            if not windows:
-                debug_print("錯誤: 找不到目標視窗", color='light_red')
-                return
-            hwnd = windows[0][0]
-            
-        refresh_checking = True
-        current_files = [{}, {}, {}]  # 每個列表的檔案狀態
-        debug_print("開始檢測列表刷新...", color='light_cyan')
-        
-        while refresh_checking:
-            try:
-                app = PywinautoApp(backend="uia").connect(handle=hwnd)
-                main_window = app.window(handle=hwnd)
-                
-                for i in range(3):
-                    try:
-                        list_control = main_window.child_window(control_type="List", found_index=i)
-                        if not list_control.is_visible():
-                            continue
-                            
-                        new_files = {
-                            file.window_text(): file.rectangle()
-                            for file in get_list_items_by_id(main_window, i)
-                        }
-                        
-                        if current_files[i] and new_files != current_files[i]:
-                            debug_print(f"檢測到列表 {i+1} 刷新", color='light_green')
-                            
-                        current_files[i] = new_files
-                            
-                    except Exception:
-                        continue
-                        
-            except Exception as e:
-                debug_print(f"檢測過程發生錯誤: {str(e)}", color='light_red')
-                
-            time.sleep(CHECK_INTERVAL)
-            
-    except Exception as e:
-        debug_print(f"檢測列表刷新時發生錯誤: {str(e)}", color='light_red')
-    finally:
-        refresh_checking = False
-
-def stop_refresh_check():
-    """停止檢測列表刷新"""
-    global refresh_checking
-    refresh_checking = False
-    debug_print("停止檢測列表刷新", color='light_yellow')
-
 def check_mouse_movement():
     """檢查滑鼠是否移動"""
     global last_mouse_pos, is_program_moving
@@ -347,9 +288,11 @@ def check_target_element(hwnd, x, y, expected_text=None):
     if not expected_text:
         return True
         
+    from uia_session import get_uia_session
+
     try:
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
+        # 借用已連線的主視窗，避免在按住滑鼠時重新連線
+        main_window = get_uia_session(hwnd).main_wrapper
         
         # 使用遞增的搜索範圍
         for search_range in [3, 5, 8]:  # 從小範圍開始搜索
@@ -399,6 +342,7 @@ def click_at(x, y, is_first_click=False, clicks=1, interval=Config.DOUBLE_CLICK_
         window_title: 視窗標題
         expected_text: 預期的元素文字，預設為 None"""
     global last_mouse_pos
+    from wait_conditions import wait_until, new_chrome_tab
     
     try:
         # 確保視窗在前景
@@ -406,6 +350,9 @@ def click_at(x, y, is_first_click=False, clicks=1, interval=Config.DOUBLE_CLICK_
             debug_print("視窗不在前景，重新嘗試點擊", color='light_red')
             return False
         
+        # 第一次點擊需等待瀏覽器開啟，點擊前先記錄前景視窗狀態
+        tab_opened = new_chrome_tab() if is_first_click else None
+        
         with program_moving_context():
             # 使用 pyautogui 平滑移動滑鼠
             pyautogui.moveTo(x, y, duration=0.1)  # 使用 duration 參數實現平滑移動
@@ -441,8 +388,11 @@ def click_at(x, y, is_first_click=False, clicks=1, interval=Config.DOUBLE_CLICK_
                 if clicks > 1:
                     time.sleep(interval)
             
-            # 點擊後等待時間，第一次點擊等待時間較長
-            time.sleep(sleep_interval * (10 if is_first_click else 0.5))
+            # 點擊後等待：第一次點擊等待瀏覽器開啟新分頁，其餘只做短暫間隔
+            if tab_opened:
+                wait_until(tab_opened, '首次開啟分頁')
+            else:
+                time.sleep(sleep_interval * 0.5)
             
             # 點擊後檢查是否有錯誤對話框
             if check_error_dialog():
@@ -455,101 +405,68 @@ def click_at(x, y, is_first_click=False, clicks=1, interval=Config.DOUBLE_CLICK_
         debug_print(f"點擊操作時發生錯誤: {str(e)}", color='light_red')
         return False
 
-def scroll_to_file(file, list_area, hwnd):
-    """滾動直到檔案進入可視範圍"""
+def scroll_to_file(file, list_rect, hwnd):
+    """
+    滾動直到檔案進入可視範圍
+    file: 列表快照中的項目紀錄 (ListItemRecord)
+    list_rect: 目標列表的矩形區域
+    """
+    from list_snapshot import get_list_snapshot, refresh_list_in_snapshot
+    from control_info import LIST_CONTROLS
+
     try:
         debug_print("開始滾動檢查...", color='light_cyan')
         
-        # 連接到視窗
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
-        
         # 獲取視窗標題
         window_title = win32gui.GetWindowText(hwnd)
         
         # 獲取目標檔案名稱
-        target_name = file.window_text()
+        target_name = file.name
         debug_print(f"目標檔案: {target_name}", color='light_blue', bold=True)
 
-        # 獲取三個列表的檔案
-        morning_files = get_list_items_by_id(main_window, 'morning')
-        research_files = get_list_items_by_id(main_window, 'research')
-        industry_files = get_list_items_by_id(main_window, 'industry')
-        
-        # 找出目標檔案在哪個列表及其序號
-        target_list = None
-        target_index = None
-        target_list_id = None
-        
-        for list_type, (list_id, files) in [
-            ('晨會報告', ('listBoxMorningReports', morning_files)), 
-            ('研究報告', ('listBoxResearchReports', research_files)), 
-            ('產業報告', ('listBoxIndustryReports', industry_files))
-        ]:
-            try:
-                index = [f.window_text() for f in files].index(target_name)
-                target_list = list_type
-                target_index = index
-                target_list_id = list_id
-                debug_print(f"目標檔案在 [{list_type}] 列表，序號: {index}", color='light_blue', bold=True)
-                break
-            except ValueError:
-                continue
-                
-        if target_index is None:
+        # 從快照找出目標檔案在哪個列表及其序號
+        snapshot = get_list_snapshot(hwnd)
+        target = snapshot.find(target_name, file.list_type) or snapshot.find(target_name)
+        if target is None:
             debug_print("找不到目標檔案", color='light_red')
             return False
             
+        list_type = target.list_type
+        target_list = LIST_CONTROLS[list_type]['name']
+        target_index = target.index
+        debug_print(f"目標檔案在 [{target_list}] 列表，序號: {target_index}", color='light_blue', bold=True)
+            
         # 找出游標選中的檔案在哪個列表及其序號
         current_list = None
         current_index = None
         
-        for list_type, files in [('晨會報告', morning_files), 
-                               ('研究報告', research_files), 
-                               ('產業報告', industry_files)]:
-            for i, f in enumerate(files):
-                if f.is_selected():
-                    current_list = list_type
-                    current_index = i
-                    debug_print(f"游標選中的檔案在 [{list_type}] 列表，序號: {i}", color='light_blue', bold=True)
-                    break
-            if current_index is not None:
-                break
+        selected = snapshot.selected()
+        if selected is not None:
+            current_list = LIST_CONTROLS[selected.list_type]['name']
+            current_index = selected.index
+            debug_print(f"游標選中的檔案在 [{current_list}] 列表，序號: {current_index}", color='light_blue', bold=True)
                 
         if current_index is None:
             debug_print("找不到游標選中的檔案", color='light_red')
-            # 將中文列表名稱轉換為英文標識符
-            list_type = None
-            if target_list == '晨會報告':
-                list_type = 'morning'
-            elif target_list == '研究報告':
-                list_type = 'research'
-            elif target_list == '產業報告':
-                list_type = 'industry'
+            debug_print(f"嘗試點擊 [{target_list}] 列表", color='light_yellow')
+            # 點擊切換到目標檔案所在的列表
+            if not switch_to_list(hwnd, list_type, next_list=False):
+                debug_print("切換到目標列表失敗", color='light_red')
+                return False
                 
-            if list_type:
-                debug_print(f"嘗試點擊 [{target_list}] 列表", color='light_yellow')
-                # 點擊切換到目標檔案所在的列表
-                if not switch_to_list(hwnd, list_type, next_list=False):
-                    debug_print("切換到目標列表失敗", color='light_red')
-                    return False
-                    
-                # 重新獲取目標列表區域
-                list_area = main_window.child_window(auto_id=target_list_id)
-                debug_print("已更新列表區域", color='light_green')
+            # 重新獲取目標列表區域
+            list_rect = snapshot.list_rect(list_type)
+            debug_print("已更新列表區域", color='light_green')
+            
+            # 重新檢查檔案可見性
+            if is_file_visible(target, list_rect):
+                debug_print("切換列表後檔案已可見", color='light_green')
+                return True
                 
-                # 重新檢查檔案可見性
-                if is_file_visible(file, list_area):
-                    debug_print("切換列表後檔案已可見", color='light_green')
-                    return True
-                    
-                # 設定當前列表和索引
-                current_list = target_list
-                current_index = target_index  # 設定為目標檔案的索引
-                debug_print(f"更新當前索引為: {current_index}", color='light_magenta')
-            else:
-                debug_print("無法識別目標列表類型", color='light_red')
-                return False
+            # 設定當前列表和索引
+            current_list = target_list
+            current_index = target_index  # 設定為目標檔案的索引
+            debug_print(f"更新當前索引為: {current_index}", color='light_magenta')
                 
         # 檢查是否需要切換列表
         if target_list != current_list:
@@ -565,31 +482,22 @@ def scroll_to_file(file, list_area, hwnd):
             time.sleep(0.2)  # 等待列表切換完成
             
             # 重新獲取目標列表區域
-            list_area = main_window.child_window(auto_id=target_list_id)
+            list_rect = snapshot.list_rect(list_type)
             debug_print("已更新列表區域", color='light_green')
             
             # 重新檢查檔案可見性
-            if is_file_visible(file, list_area):
+            if is_file_visible(target, list_rect):
                 debug_print("切換列表後檔案已可見", color='light_green')
                 return True
         
         # 在開始翻頁前，確保目標列表被選中
-        list_type = None
-        if target_list == '晨會報告':
-            list_type = 'morning'
-        elif target_list == '研究報告':
-            list_type = 'research'
-        elif target_list == '產業報告':
-            list_type = 'industry'
-            
-        if list_type:
-            debug_print(f"翻頁前確保 [{target_list}] 列表被選中", color='blue', bold=True)
-            # 根據目標檔案位置決定點擊位置
-            press_position = 'top' if target_index < current_index else 'bottom'
-            if not switch_to_list(hwnd, list_type, next_list=False, press_list_top_or_bottom=press_position):
-                debug_print("切換到目標列表失敗", color='light_red')
-                return False
-            time.sleep(0.1)  # 等待列表切換完成
+        debug_print(f"翻頁前確保 [{target_list}] 列表被選中", color='blue', bold=True)
+        # 根據目標檔案位置決定點擊位置
+        press_position = 'top' if target_index < current_index else 'bottom'
+        if not switch_to_list(hwnd, list_type, next_list=False, press_list_top_or_bottom=press_position):
+            debug_print("切換到目標列表失敗", color='light_red')
+            return False
+        time.sleep(0.1)  # 等待列表切換完成
         
         # 設定最大嘗試次數
         max_attempts = 10
@@ -597,7 +505,7 @@ def scroll_to_file(file, list_area, hwnd):
         
         # 執行翻頁直到找到檔案
         while attempts < max_attempts:
-            if is_file_visible(file, list_area):
+            if is_file_visible(target, list_rect):
                 debug_print("目標檔案已可見", color='light_green')
                 return True
                 
@@ -617,8 +525,13 @@ def scroll_to_file(file, list_area, hwnd):
                 
             time.sleep(0.2)
             
+            # 翻頁後項目位置已改變，重新擷取目標列表
+            snapshot = refresh_list_in_snapshot(hwnd, list_type)
+            target = snapshot.find(target_name, list_type) or target
+            list_rect = snapshot.list_rect(list_type) or list_rect
+            
             # 檢查檔案是否可見
-            if is_file_visible(file, list_area):
+            if is_file_visible(target, list_rect):
                 debug_print("翻頁後檔案已可見", color='light_green')
                 return True
                 
@@ -631,12 +544,15 @@ def scroll_to_file(file, list_area, hwnd):
         debug_print(f"滾動到檔案位置時發生錯誤: {str(e)}", color='light_red')
         return False
 
-def is_file_visible(file, list_area):
-    """檢查檔案是否在可視範圍內"""
+def is_file_visible(file, list_rect):
+    """
+    檢查檔案是否在可視範圍內
+    file: 列表快照中的項目紀錄 (ListItemRecord)
+    list_rect: 列表的矩形區域
+    """
     try:
         # 獲取檔案和列表的矩形尺寸及座標
-        file_rect = file.rectangle()
-        list_rect = list_area.rectangle()
+        file_rect = file.rect
         
         # 檢查檔案頂部是否在可視範圍內
         top_visible = file_rect.top >= list_rect.top
@@ -647,7 +563,7 @@ def is_file_visible(file, list_area):
         # 檢查檔案是否可見
         is_visible = top_visible and bottom_visible
 
-        file_name = file.window_text()
+        file_name = file.name
         
         if not is_visible:
             debug_print(f"{file_name} 檔案不在可視範圍內 (top={file_rect.top}, bottom={file_rect.bottom})", color='light_magenta')
@@ -668,11 +584,11 @@ def switch_to_list(hwnd, list_type=None, next_list=True, press_list_top_or_botto
     press_list_top_or_bottom: 'top'|'bottom' 指定要按列表的頂部或底部
     """
     global is_program_moving  # 添加這行
+    from uia_session import get_uia_session
     
     try:
-        # 連接到視窗
-        app = PywinautoApp(backend="uia").connect(handle=hwnd)
-        main_window = app.window(handle=hwnd)
+        # 借用已連線的視窗
+        session = get_uia_session(hwnd)
         
         list_types = {
             'morning': ('listBoxMorningReports', '晨會報告'),
@@ -686,7 +602,7 @@ def switch_to_list(hwnd, list_type=None, next_list=True, press_list_top_or_botto
         try:
             if next_list:
                 # 切換到下一個列表的邏輯
-                lists = main_window.descendants(control_type="List")
+                lists = session.main_wrapper.descendants(control_type="List")
                 if len(lists) >= 2:
                     next_list = lists[1]  # 從左側列表切換到中間列表
                     rect = next_list.rectangle()
@@ -701,7 +617,7 @@ def switch_to_list(hwnd, list_type=None, next_list=True, press_list_top_or_botto
                     return False
                     
                 list_id, list_name = list_types[list_type]
-                target_list = main_window.child_window(auto_id=list_id)
+                target_list = session.child(auto_id=list_id)
                 rect = target_list.rectangle()
                 debug_print(f"切換到{list_name}列表", color='light_yellow')
 
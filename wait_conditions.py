@@ -0,0 +1,215 @@
+"""
+條件等待模組
+功能: 以「等待條件成立」取代固定的 sleep，並依實際延遲自動調整逾時
+職責:
+- 以指數退避輪詢條件，直到成立或超過期限
+- 依步驟名稱記錄實際延遲（逾時以逾時秒數計入），以近期 P95 推算下一次的逾時
+- 提供常用條件：瀏覽器開啟新分頁、列表刷新、焦點回到目標視窗、快捷鍵放開
+依賴: config.py, utils.py
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+import win32api
+import win32con
+import win32gui
+from config import Config
+from utils import debug_print
+
+CHROME_WINDOW_CLASS = 'Chrome_WidgetWin_1'
+
+
+class AdaptiveWaiter:
+    """依步驟記錄延遲並調整逾時的等待器"""
+
+    def __init__(self, stats_path=None):
+        self.stats_path = stats_path or Config.WAIT_STATS_FILE
+        self._samples = {}  # {step: deque([latency, ...])}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """載入先前記錄的延遲"""
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for step, samples in data.items():
+                self._samples[step] = deque(samples, maxlen=Config.WAIT_SAMPLE_SIZE)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            debug_print(f"載入等待延遲紀錄時發生錯誤: {str(e)}", color='light_red')
+
+    def save(self):
+        """保存延遲紀錄（只在有變更時寫入）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {step: list(samples) for step, samples in self._samples.items()}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+            temp_path = self.stats_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.stats_path)
+        except Exception as e:
+            debug_print(f"保存等待延遲紀錄時發生錯誤: {str(e)}", color='light_red')
+
+    def record(self, step, latency):
+        """記錄一次等待的延遲（逾時以逾時秒數記錄）"""
+        with self._lock:
+            samples = self._samples.setdefault(step, deque(maxlen=Config.WAIT_SAMPLE_SIZE))
+            samples.append(round(latency, 3))
+            self._dirty = True
+
+    def timeout_for(self, step, default=None):
+        """
+        取得步驟的逾時：樣本足夠時為 P95 × 安全係數，
+        並限制在 WAIT_MIN_TIMEOUT 與 WAIT_MAX_TIMEOUT 之間
+        """
+        default = Config.WAIT_DEFAULT_TIMEOUT if default is None else default
+        with self._lock:
+            samples = sorted(self._samples.get(step, ()))
+        if len(samples) < Config.WAIT_MIN_SAMPLES:
+            return default
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        timeout = p95 * Config.WAIT_SAFETY_FACTOR
+        return max(Config.WAIT_MIN_TIMEOUT, min(Config.WAIT_MAX_TIMEOUT, timeout))
+
+    def stats(self, step):
+        """取得步驟的延遲統計 (樣本數, 中位數, 最大值)"""
+        with self._lock:
+            samples = sorted(self._samples.get(step, ()))
+        if not samples:
+            return 0, None, None
+        return len(samples), samples[len(samples) // 2], samples[-1]
+
+    def wait_until(self, condition, step, timeout=None, initial_interval=0.02, max_interval=0.5):
+        """
+        以指數退避輪詢條件直到成立或逾時
+        Args:
+            condition: 無參數函數，返回值為真時視為成立
+            step: 步驟名稱，用於記錄延遲與推算逾時
+            timeout: 指定逾時秒數，None 時使用自動調整的逾時
+        Returns:
+            條件成立時返回條件的返回值，逾時返回 None
+        """
+        timeout = self.timeout_for(step) if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        interval = initial_interval
+
+        while True:
+            try:
+                result = condition()
+            except Exception:
+                result = None
+            if result:
+                self.record(step, time.monotonic() - start)
+                return result
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # 逾時也計入樣本，否則 P95 只反映成功的等待，逾時會一再重演
+                self.record(step, timeout)
+                debug_print(f"等待「{step}」逾時 ({timeout:.1f} 秒)", color='light_magenta')
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
+
+# 全域等待器
+_waiter = None
+_waiter_lock = threading.Lock()
+
+
+def get_waiter():
+    """取得全域等待器"""
+    global _waiter
+    with _waiter_lock:
+        if _waiter is None:
+            _waiter = AdaptiveWaiter()
+        return _waiter
+
+
+def wait_until(condition, step, timeout=None):
+    """使用全域等待器等待條件成立"""
+    return get_waiter().wait_until(condition, step, timeout)
+
+
+def save_wait_stats():
+    """保存全域等待器的延遲紀錄"""
+    if _waiter is not None:
+        _waiter.save()
+
+
+# ===== 常用條件 =====
+
+def _foreground():
+    """取得前景視窗的句柄、類別與標題"""
+    hwnd = win32gui.GetForegroundWindow()
+    return hwnd, win32gui.GetClassName(hwnd), win32gui.GetWindowText(hwnd)
+
+
+def new_chrome_tab():
+    """條件：瀏覽器在前景且標題與建立條件時不同（開啟了新分頁）"""
+    try:
+        _, _, baseline_title = _foreground()
+    except Exception:
+        baseline_title = None
+
+    def condition():
+        _, class_name, title = _foreground()
+        return class_name == CHROME_WINDOW_CLASS and title != baseline_title
+
+    return condition
+
+
+def chrome_in_foreground():
+    """條件：瀏覽器視窗在前景"""
+    def condition():
+        return _foreground()[1] == CHROME_WINDOW_CLASS
+    return condition
+
+
+def focus_returned(hwnd):
+    """條件：焦點回到目標視窗"""
+    def condition():
+        return win32gui.GetForegroundWindow() == hwnd
+    return condition
+
+
+def hotkeys_released():
+    """條件：CTRL、SHIFT 都已放開（避免快捷鍵的修飾鍵影響後續按鍵）"""
+    def condition():
+        return not any(win32api.GetAsyncKeyState(key) & 0x8000
+                       for key in (win32con.VK_CONTROL, win32con.VK_SHIFT))
+    return condition
+
+
+def list_refreshed(hwnd):
+    """條件：任一報告列表的指紋與建立條件時不同（日期切換已套用）"""
+    from control_info import LIST_CONTROLS
+    from list_snapshot import capture_list_names, invalidate_list_snapshot
+    from refresh_detector import compute_fingerprint
+
+    def fingerprints():
+        return {list_type: compute_fingerprint(capture_list_names(hwnd, list_type)) for list_type in LIST_CONTROLS}
+
+    try:
+        baseline = fingerprints()
+    except Exception:
+        baseline = {}
+
+    def condition():
+        if fingerprints() != baseline:
+            invalidate_list_snapshot(hwnd)
+            return True
+        return False
+
+    return condition